@@ -3,6 +3,27 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def default_model_backends():
+    """
+    The single Ollama server of configurations that predate MODEL_BACKENDS, taken from MODEL_BASE_URL
+    (the OpenAI-compatible /v1 URL) or MODEL_GENERATE_URL, and a local Ollama without either.
+    """
+    for name, suffix in (("MODEL_BASE_URL", "/v1"), ("MODEL_GENERATE_URL", "/api/generate")):
+        url = (os.getenv(name) or "").rstrip("/")
+        if url:
+            return url[:-len(suffix)] if url.endswith(suffix) else url
+    return "http://localhost:11434"
+
+
+def data_path(filename):
+    """
+    Default location of a local database: next to the insights directory, or the working directory without one.
+    """
+    destination = os.getenv("DESTINATION_DIRECTORY")
+    if not destination:
+        return filename
+    return os.path.join(os.path.dirname(os.path.normpath(destination)), filename)
+
 class Config:
     LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
     LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
@@ -12,15 +33,80 @@ class Config:
     TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
     TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
     TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+    TWILIO_MAX_WORKERS = int(os.getenv("TWILIO_MAX_WORKERS", "8"))
+    TWILIO_VALIDATION_CACHE_TTL_SECONDS = float(os.getenv("TWILIO_VALIDATION_CACHE_TTL_SECONDS", "3600"))
 
     ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
+    ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID")
+    ELEVENLABS_MODEL = os.getenv("ELEVENLABS_MODEL", "eleven_turbo_v2")
     DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 
-    MODEL_BASE_URL = os.getenv("MODEL_BASE_URL")
     MODEL_NAME = os.getenv("MODEL_NAME")
     MODEL_KEY = os.getenv("MODEL_KEY")
-    MODEL_GENERATE_URL = os.getenv("MODEL_GENERATE_URL")
+    MODEL_BACKENDS = os.getenv("MODEL_BACKENDS") or default_model_backends()
+    MODEL_BACKEND_MAX_CONCURRENCY = int(os.getenv("MODEL_BACKEND_MAX_CONCURRENCY", "4"))
+    MODEL_BACKEND_HEALTH_CHECK_SECONDS = float(os.getenv("MODEL_BACKEND_HEALTH_CHECK_SECONDS", "10"))
+    MODEL_BACKEND_FAILURE_THRESHOLD = int(os.getenv("MODEL_BACKEND_FAILURE_THRESHOLD", "3"))
+    MODEL_BACKEND_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("MODEL_BACKEND_ATTEMPT_TIMEOUT_SECONDS", "10"))
+    LLM_LIVE_RESERVED_SLOTS = int(os.getenv("LLM_LIVE_RESERVED_SLOTS", "2"))
+    LLM_PROXY_URL = os.getenv("LLM_PROXY_URL", "")
+    LLM_PROXY_TIMEOUT_SECONDS = float(os.getenv("LLM_PROXY_TIMEOUT_SECONDS", "300"))
     SOURCE_DIRECTORY = os.getenv("SOURCE_DIRECTORY")
     DESTINATION_DIRECTORY = os.getenv("DESTINATION_DIRECTORY")
     PROCESSED_DIRECTORY = os.getenv("PROCESSED_DIRECTORY")
+    LATENCY_DIRECTORY = os.getenv("LATENCY_DIRECTORY") or data_path("latency")
+    LATENCY_RETENTION_SECONDS = float(os.getenv("LATENCY_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+    INSIGHTS_CONCURRENCY = int(os.getenv("INSIGHTS_CONCURRENCY", "8"))
+    INSIGHTS_REQUEST_TIMEOUT_SECONDS = float(os.getenv("INSIGHTS_REQUEST_TIMEOUT_SECONDS", "300"))
+    INSIGHTS_BATCH_ENABLED = os.getenv("INSIGHTS_BATCH_ENABLED", "false").lower() == "true"
+    INSIGHTS_BATCH_MAX_FILES = int(os.getenv("INSIGHTS_BATCH_MAX_FILES", "8"))
+    INSIGHTS_BATCH_MAX_TOKENS = int(os.getenv("INSIGHTS_BATCH_MAX_TOKENS", "1500"))
+    INSIGHTS_BATCH_MAX_TRANSCRIPT_TOKENS = int(os.getenv("INSIGHTS_BATCH_MAX_TRANSCRIPT_TOKENS", "400"))
+    INSIGHTS_WATCH_ENABLED = os.getenv("INSIGHTS_WATCH_ENABLED", "false").lower() == "true"
+    INSIGHTS_WATCH_INTERVAL_SECONDS = float(os.getenv("INSIGHTS_WATCH_INTERVAL_SECONDS", "5"))
+    INSIGHTS_WATCH_DEBOUNCE_SECONDS = float(os.getenv("INSIGHTS_WATCH_DEBOUNCE_SECONDS", "5"))
+    INSIGHTS_WATCH_CONCURRENCY = int(os.getenv("INSIGHTS_WATCH_CONCURRENCY", "2"))
+
+    ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+    ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH") or data_path("analysis_cache.db")
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "100000"))
+    ANALYSIS_CACHE_MAX_AGE_SECONDS = float(os.getenv("ANALYSIS_CACHE_MAX_AGE_SECONDS", "2592000"))
+    INSIGHTS_INDEX_PATH = os.getenv("INSIGHTS_INDEX_PATH") or data_path("insights_index.db")
+
+    TRAINING_CONCURRENCY = int(os.getenv("TRAINING_CONCURRENCY", "4"))
+    SIMULATION_MEMORY_STRATEGY = os.getenv("SIMULATION_MEMORY_STRATEGY", "buffer")
+    SIMULATION_MEMORY_WINDOW_TURNS = int(os.getenv("SIMULATION_MEMORY_WINDOW_TURNS", "4"))
+    SIMULATION_MEMORY_MAX_TOKENS = int(os.getenv("SIMULATION_MEMORY_MAX_TOKENS", "1000"))
+    SIMULATION_CACHE_ENABLED = os.getenv("SIMULATION_CACHE_ENABLED", "false").lower() == "true"
+    SIMULATION_CACHE_PATH = os.getenv("SIMULATION_CACHE_PATH") or data_path("simulation_cache.db")
+    SIMULATION_CACHE_MAX_ENTRIES = int(os.getenv("SIMULATION_CACHE_MAX_ENTRIES", "100000"))
+    SIMULATION_SEED = int(os.getenv("SIMULATION_SEED")) if os.getenv("SIMULATION_SEED") else None
+    OPTIMIZER_MAX_ROUNDS = int(os.getenv("OPTIMIZER_MAX_ROUNDS", "4"))
+    OPTIMIZER_MAX_LLM_CALLS = int(os.getenv("OPTIMIZER_MAX_LLM_CALLS", "0"))
+    OPTIMIZER_MAX_TOKENS = int(os.getenv("OPTIMIZER_MAX_TOKENS", "0"))
+    OPTIMIZER_PATIENCE = int(os.getenv("OPTIMIZER_PATIENCE", "1"))
+    OPTIMIZER_MIN_IMPROVEMENT = float(os.getenv("OPTIMIZER_MIN_IMPROVEMENT", "0.1"))
+
+    CAMPAIGN_CALLS_PER_SECOND = float(os.getenv("CAMPAIGN_CALLS_PER_SECOND", "1"))
+    CAMPAIGN_MAX_CONCURRENT_CALLS = int(os.getenv("CAMPAIGN_MAX_CONCURRENT_CALLS", "10"))
+    CAMPAIGN_MAX_RETRIES = int(os.getenv("CAMPAIGN_MAX_RETRIES", "2"))
+    CAMPAIGN_RETRY_BACKOFF_SECONDS = float(os.getenv("CAMPAIGN_RETRY_BACKOFF_SECONDS", "5"))
+    CAMPAIGN_CALL_POLL_SECONDS = float(os.getenv("CAMPAIGN_CALL_POLL_SECONDS", "5"))
+    CAMPAIGN_MAX_CALL_SECONDS = float(os.getenv("CAMPAIGN_MAX_CALL_SECONDS", "3600"))
+    CALL_STATUS_CACHE_TTL_SECONDS = float(os.getenv("CALL_STATUS_CACHE_TTL_SECONDS", "2"))
+    CALL_STATUS_WEBHOOK_MAX_AGE_SECONDS = float(os.getenv("CALL_STATUS_WEBHOOK_MAX_AGE_SECONDS", "300"))
+
+    AGENT_JOB_EXECUTOR_TYPE = os.getenv("AGENT_JOB_EXECUTOR_TYPE", "process")
+    AGENT_WORKER_MODE = os.getenv("AGENT_WORKER_MODE", "embedded")  # embedded | external
+    APP_PROFILE = os.getenv("APP_PROFILE", "full")  # full | calls
+    AGENT_WORKER_PROCESSES = int(os.getenv("AGENT_WORKER_PROCESSES", "0"))
+    AGENT_WORKER_MAX_JOBS = int(os.getenv("AGENT_WORKER_MAX_JOBS", "0"))
+    AGENT_WORKER_HTTP_PORT = int(os.getenv("AGENT_WORKER_HTTP_PORT", "8081"))
 
+    TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    TTS_CACHE_DIRECTORY = os.getenv("TTS_CACHE_DIRECTORY", "tts_cache")
+    TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+    AGENT_MIN_ENDPOINTING_DELAY = float(os.getenv("AGENT_MIN_ENDPOINTING_DELAY", "0.5"))
+    AGENT_MAX_ENDPOINTING_DELAY = float(os.getenv("AGENT_MAX_ENDPOINTING_DELAY", "4.0"))
+    PARTIAL_TRANSCRIPT_RECOVERY_SECONDS = float(os.getenv("PARTIAL_TRANSCRIPT_RECOVERY_SECONDS", "3600"))
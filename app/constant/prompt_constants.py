@@ -79,4 +79,10 @@ DEFAULT_INITIAL_GREETING = "Hello {customer_name}! I'm Alex, an AI assistant, ca
 # - Deviate from debt collection topic
 
 # Remember: The end_call_tool should ONLY be used as the final action when the conversation has reached a clear conclusion.
-# """
\ No newline at end of file
+# """
+
+DEFAULT_GOODBYE_MESSAGES = [
+    "I appreciate your time today.",
+    "Thank you for speaking with me.",
+    "Have a great rest of your day!"
+]
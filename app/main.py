@@ -1,25 +1,40 @@
+from .util.startup import startup_timer
 from fastapi import FastAPI
-from twilio.rest import Client
-from livekit import api
 from contextlib import asynccontextmanager
 import logging
 from .config.config import Config
-from .service.agent import DebtCollectionAgentWorker
-from .router.agent_router import router as agent_router
-from .router.testing_router import router as testing_router
 
 logging.basicConfig(level=logging.INFO)
 
 config = Config()
 
-agent_worker = DebtCollectionAgentWorker(config=config)
+# Routers are imported one by one so the startup report shows what each costs.
+# The calls profile leaves out the prompt training subsystem (and its langchain imports).
+ROUTER_MODULES = [".router.agent_router", ".router.metrics_router", ".router.llm_proxy_router"]
+if config.APP_PROFILE != "calls":
+    ROUTER_MODULES.insert(1, ".router.testing_router")
+routers = {name: startup_timer.import_module(f"{__package__}{name}") for name in ROUTER_MODULES}
+agent_router = routers[".router.agent_router"]
+
+agent_worker = None
+if config.AGENT_WORKER_MODE == "embedded":
+    agent_module = startup_timer.import_module(f"{__package__}.service.agent")
+    agent_worker = agent_module.DebtCollectionAgentWorker(config=config)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await agent_worker.start_worker()
+    if agent_worker:
+        with startup_timer.measure("agent_worker.start", "init"):
+            await agent_worker.start_worker()
+    if config.INSIGHTS_WATCH_ENABLED:
+        agent_router.get_watcher().start()
+    startup_timer.mark_ready()
     logging.info("FastAPI app started.")
     yield
-    await agent_worker.stop_worker()
+    if agent_router.get_watcher.is_initialized():
+        await agent_router.get_watcher().stop()
+    if agent_worker:
+        await agent_worker.stop_worker()
     logging.info("FastAPI app is shutting down.")
 
 app = FastAPI(
@@ -27,13 +42,13 @@ app = FastAPI(
     title="Debt Collection Voice Agent API",
     description="API for initiating automated debt collection calls using LiveKit and Twilio.",
     version="1.0.0",
-    docs_url="/docs",   
-    redoc_url="/redoc" 
+    docs_url="/docs",
+    redoc_url="/redoc"
 )
 
-app.include_router(agent_router)
-app.include_router(testing_router)
+for module in routers.values():
+    app.include_router(module.router)
 
 @app.get("/")
 def read_root():
-    return {"message": "Debt Collection Voice Agent API is running. Go to /docs for the API explorer."}
\ No newline at end of file
+    return {"message": "Debt Collection Voice Agent API is running. Go to /docs for the API explorer."}
@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from .call_request import CallRequest
+
+class CampaignRequest(BaseModel):
+    calls: List[CallRequest]
+    calls_per_second: Optional[float] = Field(None, gt=0)  # Defaults to CAMPAIGN_CALLS_PER_SECOND
+    max_concurrent_calls: Optional[int] = Field(None, ge=1)  # Defaults to CAMPAIGN_MAX_CONCURRENT_CALLS
+    max_retries: Optional[int] = Field(None, ge=0)  # Defaults to CAMPAIGN_MAX_RETRIES
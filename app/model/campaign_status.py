@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+
+class CampaignStatus(BaseModel):
+    campaign_id: str
+    status: str = "pending"  # pending | running | completed | cancelled
+    total_calls: int = 0
+    queued: int = 0
+    in_progress: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    retries: int = 0
+    calls_per_second: float
+    max_concurrent_calls: int
+    max_retries: int
+    recent_errors: List[Dict[str, Any]] = []
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
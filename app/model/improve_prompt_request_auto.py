@@ -1,8 +1,10 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
 from .persona_spec import PersonaSpec
 
 class ImprovePromptRequestAuto(BaseModel):
     base_agent_prompt: str
     persona_names: List[str]
-    max_turns: Optional[int] = 8
\ No newline at end of file
+    max_turns: Optional[int] = 8
+    concurrency: Optional[int] = Field(None, ge=1)  # Defaults to TRAINING_CONCURRENCY
+    memory_strategy: Optional[Literal["buffer", "window", "summary"]] = None  # Defaults to SIMULATION_MEMORY_STRATEGY
\ No newline at end of file
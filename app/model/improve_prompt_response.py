@@ -6,4 +6,6 @@ class ImprovePromptResponse(BaseModel):
     transcripts: List[List[Dict[str, str]]]
     metrics: List[Dict[str, Any]]
     improved_prompts: List[str]
-    final_improved_prompt: str
\ No newline at end of file
+    final_improved_prompt: str
+    prompt_token_counts: List[List[int]] = []  # Per persona, the prompt tokens of each transcript entry
+    llm_usage: Dict[str, Any] = {}  # LLM calls, tokens and seconds of the run, in total and per call site
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+class InsightRecord(BaseModel):
+    source_file: str
+    category: str  # HIGH | MEDIUM | LOW | ANALYSIS_FAILED
+    justification: Optional[str] = None
+    model_used: Optional[str] = None
+    analyzed_at: str
+    customer_name: Optional[str] = None
+    phone_number: Optional[str] = None
+    card_number_ending: Optional[str] = None
+    amount_due: Optional[float] = None
+
+class InsightsPage(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    items: List[InsightRecord] = []
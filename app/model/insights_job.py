@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+
+class InsightsJob(BaseModel):
+    job_id: str
+    status: str = "pending"  # pending | running | completed | failed
+    total_files: int = 0
+    processed_files: int = 0
+    failed_files: int = 0
+    risk_counts: Dict[str, int] = {'MEDIUM': 0, 'LOW': 0, 'HIGH': 0}
+    stats: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+
+class OptimizationRound(BaseModel):
+    round: int
+    prompt: str
+    score: Optional[float] = None  # Mean of the per-field scores, None if no persona was evaluated
+    scores: Dict[str, float] = {}  # Mean of each EvalMetrics score field over the personas
+    metrics: List[Dict[str, Any]] = []
+    improved: bool = False
+    llm_calls: int = 0
+    tokens: int = 0  # Prompt and completion tokens spent on the round
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
+from .persona_spec import PersonaSpec
+
+class OptimizePromptRequest(BaseModel):
+    base_agent_prompt: str
+    personas: List[PersonaSpec]
+    max_turns: Optional[int] = 8
+    concurrency: Optional[int] = Field(None, ge=1)  # Defaults to TRAINING_CONCURRENCY
+    memory_strategy: Optional[Literal["buffer", "window", "summary"]] = None  # Defaults to SIMULATION_MEMORY_STRATEGY
+    max_rounds: Optional[int] = Field(None, ge=1)  # Defaults to OPTIMIZER_MAX_ROUNDS
+    max_llm_calls: Optional[int] = Field(None, ge=0)  # Defaults to OPTIMIZER_MAX_LLM_CALLS, 0 for no limit
+    max_tokens: Optional[int] = Field(None, ge=0)  # Defaults to OPTIMIZER_MAX_TOKENS, 0 for no limit
+    patience: Optional[int] = Field(None, ge=1)  # Defaults to OPTIMIZER_PATIENCE
+    min_improvement: Optional[float] = Field(None, ge=0)  # Defaults to OPTIMIZER_MIN_IMPROVEMENT
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from .optimization_round import OptimizationRound
+
+class OptimizePromptResponse(BaseModel):
+    run_id: str
+    best_prompt: str
+    best_score: Optional[float] = None
+    best_round: Optional[int] = None
+    rounds: List[OptimizationRound]
+    stop_reason: str  # max_rounds | plateau | budget | converged
+    usage: Dict[str, Any]  # LLM calls, tokens and seconds, in total and per call site
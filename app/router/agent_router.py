@@ -1,14 +1,26 @@
 import uuid
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Request
 from livekit import api
-from twilio.rest import Client
 from ..config.config import Config
+from ..util.startup import lazy_singleton
 from ..service.main_service import MainService
 from ..service.summarize_transcript_service import InsightsService
+from ..service.insights_job_service import InsightsJobService
+from ..service.insights_watcher_service import InsightsWatcher
+from ..service.campaign_service import CampaignService, parse_calls_file
+from ..service.room_state_service import RoomStateCache
 from ..model.call_request import CallRequest
 from ..model.call_response import CallResponse
-from ..constant.prompt_constants import DEFAULT_AGENT_INSTRUCTIONS
+from ..model.call_status_request import CallStatusRequest
+from ..model.insights_job import InsightsJob
+from ..model.insight_record import InsightsPage
+from ..model.campaign_request import CampaignRequest
+from ..model.campaign_status import CampaignStatus
+from ..model.phone_validation_request import PhoneValidationRequest
 
 router = APIRouter(
     prefix="/api",
@@ -16,13 +28,51 @@ router = APIRouter(
 )
 
 config = Config()
-main_service = MainService()
-insights_service = InsightsService()
-twilio_client = Client(
-    username=config.TWILIO_ACCOUNT_SID, 
-    password=config.TWILIO_AUTH_TOKEN)
 
-livekit_api = api.LiveKitAPI(config.LIVEKIT_URL, config.LIVEKIT_API_KEY, config.LIVEKIT_API_SECRET)
+# Services and clients are built on first use, so importing the router stays cheap
+@lazy_singleton("agent_router.main_service")
+def get_main_service() -> MainService:
+    return MainService()
+
+@lazy_singleton("agent_router.insights_service")
+def get_insights_service() -> InsightsService:
+    return InsightsService()
+
+@lazy_singleton("agent_router.insights_job_service")
+def get_insights_job_service() -> InsightsJobService:
+    return InsightsJobService(get_insights_service())
+
+@lazy_singleton("agent_router.insights_watcher")
+def get_watcher() -> InsightsWatcher:
+    return InsightsWatcher(get_insights_service())
+
+@lazy_singleton("agent_router.twilio_client")
+def get_twilio_client():
+    from twilio.rest import Client
+    return Client(
+        username=config.TWILIO_ACCOUNT_SID,
+        password=config.TWILIO_AUTH_TOKEN)
+
+@lazy_singleton("agent_router.livekit_api")
+def get_livekit_api() -> api.LiveKitAPI:
+    # Needs the running event loop, so it cannot be built at import time
+    return api.LiveKitAPI(config.LIVEKIT_URL, config.LIVEKIT_API_KEY, config.LIVEKIT_API_SECRET)
+
+@lazy_singleton("agent_router.campaign_service")
+def get_campaign_service() -> CampaignService:
+    return CampaignService(get_main_service(), get_livekit_api(), get_room_state_cache(), config)
+
+@lazy_singleton("agent_router.room_state_cache")
+def get_room_state_cache() -> RoomStateCache:
+    return RoomStateCache(
+        get_livekit_api(),
+        ttl_seconds=config.CALL_STATUS_CACHE_TTL_SECONDS,
+        webhook_max_age_seconds=config.CALL_STATUS_WEBHOOK_MAX_AGE_SECONDS
+    )
+
+@lazy_singleton("agent_router.webhook_receiver")
+def get_webhook_receiver() -> api.WebhookReceiver:
+    return api.WebhookReceiver(api.TokenVerifier(config.LIVEKIT_API_KEY, config.LIVEKIT_API_SECRET))
 
 @router.post("/initiate/call", response_model=CallResponse)
 async def initiate_call(request: CallRequest):
@@ -31,19 +81,16 @@ async def initiate_call(request: CallRequest):
     It creates a LiveKit room, and then uses Twilio to dial out and connect the call to the room.
     """
     try:
+        main_service = get_main_service()
+        livekit_api = get_livekit_api()
         call_id = str(uuid.uuid4())
-        room_name = f"debt-collection-{request.phone_number.replace('+', '')}"
+        room_name = main_service.build_room_name(request.phone_number)
         logging.info(f"Initiating call to {request.phone_number} in room {room_name}")
 
-        enhanced_instructions = DEFAULT_AGENT_INSTRUCTIONS. \
-        replace("{customer_name}", request.customer_name). \
-        replace("{amount_due}", f"{request.amount_due}"). \
-        replace("{card_number_ending}", request.card_number_ending) 
-
         livekit_result = await main_service.create_livekit_room_and_dispatch_agent(
             room_name=room_name, 
             request=request,
-            agent_instructions=request.agent_instructions or enhanced_instructions,
+            agent_instructions=main_service.build_agent_instructions(request),
             livekit_api=livekit_api
         )
         
@@ -77,6 +124,92 @@ async def initiate_call(request: CallRequest):
         logging.error(f"Error initiating call: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/validate/phone-number/{phone_number}")
+async def validate_phone_number(phone_number: str):
+    """
+    Check whether a number belongs to the Twilio account (owned number or verified caller id).
+    """
+    is_valid = await get_main_service().validate_phone_number(phone_number, get_twilio_client())
+    return {"phone_number": phone_number, "valid": is_valid}
+
+@router.post("/validate/phone-numbers")
+async def validate_phone_numbers(request: PhoneValidationRequest):
+    """
+    Validate a list of numbers in bulk and warm the validation cache with the results.
+    """
+    try:
+        results = await get_main_service().warm_validation_cache(request.phone_numbers, get_twilio_client())
+        return {"status": "success", "results": results}
+    except Exception as e:
+        logging.error(f"Error validating phone numbers: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/campaigns", response_model=CampaignStatus)
+async def start_campaign(request: CampaignRequest):
+    """
+    Start an outbound calling campaign for a batch of calls.
+    Calls are placed in the background, within the campaign's calls-per-second and concurrent-call limits.
+    """
+    if not request.calls:
+        raise HTTPException(status_code=400, detail="Campaign has no calls")
+    return get_campaign_service().start_campaign(
+        calls=request.calls,
+        calls_per_second=request.calls_per_second,
+        max_concurrent_calls=request.max_concurrent_calls,
+        max_retries=request.max_retries
+    )
+
+@router.post("/campaigns/upload", response_model=CampaignStatus)
+async def upload_campaign(
+    file: UploadFile = File(...),
+    calls_per_second: Optional[float] = Query(None, gt=0),
+    max_concurrent_calls: Optional[int] = Query(None, ge=1),
+    max_retries: Optional[int] = Query(None, ge=0)
+):
+    """
+    Start an outbound calling campaign from a CSV (with a header row) or JSONL upload of call requests.
+    """
+    content = (await file.read()).decode("utf-8-sig")
+    try:
+        calls = parse_calls_file(file.filename or "", content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not calls:
+        raise HTTPException(status_code=400, detail="Campaign has no calls")
+    return get_campaign_service().start_campaign(
+        calls=calls,
+        calls_per_second=calls_per_second,
+        max_concurrent_calls=max_concurrent_calls,
+        max_retries=max_retries
+    )
+
+@router.get("/campaigns", response_model=List[CampaignStatus])
+async def list_campaigns():
+    """
+    List recent campaigns, newest first.
+    """
+    return get_campaign_service().list_campaigns()
+
+@router.get("/campaigns/{campaign_id}", response_model=CampaignStatus)
+async def get_campaign(campaign_id: str):
+    """
+    Get the progress counters of a campaign.
+    """
+    campaign = get_campaign_service().get_campaign(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail=f"Campaign {campaign_id} not found")
+    return campaign
+
+@router.post("/campaigns/{campaign_id}/cancel", response_model=CampaignStatus)
+async def cancel_campaign(campaign_id: str):
+    """
+    Stop dialing the remaining calls of a campaign. Calls already connected are not hung up.
+    """
+    campaign = get_campaign_service().cancel_campaign(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail=f"Campaign {campaign_id} not found")
+    return campaign
+
 @router.get("/call-status/{room_name}")
 async def get_call_status(room_name: str):
     """
@@ -84,7 +217,7 @@ async def get_call_status(room_name: str):
     """
     try:
         room_request = api.ListRoomsRequest(names=[room_name])
-        rooms = await livekit_api.room.list_rooms(room_request)
+        rooms = await get_livekit_api().room.list_rooms(room_request)
         
         if not rooms.rooms:
             return {"status": "not_found", "message": "Room not found"}
@@ -92,7 +225,7 @@ async def get_call_status(room_name: str):
         room = rooms.rooms[0]
         
         participants_request = api.ListParticipantsRequest(room=room_name)
-        participants = await livekit_api.room.list_participants(participants_request)
+        participants = await get_livekit_api().room.list_participants(participants_request)
         
         return {
             "status": "active" if room.num_participants > 0 else "empty",
@@ -105,6 +238,31 @@ async def get_call_status(room_name: str):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@router.post("/call-status")
+async def get_call_statuses(request: CallStatusRequest):
+    """
+    Get the status of many calls at once, keyed by room name.
+    Served from a room state cache kept current by LiveKit webhooks (see /livekit/webhook); rooms without
+    a fresh entry are looked up with a single list_rooms request.
+    """
+    try:
+        return {"rooms": await get_room_state_cache().get_statuses(request.room_names)}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@router.post("/livekit/webhook")
+async def livekit_webhook(request: Request):
+    """
+    Receives LiveKit webhooks (configure the server to send them here) and updates the room state cache.
+    """
+    body = (await request.body()).decode("utf-8")
+    try:
+        event = get_webhook_receiver().receive(body, request.headers.get("Authorization", ""))
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=f"Invalid webhook: {e}")
+    get_room_state_cache().apply_event(event)
+    return {"status": "ok"}
+
 @router.post("/hangup/{room_name}")
 async def hangup_call(room_name: str):
     """
@@ -112,7 +270,7 @@ async def hangup_call(room_name: str):
     """
     try:
         delete_request = api.DeleteRoomRequest(room=room_name)
-        await livekit_api.room.delete_room(delete_request)
+        await get_livekit_api().room.delete_room(delete_request)
         
         return {"status": "success", "message": f"Call in room {room_name} ended"}
         
@@ -123,27 +281,97 @@ async def hangup_call(room_name: str):
 async def test_dispatch(room_name: str):
     try:
         room_request = api.CreateRoomRequest(name=room_name)
-        room = await livekit_api.room.create_room(room_request)
+        room = await get_livekit_api().room.create_room(room_request)
         
         dispatch_request = api.CreateAgentDispatchRequest(
             room=room_name,
             agent_name="debt-collection-agent"
         )
-        dispatch = await livekit_api.agent_dispatch.create_dispatch(dispatch_request)
+        dispatch = await get_livekit_api().agent_dispatch.create_dispatch(dispatch_request)
         
         return {"success": True, "room": room.name, "dispatch": dispatch.id}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 @router.get("/generate/insights")
-async def generate_insights():
+async def generate_insights(reprocess: bool = False):
     """
-    Generate insights from all transcript files in the source directory.
+    Start a background job generating insights from all transcript files in the source directory.
+    With reprocess=true, already processed transcripts are re-scored (served from the analysis cache when unchanged).
+    Poll /generate/insights/jobs/{job_id} for progress, partial risk counts and the final result.
     """
     try:
-        batch_insights = insights_service.generate()
-        return {"status": "success", "Batch Insights" : batch_insights}
+        job = get_insights_job_service().start_job(reprocess=reprocess)
+        return {"status": "accepted", "job_id": job.job_id, "job_status": job.status}
         
     except Exception as e:
         logging.error(f"Error generating insights: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/generate/insights/jobs", response_model=List[InsightsJob])
+async def list_insights_jobs():
+    """
+    List recent insights jobs, newest first.
+    """
+    return get_insights_job_service().list_jobs()
+
+@router.get("/generate/insights/jobs/{job_id}", response_model=InsightsJob)
+async def get_insights_job(job_id: str):
+    """
+    Get the progress, partial risk counts and final result of an insights job.
+    """
+    job = get_insights_job_service().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Insights job {job_id} not found")
+    return job
+
+@router.get("/generate/insights/watcher")
+async def get_insights_watcher():
+    """
+    Status of the background watcher analyzing new transcripts (enabled with INSIGHTS_WATCH_ENABLED).
+    """
+    return get_watcher().snapshot()
+
+@router.get("/insights", response_model=InsightsPage)
+async def list_insights(
+    category: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    phone_number: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Page through indexed insights, newest first, filtered by risk category, analysis time range
+    (since inclusive, until exclusive) and customer phone number.
+    """
+    return await asyncio.to_thread(
+        get_insights_service().index.query,
+        category=category.upper() if category else None,
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+        phone_number=phone_number,
+        limit=limit,
+        offset=offset,
+    )
+
+@router.get("/insights/summary")
+async def get_insights_summary(since: Optional[datetime] = None, until: Optional[datetime] = None, by_day: bool = False):
+    """
+    Risk distribution of indexed insights in the time range: insights and distinct customers per category,
+    failed analyses, and with by_day=true a per-day breakdown.
+    """
+    return await asyncio.to_thread(
+        get_insights_service().index.summary,
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+        by_day=by_day,
+    )
+
+@router.post("/insights/reindex")
+async def reindex_insights():
+    """
+    Index the insight files already in the destination directory, e.g. those written before the index existed.
+    """
+    indexed = await asyncio.to_thread(get_insights_service().reindex)
+    return {"indexed": indexed}
@@ -0,0 +1,111 @@
+import logging
+from contextlib import AsyncExitStack
+
+import anyio
+import httpx
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+from ..config.config import Config
+from ..service.llm_gateway import get_llm_gateway, PRIORITY_CLASSES, PRIORITY_HEADER
+
+logger = logging.getLogger("llm-proxy-router")
+logger.setLevel(logging.INFO)
+
+router = APIRouter(
+    prefix="/llm",
+    tags=["llm"],
+)
+
+# Hop-by-hop and length headers are recomputed for the proxied response
+EXCLUDED_RESPONSE_HEADERS = {"content-length", "transfer-encoding", "connection", "content-encoding", "keep-alive"}
+
+config = Config()
+gateway = get_llm_gateway()
+proxy_client = httpx.AsyncClient(timeout=httpx.Timeout(config.LLM_PROXY_TIMEOUT_SECONDS, connect=5))
+
+@router.get("/{path:path}")
+async def proxy_get(path: str):
+    """
+    Forward read-only Ollama / OpenAI-compatible requests (e.g. /api/tags, /v1/models) to a backend, without admission control.
+    """
+    try:
+        backend = gateway.pick()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    try:
+        response = await proxy_client.get(f"{backend.url}/{path}")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"LLM backend {backend.url} unavailable: {e}")
+    return Response(
+        content=response.content,
+        status_code=response.status_code,
+        media_type=response.headers.get("content-type"),
+    )
+
+@router.post("/{path:path}")
+async def proxy_post(path: str, request: Request):
+    """
+    Forward an LLM request (/api/generate, /api/chat, /v1/chat/completions, ...) through the LLM gateway.
+    The X-LLM-Priority header (live, simulation or batch; default batch) sets its admission class, so live
+    calls are served ahead of training and insights jobs. Streaming responses are relayed as they arrive,
+    and the backend slot is held until the stream ends or the client disconnects. Returns 503 when no
+    backend is left to try.
+    """
+    priority = request.headers.get(PRIORITY_HEADER, "batch").lower()
+    if priority not in PRIORITY_CLASSES:
+        raise HTTPException(status_code=400, detail=f"{PRIORITY_HEADER} must be one of {list(PRIORITY_CLASSES)}")
+    body = await request.body()
+    headers = {"content-type": request.headers.get("content-type", "application/json")}
+    if "authorization" in request.headers:
+        headers["authorization"] = request.headers["authorization"]
+
+    tried = []
+    while True:
+        stack = AsyncExitStack()
+        try:
+            backend = await stack.enter_async_context(gateway.acquire(exclude=tried, priority=priority))
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        try:
+            upstream = await proxy_client.send(
+                proxy_client.build_request("POST", f"{backend.url}/{path}", content=body, headers=headers),
+                stream=True,
+            )
+            stack.push_async_callback(upstream.aclose)
+            if upstream.status_code >= 500:
+                await upstream.aread()
+                upstream.raise_for_status()
+        except Exception as e:
+            await stack.aclose()
+            if not gateway.is_retryable(e):
+                raise HTTPException(status_code=502, detail=f"LLM backend {backend.url} failed: {e}")
+            gateway.record_failure(backend, e)
+            tried.append(backend)
+            if not gateway.candidates(exclude=tried):
+                raise HTTPException(status_code=502, detail=f"All LLM backends failed: {e}")
+            logger.warning(f"Proxied LLM request to {backend.url} failed, failing over: {e}")
+            continue
+        gateway.record_success(backend)
+        break
+
+    async def release():
+        # Shielded, since a client disconnect cancels the response while the upstream is being closed
+        with anyio.CancelScope(shield=True):
+            await stack.aclose()
+
+    async def relay():
+        try:
+            async for chunk in upstream.aiter_bytes():
+                yield chunk
+        finally:
+            await release()
+
+    return StreamingResponse(
+        relay(),
+        status_code=upstream.status_code,
+        headers={k: v for k, v in upstream.headers.items() if k.lower() not in EXCLUDED_RESPONSE_HEADERS},
+        # Also runs when the client went away before the stream started, where relay's finally never runs
+        background=BackgroundTask(release),
+    )
@@ -0,0 +1,52 @@
+import asyncio
+from fastapi import APIRouter
+
+from ..config.config import Config
+from ..service.latency_service import LatencyMetricsService
+from ..service.llm_accounting import llm_usage_stats
+from ..service.llm_gateway import get_llm_gateway
+from ..util.startup import startup_timer
+
+router = APIRouter(
+    prefix="/api/metrics",
+    tags=["metrics"],
+)
+
+config = Config()
+latency_metrics_service = LatencyMetricsService(config)
+
+@router.get("/latency")
+async def get_latency_metrics():
+    """
+    Per-stage voice pipeline latency percentiles (p50/p95/p99) and histograms across recorded calls:
+    STT transcription delay, end-of-utterance delay, LLM time-to-first-token, TTS time-to-first-byte
+    and the resulting end-to-end response latency, alongside the configured endpointing delays.
+    """
+    return await asyncio.to_thread(latency_metrics_service.snapshot)
+
+@router.get("/llm-backends")
+async def get_llm_backend_metrics():
+    """
+    Health, in-flight requests, pinned live calls and failure counts of each LLM backend, as seen by the API process.
+    """
+    return get_llm_gateway().snapshot()
+
+@router.get("/llm-usage")
+async def get_llm_usage_metrics():
+    """
+    LLM calls, prompt and completion tokens and latency per call site: training chains and insights analyses
+    made by this process since startup, and the live agent's LLM across recorded calls, with the calls that
+    used the most tokens.
+    """
+    agent_usage = await asyncio.to_thread(latency_metrics_service.llm_usage_snapshot)
+    return {
+        "call_sites": {**llm_usage_stats.snapshot(), **agent_usage["call_sites"]},
+        "top_rooms": agent_usage["top_rooms"],
+    }
+
+@router.get("/startup")
+async def get_startup_metrics():
+    """
+    Time spent importing each router and module and building each service, at startup and lazily on first use.
+    """
+    return startup_timer.report()
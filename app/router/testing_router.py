@@ -1,11 +1,18 @@
 import uuid
+import json
+import asyncio
 import logging
-from fastapi import APIRouter
+from typing import Any, AsyncIterator, Dict, List, Optional
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
 
-from ..service.testing_service import TestingService
+from ..util.startup import lazy_singleton
+from ..service.llm_accounting import metered_usage
 from ..model.improve_prompt_request import ImprovePromptRequest
 from ..model.improve_prompt_response import ImprovePromptResponse
 from ..model.improve_prompt_request_auto import ImprovePromptRequestAuto
+from ..model.optimize_prompt_request import OptimizePromptRequest
+from ..model.optimize_prompt_response import OptimizePromptResponse
 
 router = APIRouter(
     prefix="/testing",
@@ -15,77 +22,164 @@ router = APIRouter(
 logger = logging.getLogger("testing-router")
 logging.basicConfig(level=logging.INFO)
 
-testing_service = TestingService()
+STREAM_QUEUE_SIZE = 1000
+STREAM_KEEPALIVE_SECONDS = 15
 
-@router.post("/train/prompt", response_model=ImprovePromptResponse, summary="Train and improve the agent prompt based on simulated conversations and evaluations.")
-async def train_prompt(req: ImprovePromptRequest):
-    run_id = str(uuid.uuid4())
-    
-    improved_prompts = []
-    transcripts = []
-    all_metrics = []
-    
-    for persona in req.personas:
-        logger.info(f"Starting simulation for persona: {persona.name}")
-        transcript = await testing_service.run_simulation(
-            req.base_agent_prompt, 
-            persona.persona_prompt, 
-            req.max_turns
+@lazy_singleton("testing_router.testing_service")
+def get_testing_service():
+    # Imported here as it pulls in langchain, which most processes never need
+    from ..service.testing_service import TestingService
+    return TestingService()
+
+async def run_training(run_id: str, base_agent_prompt: str, persona_prompts: List[str], max_turns: int, concurrency: Optional[int], memory_strategy: Optional[str]) -> ImprovePromptResponse:
+    # Built off the event loop, since the first call imports langchain
+    testing_service = await asyncio.to_thread(get_testing_service)
+    with metered_usage() as meter:
+        results = await testing_service.run_persona_pipelines(
+            base_agent_prompt,
+            persona_prompts,
+            max_turns,
+            concurrency,
+            memory_strategy
         )
-        transcripts.append(transcript)
-
-        metrics = await testing_service.evaluate_conversation(transcript)
-        all_metrics.append(metrics)
-        
-        improved_prompt = await testing_service.rewrite_prompt_text(
-            req.base_agent_prompt, 
-            metrics.get('recommended_prompt_edits')
+
+        transcripts = [result["transcript"] for result in results]
+        all_metrics = [result["metrics"] for result in results]
+        improved_prompts = [result["improved_prompt"] for result in results]
+
+        final_improved_prompt = await testing_service.combine_prompt_revisions(
+            base_agent_prompt,
+            [prompt for prompt in improved_prompts if prompt]
         )
-        improved_prompts.append(improved_prompt)
-    
-    final_improved_prompt = await testing_service.combine_prompt_revisions(req.base_agent_prompt,improved_prompts)
-    
+
     return ImprovePromptResponse(
         run_id=run_id,
         transcripts=transcripts,
         metrics=all_metrics,
         improved_prompts=improved_prompts,
-        final_improved_prompt=final_improved_prompt
+        final_improved_prompt=final_improved_prompt,
+        prompt_token_counts=[result["prompt_tokens"] for result in results],
+        llm_usage=meter.snapshot()
+    )
+
+@router.post("/train/prompt", response_model=ImprovePromptResponse, summary="Train and improve the agent prompt based on simulated conversations and evaluations.")
+async def train_prompt(req: ImprovePromptRequest):
+    run_id = str(uuid.uuid4())
+    logger.info(f"Starting training run {run_id} for personas: {[persona.name for persona in req.personas]}")
+
+    return await run_training(
+        run_id,
+        req.base_agent_prompt,
+        [persona.persona_prompt for persona in req.personas],
+        req.max_turns,
+        req.concurrency,
+        req.memory_strategy
     )
 
 @router.post("/train/prompt/auto", response_model=ImprovePromptResponse, description="Automatically generates personas and runs simulations to improve the agent prompt.")
 async def train_prompt_auto(req: ImprovePromptRequestAuto):
     run_id = str(uuid.uuid4())
 
-    personas = await testing_service.generate_personas(req.persona_names)
-    
-    improved_prompts = []
-    transcripts = []
-    all_metrics = []
-    
-    for persona in personas:
-        transcript = await testing_service.run_simulation(
-            req.base_agent_prompt, 
-            persona, 
-            req.max_turns
-        )
-        transcripts.append(transcript)
-
-        metrics = await testing_service.evaluate_conversation(transcript)
-        all_metrics.append(metrics)
-        
-        improved_prompt = await testing_service.rewrite_prompt_text(
-            req.base_agent_prompt, 
-            metrics.get('recommended_prompt_edits')
+    testing_service = await asyncio.to_thread(get_testing_service)
+    # Persona generation counts towards the run's LLM usage
+    with metered_usage():
+        personas = await testing_service.generate_personas(req.persona_names)
+
+        return await run_training(
+            run_id,
+            req.base_agent_prompt,
+            personas,
+            req.max_turns,
+            req.concurrency,
+            req.memory_strategy
         )
-        improved_prompts.append(improved_prompt)
-    
-    final_improved_prompt = await testing_service.combine_prompt_revisions(req.base_agent_prompt,improved_prompts)
-    
-    return ImprovePromptResponse(
-        run_id=run_id,
-        transcripts=transcripts,
-        metrics=all_metrics,
-        improved_prompts=improved_prompts,
-        final_improved_prompt=final_improved_prompt
-    )
\ No newline at end of file
+
+@router.post("/train/prompt/optimize", response_model=OptimizePromptResponse, summary="Iteratively improve the agent prompt, re-evaluating each candidate, within a compute budget.")
+async def optimize_prompt(req: OptimizePromptRequest):
+    run_id = str(uuid.uuid4())
+    logger.info(f"Starting optimization run {run_id} for personas: {[persona.name for persona in req.personas]}")
+
+    testing_service = await asyncio.to_thread(get_testing_service)
+    from ..service.prompt_optimizer_service import PromptOptimizer
+    result = await PromptOptimizer(testing_service).optimize(
+        req.base_agent_prompt,
+        [persona.persona_prompt for persona in req.personas],
+        req.max_turns,
+        req.concurrency,
+        req.memory_strategy,
+        max_rounds=req.max_rounds,
+        max_llm_calls=req.max_llm_calls,
+        max_tokens=req.max_tokens,
+        patience=req.patience,
+        min_improvement=req.min_improvement
+    )
+    return OptimizePromptResponse(run_id=run_id, **result)
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_training(request: Request, run_id: str, req: ImprovePromptRequest) -> AsyncIterator[str]:
+    """
+    Runs a training job and yields its progress as Server-Sent Events while it is produced: "run_started",
+    then per persona "token", "turn", "metrics", "improved_prompt" (or "persona_failed"), then
+    "final_prompt" and "done" (with the run's LLM usage), or "error" if the run fails. Transcripts are
+    streamed, not accumulated.
+    The queue is bounded, so a slow client slows the run down instead of growing memory.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+
+    async def emit(event: str, data: Dict[str, Any]):
+        await queue.put(format_sse(event, {"run_id": run_id, **data}))
+
+    async def produce():
+        try:
+            with metered_usage() as meter:
+                await emit("run_started", {"personas": [persona.name for persona in req.personas]})
+                testing_service = await asyncio.to_thread(get_testing_service)
+                results = await testing_service.run_persona_pipelines(
+                    req.base_agent_prompt,
+                    [persona.persona_prompt for persona in req.personas],
+                    req.max_turns,
+                    req.concurrency,
+                    req.memory_strategy,
+                    on_event=emit
+                )
+                final_improved_prompt = await testing_service.combine_prompt_revisions(
+                    req.base_agent_prompt,
+                    [result["improved_prompt"] for result in results if result["improved_prompt"]]
+                )
+            await emit("final_prompt", {"prompt": final_improved_prompt})
+            await emit("done", {"llm_usage": meter.snapshot()})
+        except Exception as e:
+            logger.error(f"Streaming training run {run_id} failed: {e}", exc_info=True)
+            await emit("error", {"error": str(e)})
+        # Not in a finally: once cancelled, nobody reads the queue, and a put on a full queue would never return
+        await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if message is None:
+                break
+            yield message
+    finally:
+        # Stops the simulations when the client goes away
+        producer.cancel()
+
+@router.post("/train/prompt/stream", summary="Train the agent prompt, streaming turns, metrics and improved prompts as Server-Sent Events.")
+async def train_prompt_stream(req: ImprovePromptRequest, request: Request):
+    run_id = str(uuid.uuid4())
+    logger.info(f"Starting streaming training run {run_id} for personas: {[persona.name for persona in req.personas]}")
+
+    return StreamingResponse(
+        stream_training(request, run_id, req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -2,6 +2,7 @@ import json
 import asyncio
 import logging
 import os
+import time
 import aiofiles
 
 from httpx import Timeout
@@ -11,33 +12,84 @@ from livekit.agents import (
     Agent,
     AgentSession,
     JobContext,
+    JobProcess,
+    JobExecutorType,
     WorkerOptions,
     function_tool,
-    Worker
+    Worker,
+    llm,
 )
 from livekit.plugins import openai, silero, deepgram, elevenlabs
 from livekit import api
+from openai import AsyncClient as OpenAIAsyncClient
 # from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
 from ..config.config import Config
-from ..constant.prompt_constants import DEFAULT_AGENT_INSTRUCTIONS, DEFAULT_INITIAL_GREETING
+from ..constant.prompt_constants import DEFAULT_AGENT_INSTRUCTIONS, DEFAULT_INITIAL_GREETING, DEFAULT_GOODBYE_MESSAGES
+from .tts_cache_service import TTSAudioCache
+from .agent_resources import AgentResources, get_agent_resources
+from .latency_service import CallLatencyRecorder, LATENCY_FILE_PREFIX
+from .transcript_store import TranscriptWriter, recover_partial_transcripts
+from .llm_gateway import PRIORITY_HEADER
 
 logger = logging.getLogger("agent")
 logger.setLevel(logging.INFO)
 
 
 class DebtCollectionAgent:
-    def __init__(self):
+    def __init__(self, resources: AgentResources = None):
+        self.resources = resources or get_agent_resources()
         self.instructions = None
         self.job_context = None
         self.session = None
-        self.config = Config()
-        os.makedirs(os.path.join(os.sep, self.config.SOURCE_DIRECTORY), exist_ok=True)
-        os.makedirs(os.path.join(os.sep, self.config.DESTINATION_DIRECTORY), exist_ok=True)
-        os.makedirs(os.path.join(os.sep, self.config.PROCESSED_DIRECTORY), exist_ok=True)
+        self.call_metrics = {}
+        self.latency_recorder = CallLatencyRecorder()
+        self.tts = None
+        self.warm_task = None
+        self.config = self.resources.config
+        self.voice_id = self.resources.voice_id
+        self.gateway = self.resources.gateway
+        self.tts_cache = self.resources.tts_cache
+
+    def build_llm(self, primary_backend):
+        """
+        Builds the call's LLM on the backend the call is pinned to, falling back to the other
+        backends (healthy and least loaded first) if it stops answering.
+        """
+        backends = [primary_backend] + [b for b in self.gateway.ranked() if b is not primary_backend]
+        llms = [
+            openai.LLM(
+                model=self.config.MODEL_NAME,
+                base_url=f"{backend.url}/v1",
+                api_key=self.config.MODEL_KEY,
+                timeout=Timeout(60),
+                temperature=0.3,
+            )
+            for backend in backends
+        ]
+        if len(llms) == 1:
+            return llms[0]
+        return llm.FallbackAdapter(llms, attempt_timeout=self.config.MODEL_BACKEND_ATTEMPT_TIMEOUT_SECONDS)
+
+    def build_proxied_llm(self):
+        """
+        Builds the call's LLM on the API's LLM proxy, tagged as live traffic so it is admitted ahead of
+        batch and simulation requests sharing the same backends.
+        """
+        return openai.LLM(
+            model=self.config.MODEL_NAME,
+            client=OpenAIAsyncClient(
+                base_url=f"{self.config.LLM_PROXY_URL.rstrip('/')}/v1",
+                api_key=self.config.MODEL_KEY,
+                default_headers={PRIORITY_HEADER: "live"},
+                timeout=Timeout(60),
+            ),
+            temperature=0.3,
+        )
 
     async def start(self, ctx: JobContext):
         await ctx.connect()
+        connected_at = time.perf_counter()
         self.job_context = ctx
 
         metadata = json.loads(ctx.job.metadata or "{}")
@@ -46,35 +98,91 @@ class DebtCollectionAgent:
         if instructions is None:
             instructions = DEFAULT_AGENT_INSTRUCTIONS
 
+        started_at = datetime.now().strftime("%Y%m%d_%H%M%S")
+        cust_info = {
+            "customer_name": metadata.get("customer_name", "N/A"),
+            "phone_number": metadata.get("phone_number", "N/A"),
+            "card_number_ending": metadata.get("card_number_ending", "N/A"),
+            "amount_due": metadata.get("amount_due", "N/A")
+        }
+        transcript_writer = TranscriptWriter(self.config.SOURCE_DIRECTORY, ctx.room.name, cust_info, started_at)
+
+        async def finalize_transcript():
+            self.call_metrics["llm_usage"] = self.latency_recorder.llm_usage()
+            filename = transcript_writer.finalize(self.call_metrics)
+            print(f"Transcript for {ctx.room.name} saved to {filename}")
+
+            latency_filename = os.path.join(self.config.LATENCY_DIRECTORY, f"{LATENCY_FILE_PREFIX}{ctx.room.name}_{started_at}.json")
+            latency_data = {
+                "room_name": ctx.room.name,
+                "call_metrics": self.call_metrics,
+                **self.latency_recorder.summary()
+            }
+            async with aiofiles.open(latency_filename, "w") as f:
+                await f.write(json.dumps(latency_data))
+
+        ctx.add_shutdown_callback(finalize_transcript)
+        ctx.add_shutdown_callback(self.resources.aclose)
+
+        if self.config.LLM_PROXY_URL:
+            session_llm = self.build_proxied_llm()
+        else:
+            llm_backend = self.gateway.open_session(ctx.room.name)
+
+            async def release_llm_backend():
+                self.gateway.close_session(llm_backend)
+
+            ctx.add_shutdown_callback(release_llm_backend)
+            session_llm = self.build_llm(llm_backend)
+
         agent = Agent(
             instructions=instructions,
             # tools=[self.end_call_tool]
         )
 
+        self.tts = elevenlabs.TTS(
+            api_key=self.config.ELEVENLABS_API_KEY,
+            model=self.config.ELEVENLABS_MODEL,
+            voice_id=self.voice_id
+        )
+
         session = AgentSession(
             stt=deepgram.STT(
                 api_key=self.config.DEEPGRAM_API_KEY,
                 model="nova-3",
                 language="multi"
             ),
-            llm=openai.LLM(
-                model=self.config.MODEL_NAME,
-                base_url=self.config.MODEL_BASE_URL,
-                api_key=self.config.MODEL_KEY,
-                timeout=Timeout(60),
-                temperature=0.3,  
-            ),
-            tts=elevenlabs.TTS(
-                api_key=self.config.ELEVENLABS_API_KEY,
-                model="eleven_turbo_v2"
-            ),
-            vad=silero.VAD.load(),
+            llm=session_llm,
+            tts=self.tts,
+            vad=self.resources.vad or silero.VAD.load(),
             # turn_detector=MultilingualModel(),
-            min_endpointing_delay=0.5,
-            max_endpointing_delay=4.0,
+            min_endpointing_delay=self.config.AGENT_MIN_ENDPOINTING_DELAY,
+            max_endpointing_delay=self.config.AGENT_MAX_ENDPOINTING_DELAY,
             allow_interruptions=True,
         )
     
+        answered_at = None
+
+        @session.on("agent_state_changed")
+        def on_agent_state_changed(event):
+            if event.new_state != "speaking" or "connect_to_first_audio_seconds" in self.call_metrics:
+                return
+            now = time.perf_counter()
+            self.call_metrics["connect_to_first_audio_seconds"] = round(now - connected_at, 3)
+            if answered_at is not None:
+                self.call_metrics["answer_to_first_audio_seconds"] = round(now - answered_at, 3)
+            logger.info(f"First greeting audio for {ctx.room.name}: {self.call_metrics}")
+
+        @session.on("conversation_item_added")
+        def on_conversation_item_added(event):
+            item = event.item
+            if getattr(item, "type", None) == "message":
+                transcript_writer.append_message(item.role, [c for c in item.content if isinstance(c, str)])
+
+        @session.on("metrics_collected")
+        def on_metrics_collected(event):
+            self.latency_recorder.on_metrics(event.metrics)
+
         await session.start(agent=agent, room=ctx.room)
         self.session = session
 
@@ -82,41 +190,36 @@ class DebtCollectionAgent:
         try:
             phone_number = metadata.get("phone_number")
             if metadata.get("call_type") == "outbound":
+                greeting = DEFAULT_INITIAL_GREETING.replace("{customer_name}", metadata.get("customer_name", "Customer"))
+                # Synthesize (or load) the greeting while the phone is still ringing. A greeting that
+                # names the customer is kept in memory only, so customer names never reach the cache.
+                greeting_audio = asyncio.create_task(self.cached_audio(
+                    greeting, persist="{customer_name}" not in DEFAULT_INITIAL_GREETING
+                ))
+                if self.tts_cache:
+                    self.warm_task = asyncio.create_task(self.tts_cache.warm(
+                        self.tts, DEFAULT_GOODBYE_MESSAGES, self.voice_id, self.config.ELEVENLABS_MODEL
+                    ))
                 await ctx.wait_for_participant(identity=phone_number)
-                await session.say(
-                    text=DEFAULT_INITIAL_GREETING.replace("{customer_name}", metadata.get("customer_name", "Customer")),
-                    allow_interruptions=True
-                )
+                answered_at = time.perf_counter()
+                await self.say(greeting, allow_interruptions=True, audio=await greeting_audio)
         except Exception as e:
             logger.info(f"Error generating initial greeting: {e}")
 
-        async def write_transcript():
-            current_date = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join(self.config.SOURCE_DIRECTORY, f"transcript_{ctx.room.name}_{current_date}.json")
-
-            cust_info = {
-                "customer_name": metadata.get("customer_name", "N/A"),
-                "phone_number": metadata.get("phone_number", "N/A"),
-                "card_number_ending": metadata.get("card_number_ending", "N/A"),
-                "amount_due": metadata.get("amount_due", "N/A")
-            }
 
-            session_history_list = session.history.to_dict()
-            session_history_dict = session_history_list.get("items", [])
-            desired_keys = ["role", "content"]
-            filtered_transcript = [
-                {key: message[key] for key in desired_keys if key in message}
-                for message in session_history_dict
-            ]
-            output_data = {
-                "customer_info": cust_info,
-                "transcript": filtered_transcript
-            }
-            async with aiofiles.open(filename, "w") as f:
-                await f.write(json.dumps(output_data, indent=2))
-            print(f"Transcript for {ctx.room.name} saved to {filename}")
+    async def cached_audio(self, text: str, persist: bool = True):
+        """
+        Returns pre-synthesized frames for text from the TTS cache, or None when caching is disabled or fails.
+        With persist=False the audio is synthesized ahead of time but not stored on disk.
+        """
+        if not self.tts_cache:
+            return None
+        return await self.tts_cache.get_or_synthesize(self.tts, text, self.voice_id, self.config.ELEVENLABS_MODEL, persist=persist)
 
-        ctx.add_shutdown_callback(write_transcript)
+    async def say(self, text: str, allow_interruptions: bool, audio=None):
+        if audio:
+            return await self.session.say(text=text, audio=TTSAudioCache.play(audio), allow_interruptions=allow_interruptions)
+        return await self.session.say(text=text, allow_interruptions=allow_interruptions)
 
     @function_tool(description="End the call by saying goodbye and terminating the connection. Usage: end_call_tool(reason='call completed')")
     async def end_call_tool(self, reason: str = "call completed"):
@@ -133,24 +236,13 @@ class DebtCollectionAgent:
             room_name = self.job_context.room.name
             logger.info(f"Ending call for room: {room_name} - Reason: {reason}")
 
-            goodbye_messages = [
-                "I appreciate your time today.",
-                "Thank you for speaking with me.",
-                "Have a great rest of your day!"
-            ]
-            
-            for message in goodbye_messages:
-                await self.session.say(text=message, allow_interruptions=False)
+            for message in DEFAULT_GOODBYE_MESSAGES:
+                await self.say(message, allow_interruptions=False, audio=await self.cached_audio(message))
                 await asyncio.sleep(0.5)  
 
             await asyncio.sleep(2)
-            livekit_api = api.LiveKitAPI(
-                url=self.config.LIVEKIT_URL,
-                api_key=self.config.LIVEKIT_API_KEY,
-                api_secret=self.config.LIVEKIT_API_SECRET
-            )
             delete_request = api.DeleteRoomRequest(room=room_name)
-            await livekit_api.room.delete_room(delete_request)
+            await self.resources.livekit_api.room.delete_room(delete_request)
             return "Call ended successfully"
 
         except Exception as e:
@@ -158,8 +250,29 @@ class DebtCollectionAgent:
             return f"Failed to end call: {str(e)}"
 
 
+def prewarm(proc: JobProcess):
+    """
+    Builds the process's shared resources and loads the Silero VAD when a job process is spawned,
+    ahead of any call, instead of per call.
+    With AGENT_JOB_EXECUTOR_TYPE=thread all jobs of the worker share these resources and this one VAD instance.
+    """
+    resources = get_agent_resources()
+    if resources.vad is None:
+        resources.vad = silero.VAD.load()
+    proc.userdata["resources"] = resources
+
+
+def job_load(worker: Worker) -> float:
+    """
+    Load reported to LiveKit: the share of AGENT_WORKER_MAX_JOBS this worker process is running.
+    LiveKit's default load is the CPU usage of the whole machine, which is the same for every worker
+    process on a host, so dispatch could not tell them apart.
+    """
+    return len(worker.active_jobs) / max(1, Config().AGENT_WORKER_MAX_JOBS)
+
+
 async def entrypoint(ctx: JobContext):
-    agent = DebtCollectionAgent()
+    agent = DebtCollectionAgent(ctx.proc.userdata.get("resources"))
     await agent.start(ctx)
 
 
@@ -169,17 +282,38 @@ class DebtCollectionAgentWorker:
         self.worker_task = None
         self.config = config
 
-    async def start_worker(self):
+    def build_worker_options(self, port: int = None) -> WorkerOptions:
+        options = dict(
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            job_executor_type=JobExecutorType(self.config.AGENT_JOB_EXECUTOR_TYPE),
+            ws_url=self.config.LIVEKIT_URL,
+            api_key=self.config.LIVEKIT_API_KEY,
+            api_secret=self.config.LIVEKIT_API_SECRET,
+            agent_name="debt-collection-agent",
+        )
+        if self.config.AGENT_WORKER_MAX_JOBS > 0:
+            # The worker reports itself full, and LiveKit dispatches elsewhere, once it runs AGENT_WORKER_MAX_JOBS calls
+            options.update(load_fnc=job_load, load_threshold=1.0)
+        if port is not None:
+            options["port"] = port
+        return WorkerOptions(**options)
+
+    async def start_worker(self, port: int = None, recover_transcripts: bool = True):
+        """
+        Starts the LiveKit worker as a task on the running event loop.
+
+        Args:
+            port (int): Port of the worker's health check server. Defaults to LiveKit's choice.
+            recover_transcripts (bool): Publish partial transcripts left by crashed workers first. Pass False
+                when several worker processes start together, so only one of them does it.
+        """
         try:
             logger.info("🚀 Starting LiveKit Agent Worker...")
-            worker_options = WorkerOptions(
-                entrypoint_fnc=entrypoint,
-                ws_url=self.config.LIVEKIT_URL,
-                api_key=self.config.LIVEKIT_API_KEY,
-                api_secret=self.config.LIVEKIT_API_SECRET,
-                agent_name="debt-collection-agent",
-            )
-            self.worker = Worker(worker_options)
+            if recover_transcripts:
+                # Publish transcripts of calls whose worker died before finalizing them
+                recover_partial_transcripts(self.config.SOURCE_DIRECTORY, self.config.PARTIAL_TRANSCRIPT_RECOVERY_SECONDS)
+            self.worker = Worker(self.build_worker_options(port))
             self.worker_task = asyncio.create_task(self.worker.run())
             logger.info("✅ LiveKit Agent Worker started successfully")
             return True
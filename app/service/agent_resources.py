@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+from livekit import api
+from livekit.plugins import elevenlabs
+
+from ..config.config import Config
+from .llm_gateway import LLMGateway, get_llm_gateway
+from .tts_cache_service import TTSAudioCache
+
+logger = logging.getLogger("agent-resources")
+logger.setLevel(logging.INFO)
+
+
+class AgentResources:
+    """
+    Per worker process resources shared by every call the process handles: the config, the LLM gateway,
+    the TTS cache, the Silero VAD and the LiveKit API client, with the transcript directories created once.
+    Jobs borrow them instead of building their own, so per-call setup cost and open sockets stay flat
+    as the number of concurrent calls grows.
+
+    The LiveKit API client holds an aiohttp session, which is bound to the event loop it was created on.
+    Every job runs its own loop, so one client is kept per loop, created on the first hangup and closed
+    by aclose() when the job shuts down.
+    """
+    def __init__(self, config: Config):
+        self.config = config
+        if not config.LLM_PROXY_URL:
+            logger.warning("LLM_PROXY_URL is not set: live calls go to the LLM backends directly, "
+                           "outside the API's priority queue")
+        self.gateway: LLMGateway = get_llm_gateway()
+        self.voice_id = config.ELEVENLABS_VOICE_ID or elevenlabs.DEFAULT_VOICE_ID
+        self.tts_cache = None
+        if config.TTS_CACHE_ENABLED:
+            self.tts_cache = TTSAudioCache(config.TTS_CACHE_DIRECTORY, config.TTS_CACHE_MAX_BYTES)
+        self.vad = None
+        self._livekit_apis: Dict[asyncio.AbstractEventLoop, api.LiveKitAPI] = {}
+        self._lock = threading.Lock()
+        for directory in (config.SOURCE_DIRECTORY, config.DESTINATION_DIRECTORY, config.PROCESSED_DIRECTORY):
+            os.makedirs(os.path.join(os.sep, directory), exist_ok=True)
+        os.makedirs(config.LATENCY_DIRECTORY, exist_ok=True)
+
+    @property
+    def livekit_api(self) -> api.LiveKitAPI:
+        """
+        The LiveKit API client of the running event loop, created on first use.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._livekit_apis.get(loop)
+            if client is None:
+                client = api.LiveKitAPI(
+                    url=self.config.LIVEKIT_URL,
+                    api_key=self.config.LIVEKIT_API_KEY,
+                    api_secret=self.config.LIVEKIT_API_SECRET
+                )
+                self._livekit_apis[loop] = client
+            return client
+
+    async def aclose(self):
+        """
+        Closes the LiveKit API client of the running event loop.
+        """
+        with self._lock:
+            client = self._livekit_apis.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+_resources: Optional[AgentResources] = None
+_resources_lock = threading.Lock()
+
+
+def get_agent_resources() -> AgentResources:
+    """
+    Returns the resources of this worker process, creating them on first use.
+    """
+    global _resources
+    with _resources_lock:
+        if _resources is None:
+            _resources = AgentResources(Config())
+        return _resources
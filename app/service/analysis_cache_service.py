@@ -0,0 +1,99 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger("analysis-cache-service")
+logger.setLevel(logging.INFO)
+
+class AnalysisCache:
+    """
+    Persistent SQLite cache of transcript risk analyses keyed by transcript content hash,
+    model name and prompt version. Entries older than `max_age_seconds` are dropped and,
+    once the cache holds more than `max_entries`, the least recently used entries are evicted.
+    """
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int = 100000, max_age_seconds: float = 30 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_eviction = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    category TEXT NOT NULL,
+                    justification TEXT,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_accessed ON analysis_cache(last_accessed)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_created_at ON analysis_cache(created_at)")
+        self.evict()
+
+    @staticmethod
+    def make_key(transcript_content: str, model_name: str, prompt_version: str) -> str:
+        content_hash = hashlib.sha256(transcript_content.encode("utf-8")).hexdigest()
+        return f"{model_name}:{prompt_version}:{content_hash}"
+
+    def get(self, cache_key: str):
+        """
+        Returns the cached (category, justification) for the key, or None on a miss or expired entry.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT category, justification, created_at FROM analysis_cache WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+            if row is None or now - row[2] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE analysis_cache SET last_accessed = ? WHERE cache_key = ?", (now, cache_key))
+        self.hits += 1
+        return row[0], row[1]
+
+    def put(self, cache_key: str, category: str, justification: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (cache_key, category, justification, created_at, last_accessed) VALUES (?, ?, ?, ?, ?)",
+                (cache_key, category, justification, now, now)
+            )
+        self._puts_since_eviction += 1
+        if self._puts_since_eviction >= self.EVICT_EVERY:
+            self.evict()
+
+    def evict(self):
+        """
+        Drops expired entries, then the least recently used ones beyond max_entries.
+        """
+        self._puts_since_eviction = 0
+        with self._lock, self._conn:
+            expired = self._conn.execute(
+                "DELETE FROM analysis_cache WHERE created_at < ?",
+                (time.time() - self.max_age_seconds,)
+            ).rowcount
+            count = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+            overflow = max(0, count - self.max_entries)
+            if overflow:
+                self._conn.execute(
+                    "DELETE FROM analysis_cache WHERE cache_key IN (SELECT cache_key FROM analysis_cache ORDER BY last_accessed ASC LIMIT ?)",
+                    (overflow,)
+                )
+        if expired or overflow:
+            logger.info(f"Evicted {expired} expired and {overflow} least recently used analysis cache entries")
@@ -0,0 +1,149 @@
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.caches import BaseCache
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, BaseCallbackHandler, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_ollama import ChatOllama
+from pydantic import ConfigDict, Field
+
+from .llm_gateway import LLMGateway
+
+logger = logging.getLogger("balanced-chat-ollama")
+logger.setLevel(logging.INFO)
+
+# ChatOllama settings that change what the model answers, and so make up the response cache key
+CACHE_KEY_FIELDS = {
+    "model", "temperature", "seed", "top_k", "top_p", "tfs_z", "num_ctx", "num_predict",
+    "repeat_last_n", "repeat_penalty", "mirostat", "mirostat_eta", "mirostat_tau", "format", "reasoning",
+}
+
+
+class BalancedChatOllama(BaseChatModel):
+    """
+    Chat model that spreads requests over the LLM gateway's backends. It keeps one ChatOllama per
+    backend and hands each call to the backend the gateway picks. Failed calls fail over to the
+    other backends. Streams fail over only until the first chunk has been sent.
+    Requests are admitted under the gateway priority class given by priority.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    gateway: LLMGateway
+    priority: str = "batch"
+    clients: Dict[str, ChatOllama] = Field(default_factory=dict)
+
+    @classmethod
+    def create(cls, gateway: LLMGateway, priority: str = "batch", cache: Optional[BaseCache] = None,
+               callbacks: Optional[List[BaseCallbackHandler]] = None, **chat_kwargs: Any) -> "BalancedChatOllama":
+        """
+        Builds one ChatOllama per backend with chat_kwargs (model, temperature, ...).
+        With cache, responses are looked up there before any backend is called. callbacks receive every call.
+        """
+        clients = {backend.url: ChatOllama(base_url=backend.url, **chat_kwargs) for backend in gateway.backends}
+        custom_get_token_ids = chat_kwargs.get("custom_get_token_ids")
+        return cls(gateway=gateway, priority=priority, clients=clients, custom_get_token_ids=custom_get_token_ids,
+                   cache=cache, callbacks=callbacks)
+
+    @property
+    def _llm_type(self) -> str:
+        return "balanced-chat-ollama"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        first = next(iter(self.clients.values()), None)
+        return {"backends": list(self.clients), **(first._identifying_params if first else {})}
+
+    def _get_llm_string(self, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        """
+        Response cache key of the model settings. Leaves out the backends and whether the call is streamed,
+        so a cached response is replayed whichever backend produced it.
+        """
+        first = next(iter(self.clients.values()), None)
+        settings = first.model_dump(include=CACHE_KEY_FIELDS) if first else {}
+        kwargs.pop("stream", None)
+        return json.dumps({**settings, "stop": stop, **kwargs}, sort_keys=True, default=str)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        last_error = None
+        for backend in self.gateway.ranked():
+            try:
+                result = self.clients[backend.url]._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                if not self.gateway.is_retryable(e):
+                    raise
+                self.gateway.record_failure(backend, e)
+                last_error = e
+                continue
+            self.gateway.record_success(backend)
+            return result
+        raise last_error or RuntimeError("No LLM backends configured")
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tried = []
+        while True:
+            async with self.gateway.acquire(exclude=tried, priority=self.priority) as backend:
+                try:
+                    result = await self.clients[backend.url]._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                except Exception as e:
+                    if not self.gateway.is_retryable(e):
+                        raise
+                    self.gateway.record_failure(backend, e)
+                    tried.append(backend)
+                    if not self.gateway.candidates(exclude=tried):
+                        raise
+                    logger.warning(f"Chat request to {backend.url} failed, failing over: {e}")
+                    continue
+                self.gateway.record_success(backend)
+                return result
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        backend = self.gateway.pick()
+        yield from self.clients[backend.url]._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tried = []
+        while True:
+            async with self.gateway.acquire(exclude=tried, priority=self.priority) as backend:
+                started = False
+                try:
+                    async for chunk in self.clients[backend.url]._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                        started = True
+                        yield chunk
+                except Exception as e:
+                    if started or not self.gateway.is_retryable(e):
+                        raise
+                    self.gateway.record_failure(backend, e)
+                    tried.append(backend)
+                    if not self.gateway.candidates(exclude=tried):
+                        raise
+                    logger.warning(f"Chat stream from {backend.url} failed, failing over: {e}")
+                    continue
+                self.gateway.record_success(backend)
+                return
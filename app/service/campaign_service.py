@@ -0,0 +1,271 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional
+
+from livekit import api
+
+from ..config.config import Config
+from ..model.call_request import CallRequest
+from ..model.campaign_status import CampaignStatus
+from .main_service import MainService
+from .room_state_service import RoomStateCache
+
+logger = logging.getLogger("campaign-service")
+logger.setLevel(logging.INFO)
+
+# SIP responses worth redialing: request timeout, temporarily unavailable, busy, server errors.
+TRANSIENT_SIP_STATUS_CODES = {"408", "480", "486", "500", "502", "503", "504", "600"}
+# Twirp codes returned by LiveKit when it is overloaded or the request timed out.
+TRANSIENT_TWIRP_CODES = {"unavailable", "deadline_exceeded", "resource_exhausted", "internal"}
+MAX_RECENT_ERRORS = 50
+
+
+def parse_calls_file(filename: str, content: str) -> List[CallRequest]:
+    """
+    Parses an uploaded CSV (with a header row) or JSONL file into CallRequests.
+    Columns/keys match CallRequest: phone_number, customer_name, amount_due, card_number_ending, agent_instructions.
+
+    Raises:
+        ValueError: If a row is malformed, with the offending line number.
+    """
+    calls = []
+    if filename.lower().endswith((".jsonl", ".ndjson")):
+        rows = []
+        for line_number, line in enumerate(content.splitlines(), start=1):
+            if line.strip():
+                try:
+                    rows.append((line_number, json.loads(line)))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Line {line_number}: invalid JSON ({e})")
+    else:
+        reader = csv.DictReader(io.StringIO(content))
+        rows = [
+            (line_number, {key: value for key, value in row.items() if value not in (None, "")})
+            for line_number, row in enumerate(reader, start=2)
+        ]
+
+    for line_number, row in rows:
+        try:
+            calls.append(CallRequest(**row))
+        except Exception as e:
+            raise ValueError(f"Line {line_number}: {e}")
+    return calls
+
+
+class RateLimiter:
+    """
+    Spaces acquisitions at least 1/rate seconds apart across all callers.
+    """
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            now = loop.time()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CampaignService:
+    """
+    Places batches of outbound calls. Each campaign is drained by a pool of max_concurrent_calls
+    workers, and a worker stays on a call from setup until its room ends, so at most that many calls
+    are being set up, ringing or live at once. Every dial attempt also passes through the campaign's
+    rate limiter and the node-wide limiter and semaphore, whose slot is likewise held until the room
+    ends, so concurrent campaigns together stay within the CAMPAIGN_CALLS_PER_SECOND and
+    CAMPAIGN_MAX_CONCURRENT_CALLS limits of this node.
+    Every call gets its own room, even when a number appears twice.
+    """
+    def __init__(self, main_service: MainService, livekit_api: api.LiveKitAPI, room_state_cache: RoomStateCache,
+                 config: Config, max_history: int = 50):
+        self.main_service = main_service
+        self.livekit_api = livekit_api
+        self.room_state_cache = room_state_cache
+        self.config = config
+        self.max_history = max_history
+        self.campaigns: "OrderedDict[str, CampaignStatus]" = OrderedDict()
+        self.tasks = {}
+        self.node_rate_limiter = RateLimiter(config.CAMPAIGN_CALLS_PER_SECOND)
+        self.node_semaphore = asyncio.Semaphore(config.CAMPAIGN_MAX_CONCURRENT_CALLS)
+
+    def start_campaign(
+        self,
+        calls: List[CallRequest],
+        calls_per_second: Optional[float] = None,
+        max_concurrent_calls: Optional[int] = None,
+        max_retries: Optional[int] = None,
+    ) -> CampaignStatus:
+        """
+        Schedules the campaign. Unset limits take the node's defaults, and larger ones are capped at them.
+        """
+        if calls_per_second is None:
+            calls_per_second = self.config.CAMPAIGN_CALLS_PER_SECOND
+        if max_concurrent_calls is None:
+            max_concurrent_calls = self.config.CAMPAIGN_MAX_CONCURRENT_CALLS
+        campaign = CampaignStatus(
+            campaign_id=str(uuid.uuid4()),
+            total_calls=len(calls),
+            queued=len(calls),
+            calls_per_second=min(calls_per_second, self.config.CAMPAIGN_CALLS_PER_SECOND),
+            max_concurrent_calls=min(max_concurrent_calls, self.config.CAMPAIGN_MAX_CONCURRENT_CALLS),
+            max_retries=self.config.CAMPAIGN_MAX_RETRIES if max_retries is None else max_retries,
+            created_at=datetime.now().isoformat(),
+        )
+        self.campaigns[campaign.campaign_id] = campaign
+        self.tasks[campaign.campaign_id] = asyncio.create_task(self.run_campaign(campaign, calls))
+        self.trim_history()
+        logger.info(f"Campaign {campaign.campaign_id} scheduled with {len(calls)} calls")
+        return campaign
+
+    def get_campaign(self, campaign_id: str):
+        return self.campaigns.get(campaign_id)
+
+    def list_campaigns(self):
+        return list(reversed(self.campaigns.values()))
+
+    def cancel_campaign(self, campaign_id: str):
+        """
+        Stops dialing the queued calls of a campaign. Dials in flight are abandoned; connected calls are not hung up.
+        """
+        campaign = self.campaigns.get(campaign_id)
+        task = self.tasks.get(campaign_id)
+        if campaign is not None and task is not None:
+            task.cancel()
+        return campaign
+
+    async def run_campaign(self, campaign: CampaignStatus, calls: List[CallRequest]):
+        campaign.status = "running"
+        campaign.started_at = datetime.now().isoformat()
+        queue: asyncio.Queue = asyncio.Queue()
+        for index, call in enumerate(calls):
+            queue.put_nowait((index, call))
+
+        rate_limiter = RateLimiter(campaign.calls_per_second)
+
+        async def worker():
+            while True:
+                try:
+                    index, call = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                campaign.queued -= 1
+                campaign.in_progress += 1
+                try:
+                    result = await self.place_call(campaign, index, call, rate_limiter)
+                finally:
+                    campaign.in_progress -= 1
+                if result["success"]:
+                    campaign.succeeded += 1
+                else:
+                    campaign.failed += 1
+                    campaign.recent_errors.append({"phone_number": call.phone_number, "error": result["error"]})
+                    del campaign.recent_errors[:-MAX_RECENT_ERRORS]
+
+        workers = [asyncio.create_task(worker()) for _ in range(campaign.max_concurrent_calls)]
+        try:
+            await asyncio.gather(*workers)
+            campaign.status = "completed"
+        except asyncio.CancelledError:
+            for task in workers:
+                task.cancel()
+            campaign.status = "cancelled"
+        finally:
+            campaign.finished_at = datetime.now().isoformat()
+            self.tasks.pop(campaign.campaign_id, None)
+            logger.info(f"Campaign {campaign.campaign_id} {campaign.status}: {campaign.succeeded} succeeded, {campaign.failed} failed")
+
+    async def place_call(self, campaign: CampaignStatus, index: int, request: CallRequest, rate_limiter: RateLimiter) -> dict:
+        """
+        Sets up the room and agent once, then dials, retrying transient SIP failures with exponential backoff.
+        Once the call connects, returns only when its room has ended.
+        """
+        room_name = self.main_service.build_room_name(request.phone_number, suffix=f"{campaign.campaign_id[:8]}-{index}")
+        dispatched = False
+        result = {"success": False, "error": "Call was not attempted"}
+
+        for attempt in range(campaign.max_retries + 1):
+            if attempt:
+                campaign.retries += 1
+                await asyncio.sleep(self.config.CAMPAIGN_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)))
+
+            await rate_limiter.acquire()
+            await self.node_rate_limiter.acquire()
+            async with self.node_semaphore:
+                try:
+                    if not dispatched:
+                        result = await self.main_service.create_livekit_room_and_dispatch_agent(
+                            room_name=room_name,
+                            request=request,
+                            agent_instructions=self.main_service.build_agent_instructions(request),
+                            livekit_api=self.livekit_api
+                        )
+                        if not result["success"]:
+                            # Room or dispatch setup failures are retried like transient SIP errors.
+                            continue
+                        dispatched = True
+
+                    result = await self.main_service.place_outbound_call_with_livekit(
+                        phone_number=request.phone_number,
+                        room_name=room_name,
+                        livekit_api=self.livekit_api,
+                        sip_trunk_id=self.config.SIP_TRUNK_ID
+                    )
+                except Exception as e:
+                    # Network-level failures towards LiveKit are treated as transient.
+                    result = {"success": False, "error": str(e)}
+                    continue
+
+                if result["success"]:
+                    # The slot covers the whole call, not just dialing, so the limit caps live calls
+                    await self.wait_for_call_end(room_name)
+
+            if result["success"] or not self.is_transient(result):
+                break
+            logger.info(f"Transient failure calling {request.phone_number} (attempt {attempt + 1}): {result['error']}")
+
+        return {"success": result["success"], "room_name": room_name, "error": result.get("error")}
+
+    async def wait_for_call_end(self, room_name: str):
+        """
+        Waits until the call's room is gone or has nobody left in it, as seen by the room state cache
+        (kept current by LiveKit webhooks, or polled). Gives up after CAMPAIGN_MAX_CALL_SECONDS, so a
+        room that is never reported as finished does not hold its slot forever.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.CAMPAIGN_MAX_CALL_SECONDS
+        while loop.time() < deadline:
+            await asyncio.sleep(self.config.CAMPAIGN_CALL_POLL_SECONDS)
+            try:
+                status = (await self.room_state_cache.get_statuses([room_name]))[room_name]
+            except Exception as e:
+                logger.warning(f"Could not get the status of room {room_name}: {e}")
+                continue
+            if status["status"] != "active":
+                return
+        logger.warning(f"Room {room_name} still active after {self.config.CAMPAIGN_MAX_CALL_SECONDS}s, releasing its campaign slot")
+
+    def is_transient(self, result: dict) -> bool:
+        sip_status_code = result.get("sip_status_code")
+        if sip_status_code is not None:
+            return str(sip_status_code) in TRANSIENT_SIP_STATUS_CODES
+        return result.get("twirp_code") in TRANSIENT_TWIRP_CODES
+
+    def trim_history(self):
+        while len(self.campaigns) > self.max_history:
+            oldest_id = next(iter(self.campaigns))
+            if oldest_id in self.tasks:
+                break
+            self.campaigns.popitem(last=False)
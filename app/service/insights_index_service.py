@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from .transcript_store import read_transcript
+
+logger = logging.getLogger("insights-index-service")
+logger.setLevel(logging.INFO)
+
+RISK_CATEGORIES = ["HIGH", "MEDIUM", "LOW"]
+COLUMNS = [
+    "source_file", "category", "justification", "model_used", "analyzed_at",
+    "customer_name", "phone_number", "card_number_ending", "amount_due",
+]
+
+
+class InsightsIndex:
+    """
+    SQLite index of generated insights, one row per transcript, with the customer details from the
+    transcript's customer_info block. Rows are written as insights are produced, so queries and risk
+    aggregates are answered from indexes instead of re-reading the insight files.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS insights (
+                    source_file TEXT PRIMARY KEY,
+                    category TEXT NOT NULL,
+                    justification TEXT,
+                    model_used TEXT,
+                    analyzed_at REAL NOT NULL,
+                    customer_name TEXT,
+                    phone_number TEXT,
+                    card_number_ending TEXT,
+                    amount_due REAL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_insights_analyzed_at ON insights(analyzed_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_insights_category_analyzed_at ON insights(category, analyzed_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_insights_phone_number ON insights(phone_number)")
+
+    @staticmethod
+    def build_record(source_file: str, category: str, justification: str, model_used: str,
+                     customer_info: Dict[str, Any], analyzed_at: float = None) -> Dict[str, Any]:
+        amount_due = customer_info.get("amount_due")
+        try:
+            amount_due = float(amount_due)
+        except (TypeError, ValueError):
+            amount_due = None
+        return {
+            "source_file": source_file,
+            "category": category,
+            "justification": justification,
+            "model_used": model_used,
+            "analyzed_at": analyzed_at or time.time(),
+            "customer_name": customer_info.get("customer_name"),
+            "phone_number": customer_info.get("phone_number"),
+            "card_number_ending": customer_info.get("card_number_ending"),
+            "amount_due": amount_due,
+        }
+
+    def upsert(self, record: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO insights ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+                [record.get(column) for column in COLUMNS]
+            )
+
+    @staticmethod
+    def build_filters(category=None, since=None, until=None, phone_number=None):
+        clauses, params = [], []
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if since is not None:
+            clauses.append("analyzed_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("analyzed_at < ?")
+            params.append(until)
+        if phone_number:
+            clauses.append("phone_number = ?")
+            params.append(phone_number)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, category: str = None, since: float = None, until: float = None, phone_number: str = None,
+              limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        """
+        Returns one page of insights matching the filters, newest first, and the total number of matches.
+        """
+        where, params = self.build_filters(category, since, until, phone_number)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM insights{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM insights{where} ORDER BY analyzed_at DESC, source_file LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        items = []
+        for row in rows:
+            item = dict(zip(COLUMNS, row))
+            item["analyzed_at"] = datetime.fromtimestamp(item["analyzed_at"]).isoformat()
+            items.append(item)
+        return {"total": total, "limit": limit, "offset": offset, "items": items}
+
+    def summary(self, since: float = None, until: float = None, by_day: bool = False) -> Dict[str, Any]:
+        """
+        Returns the risk distribution (insights and distinct customers per category) in the time range,
+        optionally broken down per day of analysis.
+        """
+        where, params = self.build_filters(since=since, until=until)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT category, COUNT(*), COUNT(DISTINCT phone_number) FROM insights{where} GROUP BY category",
+                params
+            ).fetchall()
+            day_rows = []
+            if by_day:
+                day_rows = self._conn.execute(
+                    f"SELECT date(analyzed_at, 'unixepoch', 'localtime') AS day, category, COUNT(*) FROM insights{where} "
+                    "GROUP BY day, category ORDER BY day",
+                    params
+                ).fetchall()
+
+        risk_counts = {category: 0 for category in RISK_CATEGORIES}
+        customers = {category: 0 for category in RISK_CATEGORIES}
+        failed = 0
+        for category, count, distinct_customers in rows:
+            if category in risk_counts:
+                risk_counts[category] = count
+                customers[category] = distinct_customers
+            else:
+                failed += count
+        result = {
+            "total": sum(risk_counts.values()) + failed,
+            "risk_counts": risk_counts,
+            "customers": customers,
+            "failed": failed,
+        }
+        if by_day:
+            days: Dict[str, Dict[str, int]] = {}
+            for day, category, count in day_rows:
+                counts = days.setdefault(day, {category: 0 for category in RISK_CATEGORIES})
+                if category in counts:
+                    counts[category] = count
+            result["by_day"] = [{"day": day, **counts} for day, counts in days.items()]
+        return result
+
+    def rebuild(self, insights_directory: str, transcript_directories: List[str]) -> int:
+        """
+        Indexes insight files written before the index existed, taking customer details from the matching
+        transcript in transcript_directories when it can still be found. Returns the number of indexed files.
+        """
+        if not insights_directory or not os.path.isdir(insights_directory):
+            return 0
+        indexed = 0
+        for entry in os.scandir(insights_directory):
+            if not entry.is_file():
+                continue
+            try:
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    analysis = json.load(f).get("risk_analysis", {})
+            except (OSError, json.JSONDecodeError, AttributeError) as e:
+                logger.warning(f"Skipping unreadable insight file {entry.name}: {e}")
+                continue
+
+            customer_info = {}
+            for directory in transcript_directories:
+                transcript_path = os.path.join(directory or "", entry.name)
+                if directory and os.path.isfile(transcript_path):
+                    try:
+                        customer_info = read_transcript(transcript_path)["customer_info"]
+                    except (OSError, ValueError):
+                        pass
+                    break
+
+            self.upsert(self.build_record(
+                source_file=entry.name,
+                category=analysis.get("category", "UNKNOWN"),
+                justification=analysis.get("justification"),
+                model_used=analysis.get("model_used"),
+                customer_info=customer_info,
+                analyzed_at=entry.stat().st_mtime,
+            ))
+            indexed += 1
+        logger.info(f"Indexed {indexed} insight files from {insights_directory}")
+        return indexed
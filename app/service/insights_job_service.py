@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from ..model.insights_job import InsightsJob
+from .summarize_transcript_service import InsightsService
+
+logger = logging.getLogger("insights-job-service")
+logger.setLevel(logging.INFO)
+
+class InsightsJobService:
+    """
+    Runs insight generation as a background asyncio task so the request handler returns immediately.
+    Only one job runs at a time, since every job drains the same source directory.
+    """
+    def __init__(self, insights_service: InsightsService, max_history: int = 50):
+        self.insights_service = insights_service
+        self.max_history = max_history
+        self.jobs: "OrderedDict[str, InsightsJob]" = OrderedDict()
+        self.tasks = {}
+
+    def active_job(self):
+        for job in self.jobs.values():
+            if job.status in ("pending", "running"):
+                return job
+        return None
+
+    def start_job(self, reprocess: bool = False) -> InsightsJob:
+        """
+        Starts a new insights job, or returns the job that is already in progress.
+        With reprocess=True the job re-scores the processed directory instead of the source directory.
+        """
+        job = self.active_job()
+        if job is not None:
+            return job
+
+        job = InsightsJob(job_id=str(uuid.uuid4()), created_at=datetime.now().isoformat())
+        self.jobs[job.job_id] = job
+        self.tasks[job.job_id] = asyncio.create_task(self.run_job(job, reprocess))
+        self.trim_history()
+        logger.info(f"Insights job {job.job_id} scheduled")
+        return job
+
+    def get_job(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        return list(reversed(self.jobs.values()))
+
+    async def run_job(self, job: InsightsJob, reprocess: bool = False):
+        job.status = "running"
+        job.started_at = datetime.now().isoformat()
+
+        def on_start(total):
+            job.total_files = total
+
+        def on_file_done(filename, risk_category, justification):
+            job.processed_files += 1
+            if justification is not None and risk_category in job.risk_counts:
+                job.risk_counts[risk_category] += 1
+            else:
+                job.failed_files += 1
+
+        config = self.insights_service.config
+        source_directory = config.PROCESSED_DIRECTORY if reprocess else config.SOURCE_DIRECTORY
+        try:
+            result = await self.insights_service.generate_batch(
+                on_start=on_start,
+                on_file_done=on_file_done,
+                source_directory=source_directory
+            )
+            if result is None:
+                job.status = "failed"
+                job.error = f"The source directory '{source_directory}' does not exist."
+            else:
+                job.risk_counts = result["risk_counts"]
+                job.stats = result["stats"]
+                job.status = "completed"
+        except Exception as e:
+            logger.error(f"Insights job {job.job_id} failed: {e}", exc_info=True)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now().isoformat()
+            self.tasks.pop(job.job_id, None)
+
+    def trim_history(self):
+        while len(self.jobs) > self.max_history:
+            oldest_id = next(iter(self.jobs))
+            if self.jobs[oldest_id].status in ("pending", "running"):
+                break
+            self.jobs.popitem(last=False)
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .summarize_transcript_service import InsightsService
+from .transcript_store import is_transcript_file
+
+logger = logging.getLogger("insights-watcher-service")
+logger.setLevel(logging.INFO)
+
+
+class InsightsWatcher:
+    """
+    Background task that analyzes transcripts as they land in SOURCE_DIRECTORY, so risk categories are
+    available shortly after a call ends instead of on the next /generate/insights run.
+
+    Every interval_seconds it lists the source directory, which only holds transcripts not analyzed yet
+    since analyzed ones are moved to PROCESSED_DIRECTORY. A file is picked up once its size and
+    modification time have not changed for debounce_seconds, so partially written files are left alone.
+    At most concurrency files are analyzed at once; the rest wait for a later poll.
+    """
+    def __init__(self, insights_service: InsightsService, interval_seconds: float = None,
+                 debounce_seconds: float = None, concurrency: int = None):
+        config = insights_service.config
+        self.insights_service = insights_service
+        self.interval_seconds = interval_seconds or config.INSIGHTS_WATCH_INTERVAL_SECONDS
+        self.debounce_seconds = debounce_seconds if debounce_seconds is not None else config.INSIGHTS_WATCH_DEBOUNCE_SECONDS
+        self.concurrency = concurrency or config.INSIGHTS_WATCH_CONCURRENCY
+        self.source_directory = config.SOURCE_DIRECTORY
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pending: Dict[str, tuple] = {}  # path -> (size, mtime) as last seen
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.processed_files = 0
+        self.failed_files = 0
+        self.risk_counts = {'MEDIUM': 0, 'LOW': 0, 'HIGH': 0}
+        self.last_processed_at: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self._client = httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(self.insights_service.config.INSIGHTS_REQUEST_TIMEOUT_SECONDS))
+        self._task = asyncio.create_task(self.run())
+        logger.info(f"Watching {self.source_directory} for new transcripts every {self.interval_seconds}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        in_flight = list(self._in_flight.values())
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        logger.info("Insights watcher stopped")
+
+    async def run(self):
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Insights watcher poll failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval_seconds)
+
+    def scan(self) -> Dict[str, tuple]:
+        if not self.source_directory or not os.path.isdir(self.source_directory):
+            return {}
+        files = {}
+        for entry in os.scandir(self.source_directory):
+            if is_transcript_file(entry.name) and entry.is_file():
+                stat = entry.stat()
+                files[os.path.abspath(entry.path)] = (stat.st_size, stat.st_mtime)
+        return files
+
+    async def poll(self):
+        """
+        Starts analysis of the files that have settled, up to the free concurrency slots.
+        """
+        files = await asyncio.to_thread(self.scan)
+        now = time.time()
+        ready = []
+        for path, signature in files.items():
+            if path in self._in_flight or path in self.insights_service.claimed_paths:
+                continue
+            settled = self._pending.get(path) == signature and now - signature[1] >= self.debounce_seconds
+            self._pending[path] = signature
+            if settled:
+                ready.append(path)
+        # Forget files that were moved away (analyzed by an insights job, or deleted)
+        self._pending = {path: signature for path, signature in self._pending.items() if path in files}
+
+        for path in ready[:max(0, self.concurrency - len(self._in_flight))]:
+            self.insights_service.claimed_paths.add(path)
+            self._pending.pop(path, None)
+            self._in_flight[path] = asyncio.create_task(self.process(path))
+
+    async def process(self, path: str):
+        filename = os.path.basename(path)
+        try:
+            risk_category, justification = await self.insights_service.analyze_transcript_async(path, self._client)
+            await asyncio.to_thread(self.insights_service.record_result, filename, path, risk_category, justification)
+            if justification is not None and risk_category in self.risk_counts:
+                self.risk_counts[risk_category] += 1
+            else:
+                self.failed_files += 1
+            self.processed_files += 1
+            self.last_processed_at = datetime.now().isoformat()
+            logger.info(f"Watcher analyzed '{filename}': {risk_category}")
+        except Exception as e:
+            self.failed_files += 1
+            logger.error(f"Watcher failed to analyze '{filename}': {e}", exc_info=True)
+        finally:
+            self.insights_service.claimed_paths.discard(path)
+            self._in_flight.pop(path, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "source_directory": self.source_directory,
+            "interval_seconds": self.interval_seconds,
+            "debounce_seconds": self.debounce_seconds,
+            "concurrency": self.concurrency,
+            "in_flight": len(self._in_flight),
+            "waiting": len(self._pending),
+            "processed_files": self.processed_files,
+            "failed_files": self.failed_files,
+            "risk_counts": self.risk_counts,
+            "last_processed_at": self.last_processed_at,
+        }
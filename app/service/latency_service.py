@@ -0,0 +1,183 @@
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List
+
+from ..config.config import Config
+from ..util.stats import summarize_latencies, histogram
+from .llm_accounting import LLMUsageStats
+
+logger = logging.getLogger("latency-service")
+logger.setLevel(logging.INFO)
+
+LATENCY_FILE_PREFIX = "latency_"
+STAGES = ["transcription_delay", "end_of_utterance_delay", "llm_ttft", "tts_ttfb", "e2e_latency"]
+HISTOGRAM_BUCKETS = [0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0]
+
+
+def summarize_llm_calls(llm_calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "llm_calls": len(llm_calls),
+        "prompt_tokens": sum(call["prompt_tokens"] for call in llm_calls),
+        "completion_tokens": sum(call["completion_tokens"] for call in llm_calls),
+        "seconds": round(sum(call["duration"] for call in llm_calls), 3),
+    }
+
+
+class CallLatencyRecorder:
+    """
+    Collects the voice pipeline metrics of one call and groups them into turns by speech id:
+    STT transcription delay and end-of-utterance (endpointing) delay from EOU metrics,
+    LLM time-to-first-token and TTS time-to-first-byte. e2e_latency is their sum for the turn,
+    i.e. the delay from the user going silent to the first agent audio.
+    Every LLM request is also kept in llm_calls, since a turn with tool calls makes several.
+    """
+    def __init__(self):
+        self.turns: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.llm_calls: List[Dict[str, Any]] = []
+
+    def on_metrics(self, metrics):
+        if metrics.type == "llm_metrics":
+            self.llm_calls.append({
+                "prompt_tokens": metrics.prompt_tokens,
+                "completion_tokens": metrics.completion_tokens,
+                "duration": round(metrics.duration, 4),
+            })
+        speech_id = getattr(metrics, "speech_id", None)
+        if not speech_id:
+            return
+        turn = self.turns.setdefault(speech_id, {"speech_id": speech_id})
+        if metrics.type == "eou_metrics":
+            turn["transcription_delay"] = round(metrics.transcription_delay, 4)
+            turn["end_of_utterance_delay"] = round(metrics.end_of_utterance_delay, 4)
+        elif metrics.type == "llm_metrics":
+            turn["llm_ttft"] = round(metrics.ttft, 4)
+            turn["llm_duration"] = round(metrics.duration, 4)
+            turn["prompt_tokens"] = metrics.prompt_tokens
+            turn["completion_tokens"] = metrics.completion_tokens
+        elif metrics.type == "tts_metrics":
+            # Only the first TTS segment of a turn determines when audio starts
+            turn.setdefault("tts_ttfb", round(metrics.ttfb, 4))
+
+        if all(stage in turn for stage in ("end_of_utterance_delay", "llm_ttft", "tts_ttfb")):
+            turn["e2e_latency"] = round(turn["end_of_utterance_delay"] + turn["llm_ttft"] + turn["tts_ttfb"], 4)
+
+    def llm_usage(self) -> Dict[str, Any]:
+        return summarize_llm_calls(self.llm_calls)
+
+    def summary(self) -> Dict[str, Any]:
+        turns = list(self.turns.values())
+        return {
+            "turns": turns,
+            "llm_calls": list(self.llm_calls),
+            "stages": {
+                stage: summarize_latencies(turn[stage] for turn in turns if stage in turn)
+                for stage in STAGES
+            },
+        }
+
+
+class LatencyMetricsService:
+    """
+    Aggregates the per-call latency files the agent writes to LATENCY_DIRECTORY. Calls run in agent worker
+    processes, so the files are the hand-off to the API process; each file is read once and its
+    turns are kept in bounded per-stage sample windows. The live agent's LLM usage is totalled the same
+    way, with the calls that used the most tokens kept in top_rooms.
+    Files older than LATENCY_RETENTION_SECONDS are deleted once aggregated, so the directory stays
+    bounded; after a restart the metrics cover the calls still within the retention window.
+    """
+    def __init__(self, config: Config, max_samples: int = 10000, top_rooms: int = 10):
+        self.config = config
+        self.samples = {stage: deque(maxlen=max_samples) for stage in STAGES}
+        self.llm_usage = LLMUsageStats(max_samples)
+        self.top_rooms_size = top_rooms
+        self.top_rooms: List[tuple] = []  # min-heap of (total tokens, file name, room usage)
+        self.seen_files = set()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        directory = self.config.LATENCY_DIRECTORY
+        if not directory or not os.path.isdir(directory):
+            return
+        expire_before = time.time() - self.config.LATENCY_RETENTION_SECONDS
+        with self._lock:
+            for entry in os.scandir(directory):
+                if not entry.name.startswith(LATENCY_FILE_PREFIX):
+                    continue
+                if entry.name in self.seen_files:
+                    self.prune(entry, expire_before)
+                    continue
+                try:
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    logger.warning(f"Skipping unreadable latency file {entry.name}: {e}")
+                    continue
+                self.seen_files.add(entry.name)
+                self.calls += 1
+                for turn in data.get("turns", []):
+                    for stage in STAGES:
+                        if stage in turn:
+                            self.samples[stage].append(turn[stage])
+                self.add_llm_usage(entry.name, data)
+                self.prune(entry, expire_before)
+
+    def prune(self, entry: os.DirEntry, expire_before: float):
+        """
+        Deletes an aggregated latency file once it is past the retention window.
+        """
+        try:
+            if entry.stat().st_mtime >= expire_before:
+                return
+            os.remove(entry.path)
+        except OSError as e:
+            logger.warning(f"Could not prune latency file {entry.name}: {e}")
+            return
+        self.seen_files.discard(entry.name)
+
+    def add_llm_usage(self, filename: str, data: Dict[str, Any]):
+        llm_calls = data.get("llm_calls", [])
+        for call in llm_calls:
+            self.llm_usage.record("agent.llm", call["prompt_tokens"], call["completion_tokens"], call["duration"])
+        if not llm_calls:
+            return
+        room_usage = {"room_name": data.get("room_name"), **summarize_llm_calls(llm_calls)}
+        total_tokens = room_usage["prompt_tokens"] + room_usage["completion_tokens"]
+        if len(self.top_rooms) < self.top_rooms_size:
+            heapq.heappush(self.top_rooms, (total_tokens, filename, room_usage))
+        else:
+            heapq.heappushpop(self.top_rooms, (total_tokens, filename, room_usage))
+
+    def llm_usage_snapshot(self) -> Dict[str, Any]:
+        """
+        LLM usage of the live agent across recorded calls, and the calls that used the most tokens.
+        """
+        self.refresh()
+        with self._lock:
+            return {
+                "call_sites": self.llm_usage.snapshot(),
+                "top_rooms": [room_usage for _, _, room_usage in sorted(self.top_rooms, key=lambda item: -item[0])],
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        self.refresh()
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "endpointing": {
+                    "min_endpointing_delay": self.config.AGENT_MIN_ENDPOINTING_DELAY,
+                    "max_endpointing_delay": self.config.AGENT_MAX_ENDPOINTING_DELAY,
+                },
+                "stages": {
+                    stage: {
+                        **summarize_latencies(samples),
+                        "histogram": histogram(samples, HISTOGRAM_BUCKETS),
+                    }
+                    for stage, samples in self.samples.items()
+                },
+            }
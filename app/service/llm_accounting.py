@@ -0,0 +1,144 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from ..util.stats import summarize_latencies
+
+
+class UsageTotals:
+    """
+    Call count, tokens and time of LLM calls. Responses replayed from a cache are counted separately
+    and do not add to the token or time totals, since they cost no inference.
+    """
+    def __init__(self):
+        self.llm_calls = 0
+        self.cached_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.seconds = 0.0
+
+    def add(self, prompt_tokens: int, completion_tokens: int, seconds: float, cached: bool):
+        if cached:
+            self.cached_calls += 1
+            return
+        self.llm_calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.seconds += seconds
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "llm_calls": self.llm_calls,
+            "cached_calls": self.cached_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+class UsageMeter(UsageTotals):
+    """
+    Running totals of the LLM calls made for one job (a training run, an insights job), overall and per call site.
+    """
+    def __init__(self):
+        super().__init__()
+        self.call_sites: Dict[str, UsageTotals] = {}
+        self._lock = threading.Lock()
+
+    def record(self, call_site: str, prompt_tokens: int, completion_tokens: int, seconds: float, cached: bool):
+        with self._lock:
+            self.add(prompt_tokens, completion_tokens, seconds, cached)
+            self.call_sites.setdefault(call_site, UsageTotals()).add(prompt_tokens, completion_tokens, seconds, cached)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **super().snapshot(),
+                "call_sites": {name: totals.snapshot() for name, totals in sorted(self.call_sites.items())},
+            }
+
+
+class LLMUsageStats:
+    """
+    Process-wide LLM usage per call site: totals since startup and latency percentiles over the
+    most recent calls. Served by /api/metrics/llm-usage.
+    """
+    def __init__(self, max_samples: int = 10000):
+        self.max_samples = max_samples
+        self.call_sites: Dict[str, UsageTotals] = {}
+        self.latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, call_site: str, prompt_tokens: int, completion_tokens: int, seconds: float, cached: bool = False):
+        with self._lock:
+            self.call_sites.setdefault(call_site, UsageTotals()).add(prompt_tokens, completion_tokens, seconds, cached)
+            if not cached:
+                self.latencies.setdefault(call_site, deque(maxlen=self.max_samples)).append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {**totals.snapshot(), "latency_seconds": summarize_latencies(self.latencies.get(name, []))}
+                for name, totals in sorted(self.call_sites.items())
+            }
+
+
+llm_usage_stats = LLMUsageStats()
+
+# The meter of the job running in the current task, and the call site LLM calls are made from.
+# Tasks and threads started from the current task inherit both.
+current_usage_meter: ContextVar[Optional[UsageMeter]] = ContextVar("current_usage_meter", default=None)
+current_call_site: ContextVar[str] = ContextVar("current_call_site", default="unknown")
+
+
+@contextmanager
+def metered_usage() -> Iterator[UsageMeter]:
+    """
+    Meters the LLM calls made in the block, and in tasks started from it, into one UsageMeter.
+    Nested blocks share the outer meter, so a job's total includes the work it delegates.
+    """
+    meter = current_usage_meter.get()
+    if meter is not None:
+        yield meter
+        return
+    meter = UsageMeter()
+    token = current_usage_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        current_usage_meter.reset(token)
+
+
+@contextmanager
+def llm_call_site(name: str) -> Iterator[None]:
+    token = current_call_site.set(name)
+    try:
+        yield
+    finally:
+        current_call_site.reset(token)
+
+
+def record_llm_call(call_site: Optional[str] = None, prompt_tokens: int = 0, completion_tokens: int = 0,
+                    seconds: float = 0.0, cached: bool = False):
+    """
+    Records one LLM call in the process-wide stats and in the current job's meter, if any.
+    call_site defaults to the one set with llm_call_site.
+    """
+    call_site = call_site or current_call_site.get()
+    llm_usage_stats.record(call_site, prompt_tokens, completion_tokens, seconds, cached)
+    meter = current_usage_meter.get()
+    if meter is not None:
+        meter.record(call_site, prompt_tokens, completion_tokens, seconds, cached)
+
+
+def record_ollama_response(call_site: str, response_data: Dict[str, Any], seconds: float):
+    """
+    Records an Ollama /api/generate or /api/chat call from the token counts in its response body.
+    """
+    record_llm_call(call_site, response_data.get("prompt_eval_count") or 0, response_data.get("eval_count") or 0, seconds)
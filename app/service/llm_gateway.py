@@ -0,0 +1,344 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from ..config.config import Config
+from ..util.stats import summarize_latencies
+
+logger = logging.getLogger("llm-gateway")
+logger.setLevel(logging.INFO)
+
+HEALTH_CHECK_PATH = "/api/tags"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Admission order, highest priority first
+PRIORITY_CLASSES = ("live", "simulation", "batch")
+# Carries the priority class of requests sent through the /llm proxy
+PRIORITY_HEADER = "X-LLM-Priority"
+
+
+class PriorityClassStats:
+    def __init__(self, max_samples: int = 10000):
+        self.waiting = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.wait_seconds = deque(maxlen=max_samples)
+
+    def record_wait(self, seconds: float):
+        self.admitted += 1
+        self.wait_seconds.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "wait_seconds": summarize_latencies(self.wait_seconds),
+        }
+
+
+class LLMBackend:
+    """
+    One Ollama server. outstanding counts in-flight requests routed to it, sessions counts live calls
+    pinned to it; both feed least-outstanding routing, only outstanding is bounded by max_concurrency.
+    """
+    def __init__(self, url: str, max_concurrency: int):
+        self.url = url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.sessions = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_checked_at: Optional[float] = None
+
+    @property
+    def load(self) -> int:
+        return self.outstanding + self.sessions
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "sessions": self.sessions,
+            "max_concurrency": self.max_concurrency,
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class LLMGateway:
+    """
+    Routes LLM requests across several Ollama backends:
+    - least outstanding requests first, among healthy backends with a free concurrency slot
+    - callers wait when every backend is at its concurrency limit
+    - failure_threshold consecutive failures mark a backend unhealthy; a background task probes
+      unhealthy backends every health_check_interval seconds and brings them back when they answer
+    - if no backend is marked healthy, all of them are tried, since health may be stale
+    - requests carry a priority class (live, simulation, batch). Waiting requests are admitted
+      highest class first, and batch and simulation requests never take the last
+      live_reserved_slots slots, so live calls are not stuck behind a training run. Requests
+      already running are not preempted, because cancelling a generation wastes the work done so far.
+
+    Routing state is per process: the API process and each agent worker process have their own gateway.
+    Live calls are therefore spread by hashing the room name across backends, so workers that each see
+    no load of their own (AGENT_JOB_EXECUTOR_TYPE=process) do not all pick the first backend.
+    """
+    def __init__(self, urls: List[str], max_concurrency: int, health_check_interval: float, failure_threshold: int, live_reserved_slots: int = 0):
+        self.backends = [LLMBackend(url, max_concurrency) for url in urls]
+        self.health_check_interval = health_check_interval
+        self.failure_threshold = failure_threshold
+        self.live_reserved_slots = live_reserved_slots
+        self.class_stats = {priority: PriorityClassStats() for priority in PRIORITY_CLASSES}
+        self._waiters = []  # heap of (class rank, sequence, future, priority, exclude)
+        self._sequence = itertools.count()
+        self._health_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, config: Config) -> "LLMGateway":
+        urls = [url.strip() for url in config.MODEL_BACKENDS.split(",") if url.strip()]
+        return cls(
+            urls=urls,
+            max_concurrency=config.MODEL_BACKEND_MAX_CONCURRENCY,
+            health_check_interval=config.MODEL_BACKEND_HEALTH_CHECK_SECONDS,
+            failure_threshold=config.MODEL_BACKEND_FAILURE_THRESHOLD,
+            live_reserved_slots=config.LLM_LIVE_RESERVED_SLOTS,
+        )
+
+    def candidates(self, exclude=()) -> List[LLMBackend]:
+        backends = [backend for backend in self.backends if backend not in exclude]
+        healthy = [backend for backend in backends if backend.healthy]
+        return healthy or backends
+
+    def pick(self, exclude=()) -> LLMBackend:
+        """
+        Returns the least loaded backend without taking a concurrency slot (for live calls and sync callers).
+        """
+        candidates = self.candidates(exclude)
+        if not candidates:
+            raise RuntimeError("No LLM backends configured")
+        return min(candidates, key=lambda backend: backend.load)
+
+    def ranked(self) -> List[LLMBackend]:
+        """
+        All backends, healthy ones first, least loaded first; used as a failover order.
+        """
+        return sorted(self.backends, key=lambda backend: (not backend.healthy, backend.load))
+
+    @asynccontextmanager
+    async def acquire(self, exclude=(), priority: str = "batch") -> AsyncIterator[LLMBackend]:
+        """
+        Takes a concurrency slot on the least loaded healthy backend, waiting until one is free.
+        Waiting requests are admitted by priority class, then in arrival order.
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown LLM priority class '{priority}', expected one of {PRIORITY_CLASSES}")
+        self.ensure_health_checks()
+        if not self.candidates(exclude):
+            raise RuntimeError("No LLM backends left to try")
+
+        stats = self.class_stats[priority]
+        enqueued_at = time.perf_counter()
+        backend = None
+        if not self.has_waiters(up_to=priority):
+            backend = self.admit(priority, exclude)
+        if backend is None:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (PRIORITY_CLASSES.index(priority), next(self._sequence), future, priority, tuple(exclude)))
+            stats.waiting += 1
+            try:
+                backend = await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self.release(future.result(), priority)  # admitted just as the caller went away
+                raise
+            finally:
+                stats.waiting -= 1
+        stats.record_wait(time.perf_counter() - enqueued_at)
+        try:
+            yield backend
+        finally:
+            self.release(backend, priority)
+
+    def has_waiters(self, up_to: str) -> bool:
+        rank = PRIORITY_CLASSES.index(up_to)
+        return any(waiter[0] <= rank and not waiter[2].done() for waiter in self._waiters)
+
+    def non_live_headroom(self, exclude=()) -> int:
+        """
+        Slots batch and simulation requests may still take: everything except live_reserved_slots,
+        minus what is in flight. Live traffic counts against the same capacity, so the share left
+        to batch work shrinks as live concurrency rises.
+        """
+        candidates = self.candidates(exclude)
+        capacity = sum(backend.max_concurrency for backend in candidates)
+        reserved = min(self.live_reserved_slots, max(0, capacity - 1))
+        return capacity - reserved - sum(backend.outstanding for backend in candidates)
+
+    def admit(self, priority: str, exclude=()) -> Optional[LLMBackend]:
+        if priority != "live" and self.non_live_headroom(exclude) <= 0:
+            return None
+        free = [backend for backend in self.candidates(exclude) if backend.outstanding < backend.max_concurrency]
+        if not free:
+            return None
+        backend = min(free, key=lambda b: b.load)
+        backend.outstanding += 1
+        backend.requests += 1
+        self.class_stats[priority].in_flight += 1
+        return backend
+
+    def release(self, backend: LLMBackend, priority: str):
+        backend.outstanding -= 1
+        self.class_stats[priority].in_flight -= 1
+        self.dispatch()
+
+    def dispatch(self):
+        """
+        Hands free slots to waiting requests, highest priority class first.
+        """
+        remaining = []
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            _, _, future, priority, exclude = waiter
+            if future.done():
+                continue
+            backend = self.admit(priority, exclude)
+            if backend is None:
+                remaining.append(waiter)
+            else:
+                future.set_result(backend)
+        for waiter in remaining:
+            heapq.heappush(self._waiters, waiter)
+
+    def open_session(self, key: str = "") -> LLMBackend:
+        """
+        Pins a live call to a backend for its duration. Call close_session when it ends.
+        Takes the least loaded healthy backend; ties, which is every call when this process has no
+        other load, go to the backend that key (the room name) hashes to, so calls spread evenly
+        across worker processes and a backend's calls move elsewhere only while it is unhealthy.
+        """
+        self.ensure_health_checks()
+        candidates = self.candidates()
+        if not candidates:
+            raise RuntimeError("No LLM backends configured")
+        backend = min(candidates, key=lambda b: (b.load, -self.rendezvous_score(b, key)))
+        backend.sessions += 1
+        return backend
+
+    @staticmethod
+    def rendezvous_score(backend: LLMBackend, key: str) -> int:
+        digest = hashlib.sha256(f"{backend.url}\x00{key}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big")
+
+    def close_session(self, backend: LLMBackend):
+        backend.sessions = max(0, backend.sessions - 1)
+
+    def record_success(self, backend: LLMBackend):
+        backend.consecutive_failures = 0
+        if not backend.healthy:
+            backend.healthy = True
+            self.dispatch()
+
+    def record_failure(self, backend: LLMBackend, error: Exception):
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        backend.last_error = str(error) or type(error).__name__
+        if backend.healthy and backend.consecutive_failures >= self.failure_threshold:
+            backend.healthy = False
+            logger.warning(f"LLM backend {backend.url} marked unhealthy: {backend.last_error}")
+            self.dispatch()
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        if getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES:
+            return True  # ollama.ResponseError
+        return isinstance(error, (httpx.TransportError, ConnectionError, asyncio.TimeoutError))
+
+    async def post(self, client: httpx.AsyncClient, path: str, payload: Dict[str, Any], priority: str = "batch") -> httpx.Response:
+        """
+        POSTs payload to path on the least loaded backend, failing over to the other backends on
+        connection errors, timeouts and 5xx responses. Raises the last error once all backends failed.
+        """
+        tried = []
+        while True:
+            async with self.acquire(exclude=tried, priority=priority) as backend:
+                try:
+                    response = await client.post(f"{backend.url}{path}", json=payload)
+                    response.raise_for_status()
+                except Exception as e:
+                    if not self.is_retryable(e):
+                        raise
+                    self.record_failure(backend, e)
+                    tried.append(backend)
+                    if not self.candidates(exclude=tried):
+                        raise
+                    logger.warning(f"LLM request to {backend.url} failed, failing over: {e}")
+                    continue
+                self.record_success(backend)
+                return response
+
+    def ensure_health_checks(self):
+        if self.health_check_interval <= 0 or len(self.backends) < 2:
+            return
+        # A task left behind by a closed loop (e.g. a finished agent job's) would never run again
+        if self._health_task is None or self._health_task.done() or self._health_task.get_loop().is_closed():
+            try:
+                self._health_task = asyncio.get_running_loop().create_task(self.run_health_checks())
+            except RuntimeError:
+                pass  # no running loop (sync caller); checks start with the first async request
+
+    async def run_health_checks(self):
+        async with httpx.AsyncClient(timeout=5) as client:
+            while True:
+                await asyncio.sleep(self.health_check_interval)
+                await asyncio.gather(*(self.check(backend, client) for backend in self.backends))
+
+    async def check(self, backend: LLMBackend, client: httpx.AsyncClient):
+        backend.last_checked_at = time.time()
+        try:
+            response = await client.get(f"{backend.url}{HEALTH_CHECK_PATH}")
+            response.raise_for_status()
+        except Exception as e:
+            backend.last_error = str(e) or type(e).__name__
+            if backend.healthy:
+                backend.healthy = False
+                logger.warning(f"LLM backend {backend.url} failed its health check: {backend.last_error}")
+            return
+        backend.consecutive_failures = 0
+        if not backend.healthy:
+            logger.info(f"LLM backend {backend.url} is healthy again")
+            backend.healthy = True
+            self.dispatch()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "backends": [backend.snapshot() for backend in self.backends],
+            "live_reserved_slots": self.live_reserved_slots,
+            "priority_classes": {priority: stats.snapshot() for priority, stats in self.class_stats.items()},
+        }
+
+
+_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """
+    Returns the process-wide gateway, so every LLM consumer in a process shares the same routing state.
+    """
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway.from_config(Config())
+    return _gateway
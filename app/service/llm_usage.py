@@ -0,0 +1,71 @@
+import time
+from typing import Any, Dict, List
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import Generation, LLMResult
+
+from .llm_accounting import record_llm_call
+
+
+def generation_usage(generation: Generation) -> Dict[str, int]:
+    """
+    Prompt and completion token counts of a generation, as reported by Ollama
+    (prompt_eval_count / eval_count via usage_metadata).
+    """
+    message = getattr(generation, "message", None)
+    usage = getattr(message, "usage_metadata", None) or {}
+    info = generation.generation_info or {}
+    return {
+        "prompt_tokens": usage.get("input_tokens") or info.get("prompt_eval_count") or 0,
+        "completion_tokens": usage.get("output_tokens") or info.get("eval_count") or 0,
+    }
+
+
+class TokenUsageCallback(AsyncCallbackHandler):
+    """
+    Records prompt and completion token counts of every LLM call made with this callback.
+    """
+    def __init__(self):
+        self.records: List[Dict[str, int]] = []
+
+    async def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                self.records.append(generation_usage(generation))
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(record["prompt_tokens"] for record in self.records)
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(record["completion_tokens"] for record in self.records)
+
+
+class UsageAccountingCallback(AsyncCallbackHandler):
+    """
+    Records every call of the LangChain model it is attached to with record_llm_call, under the
+    current call site, without threading callbacks through each chain.
+    """
+    def __init__(self):
+        self.started: Dict[UUID, float] = {}
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID, **kwargs: Any) -> None:
+        self.started[run_id] = time.perf_counter()
+
+    async def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self.started[run_id] = time.perf_counter()
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self.started.pop(run_id, None)
+        seconds = time.perf_counter() - started if started is not None else 0.0
+        for generations in response.generations:
+            for generation in generations:
+                usage = generation_usage(generation)
+                cached = bool((generation.generation_info or {}).get("cached"))
+                record_llm_call(None, usage["prompt_tokens"], usage["completion_tokens"], seconds, cached)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.started.pop(run_id, None)
@@ -1,36 +1,154 @@
 
-from twilio.rest import Client
 from livekit import api
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List
+import asyncio
 import json
 import logging
+import re
+import time
 
+from ..config.config import Config
 from ..model.call_request import CallRequest
+from ..constant.prompt_constants import DEFAULT_AGENT_INSTRUCTIONS
+
+if TYPE_CHECKING:
+    from twilio.rest import Client
 
 logger = logging.getLogger("main-service")
 logger.setLevel(logging.INFO)
 
+
+def normalize_phone_number(phone_number: str) -> str:
+    """
+    Brings a number into the E.164 form Twilio reports ("+15551234567"): formatting characters are
+    dropped and an international "00" prefix becomes "+". Numbers are expected to include the country code.
+    """
+    digits = re.sub(r"[^\d]", "", phone_number)
+    if not phone_number.strip().startswith("+") and digits.startswith("00"):
+        digits = digits[2:]
+    return f"+{digits}"
+
+
 class MainService:
     def __init__(self):
+        self.config = Config()
+        # normalized phone_number -> (is_valid, expires_at)
+        self.validation_cache: Dict[str, tuple] = {}
+        self.next_purge_at = 0.0
+        # The Twilio SDK is synchronous; its calls run on this bounded pool instead of the event loop.
+        self.twilio_executor = ThreadPoolExecutor(
+            max_workers=self.config.TWILIO_MAX_WORKERS,
+            thread_name_prefix="twilio"
+        )
         logger.info("MainService initialized.")
 
-    async def validate_phone_number(self, phone_number: str, twilio_client: Client) -> bool:
+    def build_room_name(self, phone_number: str, suffix: str = None) -> str:
+        room_name = f"debt-collection-{phone_number.replace('+', '')}"
+        return f"{room_name}-{suffix}" if suffix else room_name
+
+    def build_agent_instructions(self, request: CallRequest) -> str:
+        """
+        Returns the request's custom instructions, or the default instructions filled in with the customer's details.
+        """
+        if request.agent_instructions:
+            return request.agent_instructions
+        return DEFAULT_AGENT_INSTRUCTIONS. \
+        replace("{customer_name}", request.customer_name). \
+        replace("{amount_due}", f"{request.amount_due}"). \
+        replace("{card_number_ending}", request.card_number_ending)
+
+    async def validate_phone_number(self, phone_number: str, twilio_client: "Client") -> bool:
+        """
+        Checks whether the number is one of the account's Twilio numbers or verified caller ids.
+        Results are cached for TWILIO_VALIDATION_CACHE_TTL_SECONDS; lookup errors are not cached.
+        """
+        self.purge_validation_cache()
+        cached = self.cached_validation(phone_number)
+        if cached is not None:
+            return cached
         try:
-            incoming_numbers = twilio_client.incoming_phone_numbers.list(
-                phone_number=phone_number
+            loop = asyncio.get_running_loop()
+            is_valid = await loop.run_in_executor(
+                self.twilio_executor, self.lookup_phone_number, normalize_phone_number(phone_number), twilio_client
             )
-            if incoming_numbers:
-                return True
-            
-            outgoing_caller_ids = twilio_client.outgoing_caller_ids.list(
-                phone_number=phone_number
-            )
-            if outgoing_caller_ids:
-                return True
-            
-            return False
         except Exception as e:
             print(f"Error validating phone number: {e}")
             return False
+        self.validation_cache[normalize_phone_number(phone_number)] = (
+            is_valid, time.monotonic() + self.config.TWILIO_VALIDATION_CACHE_TTL_SECONDS
+        )
+        return is_valid
+
+    async def warm_validation_cache(self, phone_numbers: List[str], twilio_client: "Client") -> Dict[str, bool]:
+        """
+        Validates many numbers at once: instead of two Twilio lookups per number, the account's numbers
+        and verified caller ids are listed once (two paginated requests in total) and matched locally.
+        Both sides are compared in E.164 form, so formatting differences in the input do not matter.
+        """
+        self.purge_validation_cache()
+        results = {}
+        pending = []
+        for phone_number in phone_numbers:
+            cached = self.cached_validation(phone_number)
+            if cached is None:
+                pending.append(phone_number)
+            else:
+                results[phone_number] = cached
+        if not pending:
+            return results
+
+        loop = asyncio.get_running_loop()
+        known_numbers = await loop.run_in_executor(self.twilio_executor, self.list_account_numbers, twilio_client)
+        known_numbers = {normalize_phone_number(number) for number in known_numbers}
+        expires_at = time.monotonic() + self.config.TWILIO_VALIDATION_CACHE_TTL_SECONDS
+        for phone_number in pending:
+            normalized = normalize_phone_number(phone_number)
+            is_valid = normalized in known_numbers
+            self.validation_cache[normalized] = (is_valid, expires_at)
+            results[phone_number] = is_valid
+        return results
+
+    def cached_validation(self, phone_number: str):
+        normalized = normalize_phone_number(phone_number)
+        entry = self.validation_cache.get(normalized)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self.validation_cache[normalized]
+            return None
+        return entry[0]
+
+    def purge_validation_cache(self):
+        """
+        Drops expired entries. Runs at most once a minute (or once per TTL, if shorter), since it scans the whole cache.
+        """
+        now = time.monotonic()
+        if now < self.next_purge_at:
+            return
+        self.next_purge_at = now + min(60.0, self.config.TWILIO_VALIDATION_CACHE_TTL_SECONDS)
+        for phone_number in [number for number, (_, expires_at) in self.validation_cache.items() if expires_at < now]:
+            del self.validation_cache[phone_number]
+
+    def lookup_phone_number(self, phone_number: str, twilio_client: "Client") -> bool:
+        incoming_numbers = twilio_client.incoming_phone_numbers.list(
+            phone_number=phone_number
+        )
+        if incoming_numbers:
+            return True
+        
+        outgoing_caller_ids = twilio_client.outgoing_caller_ids.list(
+            phone_number=phone_number
+        )
+        if outgoing_caller_ids:
+            return True
+        
+        return False
+
+    def list_account_numbers(self, twilio_client: "Client") -> set:
+        numbers = {number.phone_number for number in twilio_client.incoming_phone_numbers.stream(page_size=1000)}
+        numbers.update(caller_id.phone_number for caller_id in twilio_client.outgoing_caller_ids.stream(page_size=1000))
+        return numbers
         
     async def create_livekit_room_and_dispatch_agent(
         self, 
@@ -112,5 +230,7 @@ class MainService:
             
             return {
                 "error": error_msg,
+                "twirp_code": e.code,
+                "sip_status_code": (e.metadata or {}).get("sip_status_code"),
                 "success": False
             }
\ No newline at end of file
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from statistics import mean
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config.config import Config
+from ..constant.prompt_constants import DEFAULT_AGENT_INSTRUCTIONS
+from .llm_accounting import metered_usage
+from .testing_service import TestingService
+
+logger = logging.getLogger("prompt-optimizer-service")
+logger.setLevel(logging.INFO)
+
+# EvalMetrics fields that make up a candidate prompt's score
+SCORE_FIELDS = ["resolution_score", "compliance_score", "empathy_score", "persuasion_score"]
+
+
+def score_metrics(all_metrics: List[Dict[str, Any]]) -> Tuple[Optional[float], Dict[str, float]]:
+    """
+    Averages each score field over the personas that were evaluated, and the fields into one score.
+    Failed personas and fields missing from an evaluation are left out.
+    """
+    scores = {}
+    for field in SCORE_FIELDS:
+        values = [float(metrics[field]) for metrics in all_metrics if isinstance(metrics.get(field), (int, float))]
+        if values:
+            scores[field] = round(mean(values), 3)
+    return (round(mean(scores.values()), 3) if scores else None), scores
+
+
+class PromptOptimizer:
+    """
+    Iteratively improves the agent prompt. Each round simulates and evaluates the current candidate against
+    every persona and scores it; only if another round will run are the personas' rewrites made and combined
+    into the next candidate. The best scoring candidate is kept. It stops after max_rounds, once `patience`
+    rounds in a row improved the best score by less than min_improvement, when the rewrites stop changing the
+    prompt, or when the LLM call or token budget is spent or the next round would exceed it, estimated from
+    the cost of the previous round. The first round always runs, so a budget too small for one round is
+    reported as stop_reason "budget" after it.
+    """
+    def __init__(self, testing_service: TestingService):
+        self.testing_service = testing_service
+        self.config = Config()
+
+    async def optimize(self, base_agent_prompt: str, persona_prompts: List[str], max_turns: int,
+                       concurrency: Optional[int] = None, memory_strategy: Optional[str] = None,
+                       max_rounds: Optional[int] = None, max_llm_calls: Optional[int] = None,
+                       max_tokens: Optional[int] = None, patience: Optional[int] = None,
+                       min_improvement: Optional[float] = None) -> Dict[str, Any]:
+        max_rounds = self.config.OPTIMIZER_MAX_ROUNDS if max_rounds is None else max_rounds
+        max_llm_calls = self.config.OPTIMIZER_MAX_LLM_CALLS if max_llm_calls is None else max_llm_calls
+        max_tokens = self.config.OPTIMIZER_MAX_TOKENS if max_tokens is None else max_tokens
+        patience = self.config.OPTIMIZER_PATIENCE if patience is None else patience
+        min_improvement = self.config.OPTIMIZER_MIN_IMPROVEMENT if min_improvement is None else min_improvement
+
+        with metered_usage() as meter:
+            # The meter may be shared with an enclosing job, so the budget counts from here
+            calls_at_start, tokens_at_start = meter.llm_calls, meter.total_tokens
+            base_prompt = candidate = base_agent_prompt or DEFAULT_AGENT_INSTRUCTIONS
+            rounds: List[Dict[str, Any]] = []
+            best_round = None
+            stale_rounds = 0
+            revision_tokens = 0
+            stop_reason = "max_rounds"
+
+            def over_budget(extra_calls: int = 0, extra_tokens: int = 0) -> bool:
+                spent_calls, spent_tokens = meter.llm_calls - calls_at_start, meter.total_tokens - tokens_at_start
+                return bool((max_llm_calls and spent_calls + extra_calls > max_llm_calls) or
+                            (max_tokens and spent_tokens + extra_tokens > max_tokens))
+
+            for round_index in range(max_rounds):
+                calls_before, tokens_before = meter.llm_calls, meter.total_tokens
+                results = await self.testing_service.run_persona_pipelines(
+                    candidate, persona_prompts, max_turns, concurrency, memory_strategy, rewrite=False
+                )
+                all_metrics = [result["metrics"] for result in results]
+                score, scores = score_metrics(all_metrics)
+
+                best_score = rounds[best_round]["score"] if best_round is not None else None
+                improved = score is not None and (best_score is None or score >= best_score + min_improvement)
+                if score is not None and (best_score is None or score > best_score):
+                    best_round = round_index
+                stale_rounds = 0 if improved else stale_rounds + 1
+
+                rounds.append({
+                    "round": round_index,
+                    "prompt": candidate,
+                    "score": score,
+                    "scores": scores,
+                    "metrics": all_metrics,
+                    "improved": improved,
+                    "llm_calls": meter.llm_calls - calls_before,
+                    "tokens": meter.total_tokens - tokens_before,
+                })
+                logger.info(f"Optimization round {round_index}: score {score} (best {rounds[best_round]['score'] if best_round is not None else None}), "
+                            f"{meter.llm_calls - calls_at_start} LLM calls and {meter.total_tokens - tokens_at_start} tokens spent")
+
+                if over_budget():
+                    stop_reason = "budget"
+                    break
+                if round_index == max_rounds - 1:
+                    break
+                if stale_rounds >= patience:
+                    stop_reason = "plateau"
+                    break
+                # The next round costs about as much as this one, plus a rewrite per evaluated persona,
+                # the call that combines them, and as many tokens as the last revision took
+                evaluated = [metrics for metrics in all_metrics if "error" not in metrics]
+                if over_budget(rounds[-1]["llm_calls"] + len(evaluated) + 1, rounds[-1]["tokens"] + revision_tokens):
+                    stop_reason = "budget"
+                    break
+
+                calls_before, tokens_before = meter.llm_calls, meter.total_tokens
+                next_candidate = await self.revise(candidate, evaluated, concurrency)
+                revision_tokens = meter.total_tokens - tokens_before
+                rounds[-1]["llm_calls"] += meter.llm_calls - calls_before
+                rounds[-1]["tokens"] += revision_tokens
+                if next_candidate.strip() == candidate.strip():
+                    stop_reason = "converged"
+                    break
+                candidate = next_candidate
+
+            best = rounds[best_round] if best_round is not None else None
+            return {
+                "best_prompt": best["prompt"] if best else base_prompt,
+                "best_score": best["score"] if best else None,
+                "best_round": best_round,
+                "rounds": rounds,
+                "stop_reason": stop_reason,
+                "usage": meter.snapshot(),
+            }
+
+    async def revise(self, candidate: str, all_metrics: List[Dict[str, Any]], concurrency: Optional[int] = None) -> str:
+        """
+        Rewrites the candidate with each persona's recommended edits, at most `concurrency` at a time, and
+        combines the rewrites into the next candidate. A failed rewrite is left out.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.config.TRAINING_CONCURRENCY)
+
+        async def rewrite(metrics: Dict[str, Any]) -> str:
+            async with semaphore:
+                try:
+                    return await self.testing_service.rewrite_prompt_text(candidate, metrics.get("recommended_prompt_edits"))
+                except Exception as e:
+                    logger.error(f"Prompt rewrite failed: {e}", exc_info=True)
+                    return ""
+
+        rewrites = await asyncio.gather(*(rewrite(metrics) for metrics in all_metrics))
+        return await self.testing_service.combine_prompt_revisions(candidate, [text for text in rewrites if text])
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from livekit import api
+
+logger = logging.getLogger("room-state-service")
+logger.setLevel(logging.INFO)
+
+PARTICIPANT_LEFT_EVENTS = {"participant_left", "participant_connection_aborted"}
+
+
+class RoomState:
+    def __init__(self, room_name: str):
+        self.room_name = room_name
+        self.exists = True
+        self.num_participants = 0
+        self.participants: List[str] = []
+        self.creation_time: Optional[int] = None
+        self.last_event_at = 0  # created_at of the last webhook event applied
+        self.source = "webhook"  # webhook | poll
+        self.updated_at = time.monotonic()
+
+    def update_room(self, room: api.Room, source: str):
+        self.exists = True
+        self.num_participants = room.num_participants
+        self.creation_time = room.creation_time or self.creation_time
+        self.source = source
+        self.updated_at = time.monotonic()
+
+    def status(self) -> Dict[str, Any]:
+        if not self.exists:
+            return {"status": "not_found", "room_name": self.room_name}
+        return {
+            "status": "active" if self.num_participants > 0 else "empty",
+            "room_name": self.room_name,
+            "num_participants": self.num_participants,
+            "participants": list(self.participants),
+            "creation_time": self.creation_time,
+        }
+
+
+class RoomStateCache:
+    """
+    In-memory room and participant state for call status polling.
+
+    LiveKit webhooks (room_started, room_finished, participant_joined, participant_left) keep entries
+    current without any request to LiveKit; webhook-fed entries are trusted for webhook_max_age_seconds
+    after their last event. Rooms with no fresh entry are refreshed with a single list_rooms call for
+    all of them, whose result is trusted for ttl_seconds. Concurrent refreshes are serialized, so many
+    pollers asking for the same rooms share one LiveKit request per ttl window.
+    list_rooms only reports participant counts, so participant identities come from webhooks.
+    Webhooks may arrive out of order; an event created before the last one applied to its room is ignored.
+    """
+    def __init__(self, livekit_api: api.LiveKitAPI, ttl_seconds: float, webhook_max_age_seconds: float, max_rooms: int = 10000):
+        self.livekit_api = livekit_api
+        self.ttl_seconds = ttl_seconds
+        self.webhook_max_age_seconds = webhook_max_age_seconds
+        self.max_rooms = max_rooms
+        self.rooms: Dict[str, RoomState] = {}
+        self.webhook_events = 0
+        self.stale_events = 0
+        self.refreshes = 0
+        self._refresh_lock = asyncio.Lock()
+
+    def entry(self, room_name: str) -> RoomState:
+        state = self.rooms.get(room_name)
+        if state is None:
+            state = self.rooms[room_name] = RoomState(room_name)
+            self.trim()
+        return state
+
+    def is_fresh(self, state: Optional[RoomState], now: float) -> bool:
+        if state is None:
+            return False
+        max_age = self.webhook_max_age_seconds if state.source == "webhook" else self.ttl_seconds
+        return now - state.updated_at < max_age
+
+    def apply_event(self, event: api.WebhookEvent):
+        """
+        Updates the cache from a LiveKit webhook event.
+        """
+        room_name = event.room.name if event.HasField("room") else None
+        if not room_name:
+            return
+        self.webhook_events += 1
+        state = self.entry(room_name)
+        # created_at has one second resolution, so events of the same second are all applied
+        if event.created_at and event.created_at < state.last_event_at:
+            self.stale_events += 1
+            return
+        state.last_event_at = max(state.last_event_at, event.created_at)
+
+        if event.event == "room_finished":
+            state.exists = False
+            state.num_participants = 0
+            state.participants = []
+        elif event.event == "participant_joined":
+            state.exists = True
+            identity = event.participant.identity
+            if identity and identity not in state.participants:
+                state.participants.append(identity)
+            state.num_participants = max(event.room.num_participants, len(state.participants))
+        elif event.event in PARTICIPANT_LEFT_EVENTS:
+            identity = event.participant.identity
+            known = identity in state.participants
+            if known:
+                state.participants.remove(identity)
+            # Polled entries count participants whose identities are unknown, so count down instead
+            # of recounting; a repeated event for an identity already removed changes nothing
+            if known or state.num_participants > len(state.participants):
+                state.num_participants = max(len(state.participants), state.num_participants - 1)
+        else:
+            state.update_room(event.room, "webhook")
+        if event.event != "room_finished" and event.room.creation_time:
+            state.creation_time = event.room.creation_time
+        state.source = "webhook"
+        state.updated_at = time.monotonic()
+
+    async def get_statuses(self, room_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the status of every requested room, refreshing stale ones with one list_rooms call.
+        """
+        room_names = list(dict.fromkeys(room_names))
+        if any(not self.is_fresh(self.rooms.get(name), time.monotonic()) for name in room_names):
+            async with self._refresh_lock:
+                # Another poller may have refreshed these rooms while this one waited for the lock
+                now = time.monotonic()
+                stale = [name for name in room_names if not self.is_fresh(self.rooms.get(name), now)]
+                if stale:
+                    await self.refresh(stale)
+        return {name: self.rooms[name].status() for name in room_names}
+
+    async def refresh(self, room_names: List[str]):
+        self.refreshes += 1
+        response = await self.livekit_api.room.list_rooms(api.ListRoomsRequest(names=room_names))
+        found = {room.name: room for room in response.rooms}
+        for name in room_names:
+            state = self.entry(name)
+            if name in found:
+                state.update_room(found[name], "poll")
+                if state.num_participants == 0:
+                    state.participants = []
+            else:
+                state.exists = False
+                state.num_participants = 0
+                state.participants = []
+                state.source = "poll"
+                state.updated_at = time.monotonic()
+
+    def trim(self):
+        """
+        Drops the least recently updated rooms once there are more than max_rooms, so finished calls do not
+        accumulate. Trims down to 90% of max_rooms so the sort is not repeated for every new room.
+        """
+        if len(self.rooms) <= self.max_rooms:
+            return
+        excess = len(self.rooms) - int(self.max_rooms * 0.9)
+        for name, _ in sorted(self.rooms.items(), key=lambda item: item[1].updated_at)[:excess]:
+            del self.rooms[name]
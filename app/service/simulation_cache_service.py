@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration
+
+logger = logging.getLogger("simulation-cache-service")
+logger.setLevel(logging.INFO)
+
+class SimulationCache(BaseCache):
+    """
+    Persistent SQLite cache of LLM responses for prompt training, plugged into LangChain as the model's cache.
+    Entries are keyed by a hash of the model settings (model, temperature, seed, ...) and the full message list
+    (system prompt and conversation history), so re-running a simulation replays every turn whose conversation
+    prefix is unchanged, and only the turns after the first difference reach the LLM.
+    Once the cache holds more than `max_entries`, the least recently used entries are evicted.
+    """
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_eviction = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS simulation_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    generations TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_simulation_cache_last_accessed ON simulation_cache(last_accessed)")
+        self.evict()
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        cache_key = self.make_key(prompt, llm_string)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT generations FROM simulation_cache WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE simulation_cache SET last_accessed = ? WHERE cache_key = ?", (time.time(), cache_key))
+        self.hits += 1
+        return self.deserialize(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO simulation_cache (cache_key, generations, created_at, last_accessed) VALUES (?, ?, ?, ?)",
+                (self.make_key(prompt, llm_string), self.serialize(return_val), now, now)
+            )
+        self._puts_since_eviction += 1
+        if self._puts_since_eviction >= self.EVICT_EVERY:
+            self.evict()
+
+    @staticmethod
+    def serialize(generations: RETURN_VAL_TYPE) -> str:
+        return json.dumps([
+            {"message": message_to_dict(generation.message), "generation_info": generation.generation_info}
+            for generation in generations
+        ])
+
+    @staticmethod
+    def deserialize(text: str) -> RETURN_VAL_TYPE:
+        entries = json.loads(text)
+        messages = messages_from_dict([entry["message"] for entry in entries])
+        return [
+            ChatGeneration(message=message, generation_info={**(entry["generation_info"] or {}), "cached": True})
+            for message, entry in zip(messages, entries)
+        ]
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM simulation_cache")
+
+    def evict(self):
+        """
+        Drops the least recently used entries beyond max_entries.
+        """
+        self._puts_since_eviction = 0
+        with self._lock, self._conn:
+            count = self._conn.execute("SELECT COUNT(*) FROM simulation_cache").fetchone()[0]
+            overflow = max(0, count - self.max_entries)
+            if overflow:
+                self._conn.execute(
+                    "DELETE FROM simulation_cache WHERE cache_key IN (SELECT cache_key FROM simulation_cache ORDER BY last_accessed ASC LIMIT ?)",
+                    (overflow,)
+                )
+        if overflow:
+            logger.info(f"Evicted {overflow} least recently used simulation cache entries")
@@ -1,84 +1,303 @@
-import requests
+import httpx
+import asyncio
+import time
 import json
 import os
 import logging
 
 from ..config.config import Config
+from ..util.stats import summarize_latencies
+from ..util.tokens import estimate_tokens
+from .llm_accounting import metered_usage, record_llm_call, record_ollama_response
+from .analysis_cache_service import AnalysisCache
+from .llm_gateway import get_llm_gateway
+from .insights_index_service import InsightsIndex
+from .transcript_store import is_transcript_file, read_conversation, read_transcript
 
 logger = logging.getLogger("insights-service")
 logger.setLevel(logging.INFO)
 
 class InsightsService:
+    # Bump whenever build_prompt or parse_analysis change, so cached analyses are not reused across prompts.
+    PROMPT_VERSION = "2"
+
     def __init__(self):
         self.config = Config()
+        self.gateway = get_llm_gateway()
+        self.cache = None
+        if self.config.ANALYSIS_CACHE_ENABLED:
+            self.cache = AnalysisCache(
+                path=self.config.ANALYSIS_CACHE_PATH,
+                max_entries=self.config.ANALYSIS_CACHE_MAX_ENTRIES,
+                max_age_seconds=self.config.ANALYSIS_CACHE_MAX_AGE_SECONDS
+            )
+        self.index = InsightsIndex(self.config.INSIGHTS_INDEX_PATH)
+        # Transcripts being analyzed right now, so the watcher and insights jobs never pick up the same file twice
+        self.claimed_paths = set()
+
+    def build_prompt(self, transcript_content):
+        """
+        Builds the risk classification prompt for a single transcript.
+        """
+        return f"""
+        Analyze the following customer transcript to assess the risk of them not paying back their credit card dues on time.
+        Based *only* on the content of this transcript, classify the customer's risk and provide a brief justification.
+
+        Your response MUST be a valid JSON object with two keys:
+        1. "category": A single word, either "HIGH", "MEDIUM", or "LOW".
+        2. "justification": A brief, one-sentence explanation for your classification, citing key phrases from the transcript if possible.
+
+        Example response format:
+        {{
+        "category": "HIGH",
+        "justification": "The customer mentioned a recent job loss and uncertainty about making the next payment."
+        }}
+
+        Transcript:
+        ---
+        {transcript_content}
+        ---
+
+        JSON Response:
+        """
+
+    def build_payload(self, prompt):
+        return {
+            "model": self.config.MODEL_NAME,
+            "prompt": prompt,
+            "stream": False,
+            "format": "json" # Specify JSON format for the response
+        }
+
+    def cached_analysis(self, transcript_content):
+        """
+        Returns (cache_key, cached_result) for the transcript; both are None when caching is disabled.
+        """
+        if self.cache is None:
+            return None, None
+        cache_key = AnalysisCache.make_key(transcript_content, self.config.MODEL_NAME, self.PROMPT_VERSION)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            record_llm_call("insights.analyze", cached=True)
+        return cache_key, cached
+
+    def store_analysis(self, cache_key, result):
+        risk_category, justification = result
+        if cache_key is not None and risk_category in ["HIGH", "MEDIUM", "LOW"]:
+            self.cache.put(cache_key, risk_category, justification)
+        return result
+
+    def store_analyses(self, entries):
+        for cache_key, result in entries:
+            self.store_analysis(cache_key, result)
+
+    def parse_analysis(self, response_data):
+        """
+        Parses an Ollama /api/generate response body into (risk_category, justification).
+        """
+        # The model's response is a JSON string, so we parse it into a dictionary
+        analysis_result = json.loads(response_data.get("response", "{}"))
 
-    def analyze_transcript(self, file_path):
+        category = analysis_result.get("category", "INVALID_FORMAT").strip().upper()
+        justification = analysis_result.get("justification", "Model did not provide a justification.")
+
+        if category not in ["HIGH", "MEDIUM", "LOW"]:
+            return "UNEXPECTED_CATEGORY", f"Model returned an invalid category: {category}"
+
+        return category, justification
+
+    async def analyze_transcript_async(self, file_path, client: httpx.AsyncClient):
         """
-        Analyzes a transcript file to determine risk category and justification.
+        Classifies one transcript file, posting through a shared, pooled httpx client.
 
         Args:
             file_path (str): The full path to the transcript file.
+            client (httpx.AsyncClient): The pooled client used for all requests of a batch.
 
         Returns:
             tuple: A tuple containing (risk_category, justification) or (error_message, None).
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                transcript_content = file.read()
-
-            prompt = f"""
-            Analyze the following customer transcript to assess the risk of them not paying back their credit card dues on time.
-            Based *only* on the content of this transcript, classify the customer's risk and provide a brief justification.
-
-            Your response MUST be a valid JSON object with two keys:
-            1. "category": A single word, either "HIGH", "MEDIUM", or "LOW".
-            2. "justification": A brief, one-sentence explanation for your classification, citing key phrases from the transcript if possible.
-
-            Example response format:
-            {{
-            "category": "HIGH",
-            "justification": "The customer mentioned a recent job loss and uncertainty about making the next payment."
-            }}
-
-            Transcript:
-            ---
-            {transcript_content}
-            ---
-
-            JSON Response:
-            """
-
-            payload = {
-                "model": self.config.MODEL_NAME,
-                "prompt": prompt,
-                "stream": False,
-                "format": "json" # Specify JSON format for the response
-            }
+            # Only the conversation is classified, not the customer info and call metrics records
+            transcript_content = await asyncio.to_thread(read_conversation, file_path)
+        except FileNotFoundError:
+            return "ERROR_FILE_NOT_FOUND", None
+        except ValueError as e:
+            return "ERROR_INVALID_TRANSCRIPT", f"Details: {e}"
+        return await self.analyze_content_async(transcript_content, client)
 
-            response = requests.post(self.config.MODEL_GENERATE_URL, json=payload)
-            response.raise_for_status()
+    async def analyze_content_async(self, transcript_content, client: httpx.AsyncClient):
+        """
+        Classifies one transcript's content with its own model request (or from the analysis cache).
 
-            # The model's response is a JSON string, so we parse it into a dictionary
-            response_data = response.json()
-            analysis_result = json.loads(response_data.get("response", "{}"))
+        Returns:
+            tuple: A tuple containing (risk_category, justification) or (error_message, None).
+        """
+        try:
+            # The cache is SQLite, so it is read and written off the event loop
+            cache_key, cached = await asyncio.to_thread(self.cached_analysis, transcript_content)
+            if cached is not None:
+                return cached
 
-            category = analysis_result.get("category", "INVALID_FORMAT").strip().upper()
-            justification = analysis_result.get("justification", "Model did not provide a justification.")
+            payload = self.build_payload(self.build_prompt(transcript_content))
 
-            if category not in ["HIGH", "MEDIUM", "LOW"]:
-                return "UNEXPECTED_CATEGORY", f"Model returned an invalid category: {category}"
+            started = time.perf_counter()
+            response = await self.gateway.post(client, "/api/generate", payload, priority="batch")
+            response_data = response.json()
+            record_ollama_response("insights.analyze", response_data, time.perf_counter() - started)
 
-            return category, justification
+            return await asyncio.to_thread(self.store_analysis, cache_key, self.parse_analysis(response_data))
 
-        except FileNotFoundError:
-            return "ERROR_FILE_NOT_FOUND", None
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             return f"ERROR_OLLAMA_CONNECTION", f"Details: {e}"
         except json.JSONDecodeError:
             return "ERROR_INVALID_JSON", "The model did not return a valid JSON response."
         except Exception as e:
             return f"ERROR_UNEXPECTED", f"Details: {e}"
 
+    def build_batch_prompt(self, items):
+        """
+        Builds one risk classification prompt for several short transcripts.
+
+        Args:
+            items (list): (filename, transcript_content) pairs.
+        """
+        transcripts = "\n\n".join(
+            f"FILE: {filename}\n---\n{transcript_content}\n---" for filename, transcript_content in items
+        )
+        return f"""
+        Analyze each of the following customer transcripts to assess the risk of that customer not paying back their credit card dues on time.
+        Classify every transcript independently, based *only* on the content of that transcript, and provide a brief justification.
+
+        Your response MUST be a valid JSON object with one key, "results": an array with exactly one entry per transcript, each with three keys:
+        1. "file": The FILE name of the transcript, exactly as given.
+        2. "category": A single word, either "HIGH", "MEDIUM", or "LOW".
+        3. "justification": A brief, one-sentence explanation for your classification, citing key phrases from the transcript if possible.
+
+        Example response format:
+        {{
+        "results": [
+            {{"file": "transcript_example_1.jsonl", "category": "HIGH", "justification": "The customer mentioned a recent job loss and uncertainty about making the next payment."}},
+            {{"file": "transcript_example_2.jsonl", "category": "LOW", "justification": "The customer agreed to pay the full amount today."}}
+        ]
+        }}
+
+        Transcripts:
+        {transcripts}
+
+        JSON Response:
+        """
+
+    def parse_batch_analysis(self, response_data, filenames):
+        """
+        Parses a batched /api/generate response into {filename: (risk_category, justification)}.
+        Only well-formed entries for expected, not yet seen files are returned; callers re-analyze the rest one by one.
+        """
+        analysis_result = json.loads(response_data.get("response", "{}"))
+        entries = analysis_result.get("results") if isinstance(analysis_result, dict) else analysis_result
+        if not isinstance(entries, list):
+            return {}
+
+        expected = set(filenames)
+        results = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            filename = entry.get("file")
+            category = str(entry.get("category", "")).strip().upper()
+            justification = entry.get("justification")
+            if filename not in expected or filename in results:
+                continue
+            if category not in ["HIGH", "MEDIUM", "LOW"] or not isinstance(justification, str) or not justification.strip():
+                continue
+            results[filename] = (category, justification)
+        return results
+
+    async def analyze_batch_async(self, items, client: httpx.AsyncClient, semaphore: asyncio.Semaphore):
+        """
+        Classifies several short transcripts with a single model request. Transcripts whose entry is
+        missing or malformed in the response (or all of them, if the request fails) fall back to
+        single-file analysis. The batch request and every fallback request each hold a semaphore slot
+        of their own, so fallbacks run with the run's full concurrency.
+
+        Args:
+            items (list): (filename, transcript_content, cache_key) tuples.
+            client (httpx.AsyncClient): The pooled client used for all requests of a batch.
+            semaphore (asyncio.Semaphore): Bounds the in-flight model requests of the run.
+
+        Returns:
+            dict: {filename: (risk_category, justification)} for every item.
+        """
+        filenames = [filename for filename, _, _ in items]
+        results = {}
+        try:
+            payload = self.build_payload(self.build_batch_prompt([(filename, content) for filename, content, _ in items]))
+            async with semaphore:
+                started = time.perf_counter()
+                response = await self.gateway.post(client, "/api/generate", payload, priority="batch")
+            response_data = response.json()
+            record_ollama_response("insights.analyze_batch", response_data, time.perf_counter() - started)
+            results = self.parse_batch_analysis(response_data, filenames)
+        except Exception as e:
+            # Any failure of the batch only costs the single-file fallbacks below
+            logger.warning(f"Batched analysis of {len(items)} transcripts failed, analyzing them one by one: {e}")
+
+        await asyncio.to_thread(self.store_analyses, [
+            (cache_key, results[filename]) for filename, _, cache_key in items if filename in results
+        ])
+
+        fallbacks = [(filename, content) for filename, content, _ in items if filename not in results]
+        async def analyze_single(content):
+            async with semaphore:
+                return await self.analyze_content_async(content, client)
+
+        if fallbacks:
+            logger.info(f"Re-analyzing {len(fallbacks)} of {len(items)} batched transcripts individually")
+            single_results = await asyncio.gather(*(analyze_single(content) for _, content in fallbacks))
+            results.update(zip([filename for filename, _ in fallbacks], single_results))
+        return results
+
+    def plan_batches(self, source_directory, filenames):
+        """
+        Splits files for batched analysis: cached results are returned directly, short transcripts are packed
+        into batches of at most INSIGHTS_BATCH_MAX_FILES files and INSIGHTS_BATCH_MAX_TOKENS estimated tokens
+        of conversation text, and longer, unreadable or malformed ones are left for single-file analysis.
+
+        Returns:
+            tuple: (cached {filename: result}, batches [[(filename, content, cache_key)]], singles [filename])
+        """
+        cached_results, batches, singles = {}, [], []
+        batch, batch_tokens = [], 0
+        for filename in filenames:
+            try:
+                transcript_content = read_conversation(os.path.join(source_directory, filename))
+            except (OSError, ValueError):
+                singles.append(filename)
+                continue
+
+            cache_key, cached = self.cached_analysis(transcript_content)
+            if cached is not None:
+                cached_results[filename] = cached
+                continue
+
+            tokens = estimate_tokens(transcript_content)
+            if tokens > self.config.INSIGHTS_BATCH_MAX_TRANSCRIPT_TOKENS:
+                singles.append(filename)
+                continue
+            if batch and (batch_tokens + tokens > self.config.INSIGHTS_BATCH_MAX_TOKENS or len(batch) >= self.config.INSIGHTS_BATCH_MAX_FILES):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append((filename, transcript_content, cache_key))
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+
+        # A batch of one is just a single request with a longer prompt
+        for batch in [batch for batch in batches if len(batch) == 1]:
+            batches.remove(batch)
+            singles.append(batch[0][0])
+        return cached_results, batches, singles
+
     def write_insight(self, filename, risk_category, justification):
         """
         Writes the analysis result and justification to a structured JSON file.
@@ -109,38 +328,156 @@ class InsightsService:
         except Exception as e:
             print(f" -> Error writing file '{output_path}': {e}")
 
-    def generate(self):
+    def record_result(self, filename, file_path, risk_category, justification):
+        """
+        Writes and indexes the insight for an analyzed file and moves the file to the processed directory.
+        """
+        if justification is not None:
+            self.write_insight(filename, risk_category, justification)
+        else:
+            error_message = f"Analysis failed for '{filename}'. Reason: {risk_category}"
+            print(f" -> {error_message}")
+            risk_category, justification = "ANALYSIS_FAILED", risk_category
+            self.write_insight(filename, risk_category, justification)
+        self.index_insight(filename, file_path, risk_category, justification)
+
+        processed_dir = self.config.PROCESSED_DIRECTORY
+        os.makedirs(processed_dir, exist_ok=True)
+        new_path = os.path.join(processed_dir, filename)
+        if os.path.abspath(file_path) != os.path.abspath(new_path):
+            os.rename(file_path, new_path)
+
+    def index_insight(self, filename, file_path, risk_category, justification):
+        """
+        Adds the insight, with the customer details from the transcript, to the insights index.
+        """
+        try:
+            customer_info = read_transcript(file_path)["customer_info"]
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read customer info from '{filename}': {e}")
+            customer_info = {}
+        try:
+            self.index.upsert(InsightsIndex.build_record(
+                source_file=filename,
+                category=risk_category,
+                justification=justification,
+                model_used=self.config.MODEL_NAME,
+                customer_info=customer_info,
+            ))
+        except Exception as e:
+            logger.error(f"Could not index insight for '{filename}': {e}")
+
+    def reindex(self):
+        """
+        Indexes the insight files already in DESTINATION_DIRECTORY, e.g. those written before the index existed.
         """
-        Main function to orchestrate the analysis and file writing process.
+        return self.index.rebuild(
+            self.config.DESTINATION_DIRECTORY,
+            [self.config.PROCESSED_DIRECTORY, self.config.SOURCE_DIRECTORY]
+        )
+
+    async def generate_batch(self, concurrency=None, on_start=None, on_file_done=None, source_directory=None):
         """
+        Async batch engine: analyzes every transcript in the source directory with at most
+        `concurrency` requests in flight, sharing one pooled HTTP client. Each insight is written
+        and its file moved to the processed directory as soon as that file finishes.
+        With INSIGHTS_BATCH_ENABLED, short transcripts are classified several per request.
+
+        Args:
+            concurrency (int): Maximum number of in-flight model requests. Defaults to INSIGHTS_CONCURRENCY.
+            on_start (callable): Optional callback receiving the number of files to analyze.
+            on_file_done (callable): Optional callback receiving (filename, risk_category, justification) per file.
+            source_directory (str): Directory to analyze. Defaults to SOURCE_DIRECTORY; pass PROCESSED_DIRECTORY
+                to re-score already processed transcripts, which are then left in place.
+
+        Returns:
+            dict: The risk counts plus throughput, per-file latency and LLM usage statistics for the run.
+        """
+        concurrency = concurrency or self.config.INSIGHTS_CONCURRENCY
+        source_directory = source_directory or self.config.SOURCE_DIRECTORY
         risk_counts = {'MEDIUM': 0, 'LOW': 0, 'HIGH': 0}
-        if not os.path.isdir(self.config.SOURCE_DIRECTORY):
-            print(f"Error: The source directory '{self.config.SOURCE_DIRECTORY}' does not exist.")
+        if not os.path.isdir(source_directory):
+            print(f"Error: The source directory '{source_directory}' does not exist.")
             return
 
-        print(f"Starting analysis of files in: {self.config.SOURCE_DIRECTORY}")
-        print(f"Results will be saved in: {self.config.DESTINATION_DIRECTORY}\n")
-
-        for filename in os.listdir(self.config.SOURCE_DIRECTORY):
-            file_path = os.path.join(self.config.SOURCE_DIRECTORY, filename)
-
-            if os.path.isfile(file_path):
-                print(f"Analyzing '{filename}'...")
-                risk_category, justification = self.analyze_transcript(file_path)
-
-                if justification is not None:
-                    self.write_insight(filename, risk_category, justification)
-                    if risk_category in risk_counts:
-                        risk_counts[risk_category] += 1
-                else:
-                    error_message = f"Analysis failed for '{filename}'. Reason: {risk_category}"
-                    print(f" -> {error_message}")
-                    self.write_insight(filename, "ANALYSIS_FAILED", risk_category)
-                
-                processed_dir = self.config.PROCESSED_DIRECTORY
-                os.makedirs(processed_dir, exist_ok=True)
-                new_path = os.path.join(processed_dir, filename)
-                os.rename(file_path, new_path)
-
-        return risk_counts
-                
+        filenames = [
+            filename for filename in os.listdir(source_directory)
+            if is_transcript_file(filename) and os.path.isfile(os.path.join(source_directory, filename))
+            and os.path.abspath(os.path.join(source_directory, filename)) not in self.claimed_paths
+        ]
+        claimed = {os.path.abspath(os.path.join(source_directory, filename)) for filename in filenames}
+        self.claimed_paths.update(claimed)
+        logger.info(f"Starting batch analysis of {len(filenames)} files in {source_directory} with concurrency {concurrency}")
+        if on_start:
+            on_start(len(filenames))
+
+        cache_hits_before = self.cache.hits if self.cache else 0
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        failures = 0
+        batch_requests = 0
+        batched_files = 0
+
+        async def finish(filename, file_path, risk_category, justification):
+            nonlocal failures
+            if justification is not None and risk_category in risk_counts:
+                risk_counts[risk_category] += 1
+            else:
+                failures += 1
+            await asyncio.to_thread(self.record_result, filename, file_path, risk_category, justification)
+            if on_file_done:
+                on_file_done(filename, risk_category, justification)
+
+        async def process(client, filename):
+            file_path = os.path.join(source_directory, filename)
+            async with semaphore:
+                started = time.perf_counter()
+                risk_category, justification = await self.analyze_transcript_async(file_path, client)
+                latencies.append(time.perf_counter() - started)
+            await finish(filename, file_path, risk_category, justification)
+
+        async def process_batch(client, items):
+            nonlocal batch_requests, batched_files
+            started = time.perf_counter()
+            results = await self.analyze_batch_async(items, client, semaphore)
+            elapsed = time.perf_counter() - started
+            batch_requests += 1
+            batched_files += len(items)
+            for filename, _, _ in items:
+                latencies.append(elapsed)
+                await finish(filename, os.path.join(source_directory, filename), *results[filename])
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        timeout = httpx.Timeout(self.config.INSIGHTS_REQUEST_TIMEOUT_SECONDS)
+        run_started = time.perf_counter()
+        try:
+            with metered_usage() as meter:
+                cached_results, batches, singles = {}, [], filenames
+                if self.config.INSIGHTS_BATCH_ENABLED:
+                    cached_results, batches, singles = await asyncio.to_thread(self.plan_batches, source_directory, filenames)
+                    logger.info(f"Packed {sum(len(batch) for batch in batches)} short transcripts into {len(batches)} batched requests")
+
+                async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+                    await asyncio.gather(
+                        *(finish(filename, os.path.join(source_directory, filename), *result) for filename, result in cached_results.items()),
+                        *(process_batch(client, batch) for batch in batches),
+                        *(process(client, filename) for filename in singles),
+                    )
+        finally:
+            self.claimed_paths.difference_update(claimed)
+        elapsed = time.perf_counter() - run_started
+
+        stats = {
+            "files": len(filenames),
+            "failures": failures,
+            "cache_hits": (self.cache.hits - cache_hits_before) if self.cache else 0,
+            "concurrency": concurrency,
+            "batch_requests": batch_requests,
+            "batched_files": batched_files,
+            "elapsed_seconds": round(elapsed, 3),
+            "files_per_second": round(len(filenames) / elapsed, 3) if elapsed > 0 else 0.0,
+            "latency_seconds": summarize_latencies(latencies),
+            "llm_usage": meter.snapshot(),
+        }
+        logger.info(f"Batch analysis finished: {stats}")
+        return {"risk_counts": risk_counts, "stats": stats}
@@ -1,34 +1,73 @@
 from fastapi import HTTPException
 from typing import List, Dict
+import asyncio
 import logging
 import json
 import re
 
 from langchain.schema import BaseMessage
 
-from langchain_ollama import ChatOllama
 from langchain.prompts import ChatPromptTemplate, PromptTemplate
 from langchain.chains.conversation.base import ConversationChain
-from langchain.memory import ConversationBufferMemory
+from langchain.memory import ConversationBufferMemory, ConversationBufferWindowMemory, ConversationSummaryBufferMemory
 from langchain.output_parsers import PydanticOutputParser
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
+
+from langchain_core.callbacks import AsyncCallbackHandler
 
 from ..config.config import Config
 from ..model.eval_metrics import EvalMetrics
 from ..model.persona_spec import PersonaSpec
+from ..util.tokens import estimate_token_ids
+from .llm_usage import TokenUsageCallback, UsageAccountingCallback
+from .llm_accounting import llm_call_site
+from .llm_gateway import get_llm_gateway
+from .balanced_chat_ollama import BalancedChatOllama
+from .simulation_cache_service import SimulationCache
 from ..constant.prompt_constants import DEFAULT_AGENT_INSTRUCTIONS, DEFAULT_INITIAL_GREETING
 
 logger = logging.getLogger("testing-service")
 logging.basicConfig(level=logging.INFO)
 
+# Receives training progress events: (event type, payload)
+EventCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class TokenStreamCallback(AsyncCallbackHandler):
+    """
+    Forwards each streamed token of a simulation turn as a "token" event.
+    """
+    def __init__(self, on_event: EventCallback, persona: int, role: str):
+        self.on_event = on_event
+        self.persona = persona
+        self.role = role
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            await self.on_event("token", {"persona": self.persona, "role": self.role, "text": token})
+
+
 class TestingService:
     def __init__(self):
         self.config = Config()
 
-        self.llm = ChatOllama(
-            model=self.config.MODEL_NAME,  
-            base_url="http://localhost:11434/",
+        # Replays responses to unchanged prompts and conversation prefixes across training runs
+        self.cache = None
+        if self.config.SIMULATION_CACHE_ENABLED:
+            self.cache = SimulationCache(
+                path=self.config.SIMULATION_CACHE_PATH,
+                max_entries=self.config.SIMULATION_CACHE_MAX_ENTRIES
+            )
+
+        self.llm = BalancedChatOllama.create(
+            get_llm_gateway(),
+            priority="simulation",
+            cache=self.cache,
+            callbacks=[UsageAccountingCallback()],
+            model=self.config.MODEL_NAME,
             temperature=0.3,
+            seed=self.config.SIMULATION_SEED,
+            custom_get_token_ids=estimate_token_ids,
         )
 
         self.parser = PydanticOutputParser(pydantic_object=EvalMetrics)
@@ -105,63 +144,163 @@ class TestingService:
         self.persona_prompt = self.persona_generator_prompt | self.llm
 
 
-    def build_agent_chain(self, base_prompt: str):
+    def build_memory(self, memory_strategy: Optional[str] = None):
+        """
+        Builds the conversation memory of one simulation side:
+        - "buffer": the full history (prompt grows with every turn)
+        - "window": only the last SIMULATION_MEMORY_WINDOW_TURNS exchanges
+        - "summary": recent exchanges verbatim up to SIMULATION_MEMORY_MAX_TOKENS, older ones folded into a rolling summary
+        The system prompt is part of the chain's prompt template, so it stays pinned in every strategy.
+        """
+        memory_strategy = memory_strategy or self.config.SIMULATION_MEMORY_STRATEGY
+        if memory_strategy == "window":
+            return ConversationBufferWindowMemory(
+                k=self.config.SIMULATION_MEMORY_WINDOW_TURNS,
+                return_messages=True,
+                memory_key="history"
+            )
+        if memory_strategy == "summary":
+            return ConversationSummaryBufferMemory(
+                llm=self.llm,
+                max_token_limit=self.config.SIMULATION_MEMORY_MAX_TOKENS,
+                return_messages=True,
+                memory_key="history"
+            )
+        return ConversationBufferMemory(
+            return_messages=True,
+            memory_key="history"
+        )
+
+    def build_agent_chain(self, base_prompt: str, memory_strategy: Optional[str] = None, stream: bool = False):
         agent_prompt = ChatPromptTemplate.from_messages([
             ("system", base_prompt),
             ("human", "{history}\n\nHuman: {input}\n Just give to-the-point text and nothing else \n\nAssistant: ")
         ])
-        memory = ConversationBufferMemory(
-            return_messages=True,
-            memory_key="history"
-        )
         return ConversationChain(
             llm=self.llm,
             prompt=agent_prompt,
-            memory=memory,
-            input_key="input" 
+            memory=self.build_memory(memory_strategy),
+            input_key="input",
+            llm_kwargs={"stream": True} if stream else {}
         )
 
-    def build_persona_chain(self, persona_prompt: str):
+    def build_persona_chain(self, persona_prompt: str, memory_strategy: Optional[str] = None, stream: bool = False):
         persona_template = ChatPromptTemplate.from_messages([
             ("system", persona_prompt),
             ("human", "{history}\n\nHuman: {input}\n Just give to-the-point text and nothing else \n\nAssistant:")
         ])
-        memory = ConversationBufferMemory(
-            return_messages=True,
-            memory_key="history"
-        )
         return ConversationChain(
             llm=self.llm,
             prompt=persona_template,
-            memory=memory,
-            input_key="input" 
+            memory=self.build_memory(memory_strategy),
+            input_key="input",
+            llm_kwargs={"stream": True} if stream else {}
         )
 
-    async def run_simulation(self, base_agent_prompt: str, persona_prompt: str, max_turns: int):
+    async def predict_turn(self, chain: ConversationChain, message: str, prompt_tokens: List[int],
+                           on_event: Optional[EventCallback] = None, persona: int = 0, role: str = "agent") -> str:
+        """
+        Runs one turn of a simulation side and records the prompt token count Ollama reported for it.
+        With on_event, the reply is emitted as "token" events while it streams and as a "turn" event once complete.
+        """
+        usage = TokenUsageCallback()
+        callbacks = [usage]
+        if on_event:
+            callbacks.append(TokenStreamCallback(on_event, persona, role))
+        with llm_call_site("training.simulation"):
+            reply = await chain.apredict(input=message, callbacks=callbacks)
+        prompt_tokens.append(usage.prompt_tokens)
+        if on_event:
+            await on_event("turn", {"persona": persona, "role": role, "text": reply, "prompt_tokens": usage.prompt_tokens})
+        return reply
+
+    async def run_simulation(self, base_agent_prompt: str, persona_prompt: str, max_turns: int, memory_strategy: Optional[str] = None,
+                             on_event: Optional[EventCallback] = None, persona: int = 0) -> Tuple[List[Dict[str, str]], List[int]]:
+        """
+        Simulates a conversation between the agent and a persona.
+
+        Returns:
+            tuple: The transcript, and the prompt token count of the LLM call that produced each transcript entry.
+        """
         transcript: List[Dict[str, str]] = []
+        prompt_tokens: List[int] = []
+        stream = on_event is not None
 
-        agent_chain = self.build_agent_chain(base_agent_prompt or DEFAULT_AGENT_INSTRUCTIONS)
-        persona_chain = self.build_persona_chain(persona_prompt)
+        agent_chain = self.build_agent_chain(base_agent_prompt or DEFAULT_AGENT_INSTRUCTIONS, memory_strategy, stream)
+        persona_chain = self.build_persona_chain(persona_prompt, memory_strategy, stream)
 
         # Agent opens the conversation
-        agent_msg = await agent_chain.apredict(input=DEFAULT_INITIAL_GREETING)
+        agent_msg = await self.predict_turn(agent_chain, DEFAULT_INITIAL_GREETING, prompt_tokens, on_event, persona, "agent")
         transcript.append({"role": "agent", "text": agent_msg})
 
         for _ in range(max_turns):
-            persona_msg = await persona_chain.apredict(input=agent_msg)
+            persona_msg = await self.predict_turn(persona_chain, agent_msg, prompt_tokens, on_event, persona, "persona")
             transcript.append({"role": "persona", "text": persona_msg})
 
             if any(kw in persona_msg.lower() for kw in ["i'll pay", "i will pay", "i agree", "schedule payment", "pay today", "make a payment", "pay now", "i can pay"]):
                 break
 
-            agent_msg = await agent_chain.apredict(input=persona_msg)
+            agent_msg = await self.predict_turn(agent_chain, persona_msg, prompt_tokens, on_event, persona, "agent")
             transcript.append({"role": "agent", "text": agent_msg})
 
-        return transcript
+        return transcript, prompt_tokens
+
+    async def run_persona_pipeline(self, base_agent_prompt: str, persona_prompt: str, max_turns: int, memory_strategy: Optional[str] = None,
+                                   on_event: Optional[EventCallback] = None, persona: int = 0, rewrite: bool = True) -> Dict[str, Any]:
+        """
+        Simulates, evaluates and rewrites the base prompt for a single persona. With rewrite=False the prompt is
+        only evaluated and the improved prompt is left empty.
+        With on_event, the evaluation and the improved prompt are emitted as "metrics" and "improved_prompt" events.
+        """
+        transcript, prompt_tokens = await self.run_simulation(base_agent_prompt, persona_prompt, max_turns, memory_strategy, on_event, persona)
+        metrics = await self.evaluate_conversation(transcript)
+        if on_event:
+            await on_event("metrics", {"persona": persona, "metrics": metrics})
+        if not rewrite:
+            return {"transcript": transcript, "metrics": metrics, "improved_prompt": "", "prompt_tokens": prompt_tokens}
+        improved_prompt = await self.rewrite_prompt_text(
+            base_agent_prompt,
+            metrics.get('recommended_prompt_edits')
+        )
+        if on_event:
+            await on_event("improved_prompt", {"persona": persona, "prompt": improved_prompt})
+        return {"transcript": transcript, "metrics": metrics, "improved_prompt": improved_prompt, "prompt_tokens": prompt_tokens}
+
+    async def run_persona_pipelines(self, base_agent_prompt: str, persona_prompts: List[str], max_turns: int, concurrency: int = None,
+                                    memory_strategy: Optional[str] = None, on_event: Optional[EventCallback] = None,
+                                    rewrite: bool = True) -> List[Dict[str, Any]]:
+        """
+        Runs the persona pipelines concurrently, at most `concurrency` at a time, and returns their results
+        in the order of persona_prompts. A failed persona yields an empty transcript, an "error" entry in
+        its metrics and an empty improved prompt instead of aborting the other personas.
+        With rewrite=False the prompt is only simulated and evaluated, not rewritten.
+        With on_event, progress is emitted as events while it is produced (see run_persona_pipeline), failures
+        as "persona_failed" events, and transcripts are not kept: each result only holds the improved prompt.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.config.TRAINING_CONCURRENCY)
+
+        async def run(index: int, persona_prompt: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    logger.info(f"Starting simulation for persona #{index}")
+                    result = await self.run_persona_pipeline(base_agent_prompt, persona_prompt, max_turns, memory_strategy, on_event, index, rewrite)
+                    return {"improved_prompt": result["improved_prompt"]} if on_event else result
+                except Exception as e:
+                    logger.error(f"Simulation for persona #{index} failed: {e}", exc_info=True)
+                    detail = e.detail if isinstance(e, HTTPException) else str(e)
+                    if on_event:
+                        await on_event("persona_failed", {"persona": index, "error": detail})
+                    return {"transcript": [], "metrics": {"error": detail}, "improved_prompt": "", "prompt_tokens": []}
+
+        results = await asyncio.gather(*(run(index, persona_prompt) for index, persona_prompt in enumerate(persona_prompts)))
+        if self.cache:
+            logger.info(f"Simulation cache: {self.cache.hits} hits, {self.cache.misses} misses since startup")
+        return results
 
     async def evaluate_conversation(self, transcript: List[Dict[str, str]]) -> Dict[str, Any]:
         convo_text = "\n".join([f"{m['role'].upper()}: {m['text']}" for m in transcript])
-        raw = await self.eval_chain.ainvoke(input={"transcript": convo_text})
+        with llm_call_site("training.eval"):
+            raw = await self.eval_chain.ainvoke(input={"transcript": convo_text})
         try:
             metrics = self.extract_recommendations(raw)
         except Exception as e:
@@ -172,14 +311,16 @@ class TestingService:
         if not edits:
             return base_prompt
         edits_text = "\n".join([f"- {e}" for e in edits])
-        revised_prompt = await self.rewrite_chain.ainvoke(input={"base_prompt": base_prompt, "edits": edits_text})
+        with llm_call_site("training.rewrite"):
+            revised_prompt = await self.rewrite_chain.ainvoke(input={"base_prompt": base_prompt, "edits": edits_text})
         return str(revised_prompt.content).strip()
     
     async def combine_prompt_revisions(self, base_prompt: str, edits: List[str]) -> str:
         if not edits:
             return base_prompt
         edits_text = "\n".join([f"- {e}" for e in edits])
-        revised_prompt = await self.combine_revisions_chain.ainvoke(input={"base_prompt": base_prompt, "edits": edits_text})
+        with llm_call_site("training.combine"):
+            revised_prompt = await self.combine_revisions_chain.ainvoke(input={"base_prompt": base_prompt, "edits": edits_text})
         return str(revised_prompt.content).strip()
     
     def extract_recommendations(self, raw: BaseMessage) -> Dict[str, Any]:
@@ -193,7 +334,8 @@ class TestingService:
     
     async def generate_personas(self, persona_names: List[str]) -> List[str]:
         personas = []
-        response = await self.persona_prompt.ainvoke(input={"persona_type_names": json.dumps(persona_names)})
+        with llm_call_site("training.persona_generation"):
+            response = await self.persona_prompt.ainvoke(input={"persona_type_names": json.dumps(persona_names)})
         content = response.content
         
         array_pattern = r'\[(?:\s*"[^"]*"\s*,?\s*)*\]'
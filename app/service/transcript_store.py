@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+logger = logging.getLogger("transcript-store")
+logger.setLevel(logging.INFO)
+
+TRANSCRIPT_FILE_PREFIX = "transcript_"
+TRANSCRIPT_FILE_SUFFIXES = (".json", ".jsonl")
+PARTIAL_SUFFIX = ".part"
+
+
+class TranscriptWriter:
+    """
+    Streams a call transcript to disk as JSON lines while the call is running:
+    a customer_info record, one message record per committed conversation item, and an end record.
+    Lines go to "<name>.jsonl.part" and are flushed as they are written, so a crashed worker loses
+    at most the item being written. finalize() fsyncs and atomically renames the file to "<name>.jsonl",
+    so readers of the directory only ever see complete transcripts.
+    """
+    def __init__(self, directory: str, room_name: str, customer_info: Dict[str, Any], started_at: str = None):
+        started_at = started_at or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.path = os.path.join(directory, f"{TRANSCRIPT_FILE_PREFIX}{room_name}_{started_at}.jsonl")
+        self.partial_path = self.path + PARTIAL_SUFFIX
+        self.closed = False
+        self._file = open(self.partial_path, "a", encoding="utf-8")
+        self._write({"type": "customer_info", **customer_info})
+
+    def append_message(self, role: str, content: List[Any]):
+        if self.closed:
+            return
+        self._write({"type": "message", "role": role, "content": content})
+
+    def finalize(self, call_metrics: Dict[str, Any] = None) -> str:
+        """
+        Writes the end record and atomically publishes the transcript. Returns the final path.
+        """
+        if self.closed:
+            return self.path
+        self._write({"type": "end", "ended_at": datetime.now().isoformat(), "call_metrics": call_metrics or {}})
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self.closed = True
+        os.replace(self.partial_path, self.path)
+        return self.path
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+
+def is_transcript_file(filename: str) -> bool:
+    return filename.startswith(TRANSCRIPT_FILE_PREFIX) and filename.endswith(TRANSCRIPT_FILE_SUFFIXES)
+
+
+def section(value, expected_type):
+    return value if isinstance(value, expected_type) else expected_type()
+
+
+def read_transcript(path: str) -> Dict[str, Any]:
+    """
+    Reads a transcript written either as streamed JSON lines or as a single (legacy) JSON document,
+    returning {"customer_info", "transcript", "call_metrics"}. Raises ValueError (or json.JSONDecodeError)
+    for a document that is not a JSON object; sections of the wrong type are returned empty.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if not path.endswith(".jsonl"):
+            data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+            return {
+                "customer_info": section(data.get("customer_info"), dict),
+                "transcript": section(data.get("transcript"), list),
+                "call_metrics": section(data.get("call_metrics"), dict),
+            }
+
+        result = {"customer_info": {}, "transcript": [], "call_metrics": {}}
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a torn last line; everything before it is intact.
+                break
+            if not isinstance(record, dict):
+                continue
+            record_type = record.pop("type", None)
+            if record_type == "customer_info":
+                result["customer_info"] = record
+            elif record_type == "message":
+                result["transcript"].append(record)
+            elif record_type == "end":
+                result["call_metrics"] = section(record.get("call_metrics"), dict)
+        return result
+
+
+def conversation_text(transcript: List[Dict[str, Any]]) -> str:
+    """
+    Renders transcript messages as "ROLE: text" lines, without the customer info and call metrics records.
+    Messages without text are skipped.
+    """
+    lines = []
+    for message in transcript:
+        if not isinstance(message, dict):
+            continue
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [content]
+        text = " ".join(part.strip() for part in parts if isinstance(part, str) and part.strip())
+        if text:
+            lines.append(f"{str(message.get('role') or 'unknown').upper()}: {text}")
+    return "\n".join(lines)
+
+
+def read_conversation(path: str) -> str:
+    """
+    Reads a transcript file (see read_transcript) and returns its conversation as text (see conversation_text).
+    """
+    return conversation_text(read_transcript(path)["transcript"])
+
+
+def recover_partial_transcripts(directory: str, older_than_seconds: float) -> int:
+    """
+    Publishes transcripts left behind as ".part" files by workers that died mid-call, once they have
+    not been written to for older_than_seconds. Returns the number of recovered transcripts.
+    """
+    if not directory or not os.path.isdir(directory):
+        return 0
+    recovered = 0
+    cutoff = time.time() - older_than_seconds
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(PARTIAL_SUFFIX) or not entry.name.startswith(TRANSCRIPT_FILE_PREFIX):
+            continue
+        try:
+            if entry.stat().st_mtime > cutoff:
+                continue
+            os.replace(entry.path, entry.path[:-len(PARTIAL_SUFFIX)])
+            recovered += 1
+        except OSError as e:
+            logger.warning(f"Could not recover partial transcript {entry.name}: {e}")
+    if recovered:
+        logger.info(f"Recovered {recovered} partial transcripts in {directory}")
+    return recovered
@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import wave
+from typing import AsyncIterator, Dict, List, Optional
+
+from livekit import rtc
+from livekit.agents import tts as agents_tts
+
+logger = logging.getLogger("tts-cache-service")
+logger.setLevel(logging.INFO)
+
+FRAME_DURATION_MS = 20
+
+
+class TTSAudioCache:
+    """
+    Disk cache of synthesized speech for fixed phrases, keyed by text, voice and model. Audio is
+    stored as 16-bit PCM WAV files; file mtimes track recency so the least recently played files
+    are evicted once the directory exceeds max_bytes.
+    Text that carries customer data, such as a greeting rendered with the customer's name, should
+    be fetched with persist=False so it is synthesized ahead of time but never written to disk.
+    """
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._in_flight: Dict[tuple, asyncio.Task] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(text: str, voice_id: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\x00{voice_id}\x00{text}".encode("utf-8")).hexdigest()
+
+    def path_for(self, cache_key: str) -> str:
+        return os.path.join(self.directory, f"{cache_key}.wav")
+
+    async def get_or_synthesize(self, tts: agents_tts.TTS, text: str, voice_id: str, model: str,
+                                persist: bool = True) -> Optional[List[rtc.AudioFrame]]:
+        """
+        Returns the audio frames for text, synthesizing and storing them on a miss. With persist=False the
+        disk is neither read nor written. Concurrent requests for the same phrase on one event loop share a
+        single synthesis; jobs on other loops or in other processes may synthesize it again, and the last
+        writer's file wins. Returns None if synthesis fails.
+        """
+        cache_key = self.make_key(text, voice_id, model)
+        path = self.path_for(cache_key) if persist else None
+        if persist and os.path.exists(path):
+            try:
+                return await asyncio.to_thread(self._load, path)
+            except (OSError, wave.Error, EOFError) as e:
+                logger.warning(f"Discarding unreadable cached audio {path}: {e}")
+
+        # The cache is shared by the jobs of a worker process, which run on separate event loops
+        in_flight_key = (id(asyncio.get_running_loop()), cache_key, persist)
+        task = self._in_flight.get(in_flight_key)
+        if task is None:
+            task = asyncio.create_task(self._synthesize_and_store(tts, text, path))
+            self._in_flight[in_flight_key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(in_flight_key, None))
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            logger.error(f"Failed to synthesize '{text[:40]}': {e}")
+            return None
+
+    async def warm(self, tts: agents_tts.TTS, texts: List[str], voice_id: str, model: str):
+        """
+        Synthesizes any of texts not cached yet, so later playback is a disk read.
+        """
+        await asyncio.gather(*(self.get_or_synthesize(tts, text, voice_id, model) for text in texts))
+
+    @staticmethod
+    async def play(frames: List[rtc.AudioFrame]) -> AsyncIterator[rtc.AudioFrame]:
+        for frame in frames:
+            yield frame
+
+    async def _synthesize_and_store(self, tts: agents_tts.TTS, text: str, path: str) -> List[rtc.AudioFrame]:
+        frames = []
+        async with tts.synthesize(text) as stream:
+            async for audio in stream:
+                frames.append(audio.frame)
+        if not frames:
+            raise RuntimeError("TTS returned no audio")
+        if path:
+            await asyncio.to_thread(self._store, path, frames)
+        return frames
+
+    def _store(self, path: str, frames: List[rtc.AudioFrame]):
+        # A unique temporary file per writer, so concurrent writers of the same phrase never share one
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file, wave.open(file, "wb") as wav:
+                wav.setnchannels(frames[0].num_channels)
+                wav.setsampwidth(2)
+                wav.setframerate(frames[0].sample_rate)
+                for frame in frames:
+                    wav.writeframes(bytes(frame.data))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._evict()
+
+    def _load(self, path: str) -> List[rtc.AudioFrame]:
+        with wave.open(path, "rb") as wav:
+            sample_rate = wav.getframerate()
+            num_channels = wav.getnchannels()
+            pcm = wav.readframes(wav.getnframes())
+        os.utime(path)  # mark as recently used for LRU eviction
+
+        samples_per_frame = sample_rate * FRAME_DURATION_MS // 1000
+        bytes_per_frame = samples_per_frame * num_channels * 2
+        frames = []
+        for offset in range(0, len(pcm), bytes_per_frame):
+            chunk = pcm[offset:offset + bytes_per_frame]
+            frames.append(rtc.AudioFrame(
+                data=chunk,
+                sample_rate=sample_rate,
+                num_channels=num_channels,
+                samples_per_channel=len(chunk) // (num_channels * 2),
+            ))
+        return frames
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".wav"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
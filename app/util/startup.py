@@ -0,0 +1,84 @@
+import functools
+import importlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, TypeVar
+
+logger = logging.getLogger("startup")
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+
+class StartupTimer:
+    """
+    Records how long each startup step takes: module imports and service construction, whether it
+    happens at startup or lazily on first use. Served by /api/metrics/startup.
+    """
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.ready_seconds = None
+        self.steps: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, name: str, kind: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            with self._lock:
+                self.steps.append({
+                    "name": name,
+                    "kind": kind,  # import | init | lazy_init
+                    "seconds": round(seconds, 4),
+                    "at_seconds": round(started - self.started_at, 4),
+                })
+
+    def import_module(self, name: str):
+        with self.measure(name, "import"):
+            return importlib.import_module(name)
+
+    def mark_ready(self):
+        self.ready_seconds = round(time.perf_counter() - self.started_at, 4)
+        logger.info(f"Startup finished in {self.ready_seconds}s: " + ", ".join(
+            f"{step['name']} {step['seconds']}s" for step in sorted(self.steps, key=lambda s: -s["seconds"])[:5]
+        ))
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            steps = sorted(self.steps, key=lambda step: -step["seconds"])
+        return {"ready_seconds": self.ready_seconds, "steps": steps}
+
+
+startup_timer = StartupTimer()
+
+
+def lazy_singleton(name: str) -> Callable[[Callable[[], T]], Callable[[], T]]:
+    """
+    Turns a zero-argument factory into a getter that builds the object on first call, records how
+    long that took, and returns the same object afterwards. Usable as a FastAPI dependency.
+    """
+    def decorator(factory: Callable[[], T]) -> Callable[[], T]:
+        lock = threading.Lock()
+        instance = []
+
+        @functools.wraps(factory)
+        def getter() -> T:
+            if not instance:
+                with lock:
+                    if not instance:
+                        with startup_timer.measure(name, "lazy_init"):
+                            instance.append(factory())
+            return instance[0]
+
+        def set_instance(value: T):
+            instance[:] = [value]
+
+        getter.is_initialized = lambda: bool(instance)
+        getter.set_instance = set_instance  # replaces the object, e.g. with a fake in benchmarks
+        return getter
+    return decorator
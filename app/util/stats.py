@@ -0,0 +1,40 @@
+import math
+from typing import Dict, Iterable, List
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """
+    Returns the pct-th percentile (0-100) of values using nearest-rank, or 0.0 if empty.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize_latencies(values: Iterable[float]) -> Dict[str, float]:
+    """
+    Summarizes a list of latencies (in seconds) into count, mean, p50, p95, p99 and max.
+    """
+    values = list(values)
+    if not values:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def histogram(values: Iterable[float], buckets: List[float]) -> Dict[str, int]:
+    """
+    Counts values into cumulative "le" buckets (Prometheus style), plus a "+Inf" bucket.
+    """
+    values = list(values)
+    counts = {f"le_{bound}": sum(1 for value in values if value <= bound) for bound in buckets}
+    counts["+Inf"] = len(values)
+    return counts
@@ -0,0 +1,16 @@
+from typing import List
+
+# Rough chars-per-token ratio of Llama-family tokenizers on English text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def estimate_token_ids(text: str) -> List[int]:
+    """
+    Offline stand-in for a tokenizer, used where LangChain needs token counts (e.g. summary memory)
+    without downloading a tokenizer model. Only the length of the result is meaningful.
+    """
+    return [0] * estimate_tokens(text)
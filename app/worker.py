@@ -0,0 +1,110 @@
+"""
+Standalone LiveKit agent worker, for running calls outside the FastAPI process:
+
+    python -m app.worker --processes 4
+
+Starts AGENT_WORKER_PROCESSES worker processes (one per CPU core by default). Each one registers with
+LiveKit as a separate worker and reports its own load (see AGENT_WORKER_MAX_JOBS), so dispatch spreads
+calls across them. Set AGENT_WORKER_MODE=external on the API so it does not start its own worker.
+Dead processes are restarted. On SIGINT/SIGTERM every process stops taking calls and waits for its
+running calls to end before exiting.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+from .config.config import Config
+from .service.agent import DebtCollectionAgentWorker
+from .service.transcript_store import recover_partial_transcripts
+
+logger = logging.getLogger("agent-worker")
+logger.setLevel(logging.INFO)
+
+RESTART_BACKOFF_SECONDS = 5
+
+
+async def serve(port: int):
+    agent_worker = DebtCollectionAgentWorker(config=Config())
+    if not await agent_worker.start_worker(port=port, recover_transcripts=False):
+        raise SystemExit(1)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await asyncio.wait(
+        [asyncio.create_task(stop.wait()), agent_worker.worker_task],
+        return_when=asyncio.FIRST_COMPLETED
+    )
+    if stop.is_set():
+        logger.info(f"Worker process {os.getpid()} draining running calls")
+        await agent_worker.worker.drain()
+    await agent_worker.stop_worker()
+
+
+def run_process(port: int):
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(port))
+
+
+def main():
+    config = Config()
+    parser = argparse.ArgumentParser(description="Run LiveKit agent worker processes.")
+    parser.add_argument("--processes", type=int, default=config.AGENT_WORKER_PROCESSES,
+                        help="Number of worker processes (default: AGENT_WORKER_PROCESSES, or one per CPU core)")
+    args = parser.parse_args()
+    processes = args.processes or os.cpu_count() or 1
+
+    logging.basicConfig(level=logging.INFO)
+    # Done once here, so the worker processes do not race over the same partial transcripts
+    recover_partial_transcripts(config.SOURCE_DIRECTORY, config.PARTIAL_TRANSCRIPT_RECOVERY_SECONDS)
+
+    context = multiprocessing.get_context("spawn")
+    stopping = False
+
+    def start(index: int):
+        port = config.AGENT_WORKER_HTTP_PORT + index
+        process = context.Process(target=run_process, args=(port,), name=f"agent-worker-{index}")
+        process.start()
+        logger.info(f"Started agent worker process {index} (pid {process.pid}, health port {port})")
+        return process
+
+    def stop(process):
+        if process.is_alive():
+            os.kill(process.pid, signal.SIGTERM)
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in workers:
+            stop(process)
+
+    workers = [start(index) for index in range(processes)]
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    while not stopping:
+        time.sleep(1)
+        for index, process in enumerate(workers):
+            if not stopping and not process.is_alive():
+                logger.warning(f"Agent worker process {index} exited with code {process.exitcode}, restarting")
+                time.sleep(RESTART_BACKOFF_SECONDS)
+                if stopping:
+                    break
+                workers[index] = start(index)
+                # A stop requested while the process was starting signalled the old one, not this one
+                if stopping:
+                    stop(workers[index])
+
+    for process in workers:
+        process.join()
+    logger.info("All agent worker processes stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+In-memory stand-ins for the LiveKit server API used by the call-initiation path.
+
+FakeLiveKitAPI exposes the same .room, .agent_dispatch and .sip services as livekit.api.LiveKitAPI
+and returns the real protobuf response types, so it can replace the LiveKit client of
+app.router.agent_router (agent_router.get_livekit_api.set_instance). Each call waits a configurable latency; create_sip_participant, which
+waits for the callee to answer, has its own answer latency and an optional SIP failure rate.
+"""
+import asyncio
+import random
+import time
+import uuid
+from typing import Dict
+
+from livekit import api
+
+
+class FakeRoomService:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.rooms: Dict[str, api.Room] = {}
+
+    async def create_room(self, create: api.CreateRoomRequest) -> api.Room:
+        await asyncio.sleep(self.latency)
+        room = self.rooms.get(create.name)
+        if room is None:
+            room = api.Room(
+                sid=f"RM_{uuid.uuid4().hex[:12]}",
+                name=create.name,
+                empty_timeout=create.empty_timeout,
+                max_participants=create.max_participants,
+                creation_time=int(time.time()),
+            )
+            self.rooms[create.name] = room
+        return room
+
+    async def list_rooms(self, list_request: api.ListRoomsRequest) -> api.ListRoomsResponse:
+        await asyncio.sleep(self.latency)
+        names = list(list_request.names) or list(self.rooms)
+        return api.ListRoomsResponse(rooms=[self.rooms[name] for name in names if name in self.rooms])
+
+    async def list_participants(self, list_request: api.ListParticipantsRequest) -> api.ListParticipantsResponse:
+        await asyncio.sleep(self.latency)
+        return api.ListParticipantsResponse(participants=[])
+
+    async def delete_room(self, delete: api.DeleteRoomRequest) -> api.DeleteRoomResponse:
+        await asyncio.sleep(self.latency)
+        self.rooms.pop(delete.room, None)
+        return api.DeleteRoomResponse()
+
+
+class FakeAgentDispatchService:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create_dispatch(self, req: api.CreateAgentDispatchRequest) -> api.AgentDispatch:
+        await asyncio.sleep(self.latency)
+        return api.AgentDispatch(
+            id=f"AD_{uuid.uuid4().hex[:12]}",
+            agent_name=req.agent_name,
+            room=req.room,
+            metadata=req.metadata,
+        )
+
+
+class FakeSipService:
+    def __init__(self, latency: float, failure_rate: float):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    async def create_sip_participant(self, create: api.CreateSIPParticipantRequest) -> api.SIPParticipantInfo:
+        await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise api.TwirpError(
+                "unavailable",
+                "callee did not answer",
+                status=503,
+                metadata={"sip_status_code": "480", "sip_status": "Temporarily Unavailable"},
+            )
+        return api.SIPParticipantInfo(
+            participant_id=f"PA_{uuid.uuid4().hex[:12]}",
+            participant_identity=create.participant_identity,
+            room_name=create.room_name,
+            sip_call_id=f"SCL_{uuid.uuid4().hex[:12]}",
+        )
+
+
+class FakeLiveKitAPI:
+    def __init__(self, latency: float = 0.05, answer_latency: float = 0.5, sip_failure_rate: float = 0.0):
+        self.room = FakeRoomService(latency)
+        self.agent_dispatch = FakeAgentDispatchService(latency)
+        self.sip = FakeSipService(answer_latency, sip_failure_rate)
+
+    async def aclose(self):
+        pass
@@ -0,0 +1,250 @@
+"""
+Offline stand-in for Ollama, for benchmarks and local runs without a GPU.
+
+Serves the endpoints the service talks to:
+- /api/generate (InsightsService) and /api/chat (ChatOllama in TestingService), as JSON or NDJSON streams
+- /v1/chat/completions (livekit openai.LLM in the agent), as JSON or SSE streams
+- /api/tags and /v1/models, so clients probing the server see it as up
+
+Every response waits LATENCY seconds plus the prompt's estimated tokens at PROMPT_TOKENS_PER_SECOND
+(prompt evaluation) before the first token, and then emits tokens at TOKENS_PER_SECOND.
+Replies are canned but well formed: risk classifications for (batched) insight prompts, EvalMetrics JSON for
+evaluator prompts, persona lists for the persona generator, and a short sentence otherwise.
+
+    python -m bench.fake_ollama --port 11434 --latency 0.2 --tokens-per-second 40 --prompt-tokens-per-second 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from typing import AsyncIterator, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0.2"))
+TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "40"))
+PROMPT_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_PROMPT_TOKENS_PER_SECOND", "1000"))
+CHARS_PER_TOKEN = 4
+
+app = FastAPI(title="Fake Ollama")
+
+
+def build_reply(prompt: str) -> str:
+    files = re.findall(r"^\s*FILE: (\S+)", prompt, flags=re.MULTILINE)
+    if files:
+        return json.dumps({"results": [
+            {
+                "file": filename,
+                "category": random.choice(["HIGH", "MEDIUM", "LOW"]),
+                "justification": "The customer agreed to a payment date but mentioned a tight budget."
+            }
+            for filename in files
+        ]})
+    if "classify the customer's risk" in prompt:
+        return json.dumps({
+            "category": random.choice(["HIGH", "MEDIUM", "LOW"]),
+            "justification": "The customer agreed to a payment date but mentioned a tight budget."
+        })
+    if "You are an evaluator" in prompt:
+        return json.dumps({
+            "resolution_score": random.randint(4, 9),
+            "compliance_score": random.randint(6, 10),
+            "empathy_score": random.randint(4, 9),
+            "persuasion_score": random.randint(3, 8),
+            "objections_handled": random.randint(0, 4),
+            "recommended_prompt_edits": ["Acknowledge the customer's situation before asking for a payment date."],
+            "notes": "Benchmark evaluation."
+        })
+    if "persona generator" in prompt:
+        return json.dumps([
+            "You are Dana, 42, recently laid off and anxious about every bill.",
+            "You are Marcus, 29, convinced the charge is a mistake and quick to argue."
+        ])
+    return random.choice([
+        "I understand. Could you tell me when you would be able to make a payment on the outstanding balance?",
+        "I'm not sure I can pay the full amount right now, money has been really tight this month.",
+        "Thank you for explaining. Would a partial payment this week followed by the rest next month work for you?",
+        "Honestly I forgot about it. What options do I have if I can't pay everything at once?",
+    ])
+
+
+def tokenize(text: str) -> List[str]:
+    # Words with their leading space, so joining the chunks restores the text
+    return re.findall(r"\s*\S+", text) or [""]
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def prompt_of_messages(messages: List[Dict]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(content)
+    return "\n".join(parts)
+
+
+async def emit(prompt: str, tokens: List[str]) -> AsyncIterator[str]:
+    prompt_seconds = count_tokens(prompt) / PROMPT_TOKENS_PER_SECOND if PROMPT_TOKENS_PER_SECOND > 0 else 0
+    await asyncio.sleep(LATENCY + prompt_seconds)
+    for token in tokens:
+        yield token
+        if TOKENS_PER_SECOND > 0:
+            await asyncio.sleep(1 / TOKENS_PER_SECOND)
+
+
+async def full_reply(prompt: str, tokens: List[str]) -> str:
+    return "".join([token async for token in emit(prompt, tokens)])
+
+
+def ollama_stats(prompt: str, tokens: List[str], started: float) -> Dict:
+    return {
+        "done": True,
+        "done_reason": "stop",
+        "total_duration": int((time.perf_counter() - started) * 1e9),
+        "prompt_eval_count": count_tokens(prompt),
+        "eval_count": len(tokens),
+    }
+
+
+@app.get("/api/tags")
+async def tags():
+    return {"models": [{"name": os.getenv("MODEL_NAME", "llama3.1:8b")}]}
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": os.getenv("MODEL_NAME", "llama3.1:8b"), "object": "model"}]}
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    body = await request.json()
+    started = time.perf_counter()
+    prompt = body.get("prompt", "")
+    tokens = tokenize(build_reply(prompt))
+    model = body.get("model", "")
+
+    if body.get("stream", True) is False:
+        text = await full_reply(prompt, tokens)
+        return {"model": model, "response": text, **ollama_stats(prompt, tokens, started)}
+
+    async def stream():
+        async for token in emit(prompt, tokens):
+            yield json.dumps({"model": model, "response": token, "done": False}) + "\n"
+        yield json.dumps({"model": model, "response": "", **ollama_stats(prompt, tokens, started)}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/api/chat")
+async def chat(request: Request):
+    body = await request.json()
+    started = time.perf_counter()
+    prompt = prompt_of_messages(body.get("messages", []))
+    tokens = tokenize(build_reply(prompt))
+    model = body.get("model", "")
+    created_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    if body.get("stream", True) is False:
+        text = await full_reply(prompt, tokens)
+        return {
+            "model": model,
+            "created_at": created_at,
+            "message": {"role": "assistant", "content": text},
+            **ollama_stats(prompt, tokens, started),
+        }
+
+    async def stream():
+        async for token in emit(prompt, tokens):
+            yield json.dumps({
+                "model": model,
+                "created_at": created_at,
+                "message": {"role": "assistant", "content": token},
+                "done": False,
+            }) + "\n"
+        yield json.dumps({
+            "model": model,
+            "created_at": created_at,
+            "message": {"role": "assistant", "content": ""},
+            **ollama_stats(prompt, tokens, started),
+        }) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = prompt_of_messages(body.get("messages", []))
+    tokens = tokenize(build_reply(prompt))
+    model = body.get("model", "")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    usage = {
+        "prompt_tokens": count_tokens(prompt),
+        "completion_tokens": len(tokens),
+        "total_tokens": count_tokens(prompt) + len(tokens),
+    }
+
+    if not body.get("stream"):
+        text = await full_reply(prompt, tokens)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def chunk(delta: Dict, finish_reason=None, **extra) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            **extra,
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def stream():
+        yield chunk({"role": "assistant", "content": ""})
+        async for token in emit(prompt, tokens):
+            yield chunk({"content": token})
+        yield chunk({}, finish_reason="stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+def main():
+    global LATENCY, TOKENS_PER_SECOND, PROMPT_TOKENS_PER_SECOND
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Ollama API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=LATENCY, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=TOKENS_PER_SECOND, help="0 emits all tokens at once")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=PROMPT_TOKENS_PER_SECOND, help="0 skips prompt evaluation time")
+    args = parser.parse_args()
+
+    LATENCY = args.latency
+    TOKENS_PER_SECOND = args.tokens_per_second
+    PROMPT_TOKENS_PER_SECOND = args.prompt_tokens_per_second
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Throughput and latency benchmarks for the service, runnable without Ollama, LiveKit or Twilio.
+
+The LLM is replaced by bench.fake_ollama (started as a subprocess, with configurable latency and
+token rate) and LiveKit by bench.fake_livekit. The API routers are served in-process over an ASGI
+transport, without the app lifespan, so no agent worker is started. Scenarios:
+
+- call:     POST /api/initiate/call
+- train:    POST /testing/train/prompt
+- insights: seed transcripts, GET /api/generate/insights and poll the job until it finishes
+            (jobs are serialized by the service, so this scenario always runs one at a time)
+
+Each scenario reports requests/sec and latency percentiles. --json writes the results; --baseline
+compares against an earlier results file and exits with status 1 on a regression.
+
+    python -m bench.run --scenarios call,train,insights --requests 20 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List
+
+import httpx
+
+SCENARIOS = ["call", "train", "insights"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def configure_environment(workdir: str, llm_urls: List[str]):
+    """
+    Points the service at the fake LLM and scratch directories. Must run before the app is imported,
+    since Config reads the environment at import time.
+    """
+    directories = {}
+    for name in ("raw", "insights", "processed"):
+        directories[name] = os.path.join(workdir, name)
+        os.makedirs(directories[name], exist_ok=True)
+
+    os.environ.update({
+        "MODEL_NAME": "llama3.1:8b",
+        "MODEL_KEY": "ollama",
+        "MODEL_BACKENDS": ",".join(llm_urls),
+        "SOURCE_DIRECTORY": directories["raw"],
+        "DESTINATION_DIRECTORY": directories["insights"],
+        "PROCESSED_DIRECTORY": directories["processed"],
+        # Every run should measure the LLM path, not the analysis cache
+        "ANALYSIS_CACHE_ENABLED": "false",
+        "ANALYSIS_CACHE_PATH": os.path.join(workdir, "analysis_cache.db"),
+        "INSIGHTS_INDEX_PATH": os.path.join(workdir, "insights_index.db"),
+        "LIVEKIT_URL": "http://127.0.0.1:7880",
+        "LIVEKIT_API_KEY": "bench",
+        "LIVEKIT_API_SECRET": "bench-secret",
+        "SIP_TRUNK_ID": "ST_bench",
+        "TWILIO_ACCOUNT_SID": "ACbench",
+        "TWILIO_AUTH_TOKEN": "bench",
+    })
+
+
+def start_fake_llm(port: int, latency: float, tokens_per_second: float, prompt_tokens_per_second: float) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "bench.fake_ollama",
+            "--port", str(port),
+            "--latency", str(latency),
+            "--tokens-per-second", str(tokens_per_second),
+            "--prompt-tokens-per-second", str(prompt_tokens_per_second),
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Fake LLM server exited during startup")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/tags", timeout=1).raise_for_status()
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Fake LLM server did not start within 30 seconds")
+
+
+def seed_transcripts(directory: str, count: int):
+    from app.service.transcript_store import TranscriptWriter
+
+    for i in range(count):
+        writer = TranscriptWriter(
+            directory,
+            f"bench-{uuid.uuid4().hex[:8]}",
+            {"customer_name": f"Customer {i}", "amount_due": 250.0 + i, "card_number_ending": "4242"},
+        )
+        writer.append_message("assistant", ["Hello, I'm calling about the overdue balance on your card ending in 4242."])
+        writer.append_message("user", ["I lost my job last month, I can maybe pay half by the end of next week."])
+        writer.append_message("assistant", ["Thank you for letting me know. Shall I note a partial payment for next Friday?"])
+        writer.append_message("user", ["Yes, that works."])
+        writer.finalize({"turns": 4})
+
+
+async def run_requests(name: str, total: int, concurrency: int, send) -> Dict[str, Any]:
+    from app.util.stats import summarize_latencies
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await send(i)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(str(e) or type(e).__name__)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "scenario": name,
+        "requests": total,
+        "errors": len(errors),
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "latency_seconds": summarize_latencies(latencies),
+    }
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+async def bench_call(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    async def send(i: int):
+        response = await client.post("/api/initiate/call", json={
+            "phone_number": f"+1555{i:07d}",
+            "customer_name": f"Customer {i}",
+            "amount_due": 250.0,
+            "card_number_ending": "4242",
+        })
+        response.raise_for_status()
+
+    return await run_requests("call", args.requests, args.concurrency, send)
+
+
+async def bench_train(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    body = {
+        "base_agent_prompt": "You are a polite debt collection agent. Agree on a payment date.",
+        "personas": [
+            {"name": f"persona-{i}", "persona_prompt": f"You are customer {i}, short on money this month."}
+            for i in range(args.personas)
+        ],
+        "max_turns": args.max_turns,
+    }
+
+    async def send(i: int):
+        response = await client.post("/testing/train/prompt", json=body)
+        response.raise_for_status()
+
+    return await run_requests("train", args.requests, args.concurrency, send)
+
+
+async def bench_insights(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    source_directory = os.environ["SOURCE_DIRECTORY"]
+    files_per_second = []
+
+    async def send(i: int):
+        await asyncio.to_thread(seed_transcripts, source_directory, args.files)
+        response = await client.get("/api/generate/insights")
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        while True:
+            job = (await client.get(f"/api/generate/insights/jobs/{job_id}")).json()
+            if job["status"] == "completed":
+                files_per_second.append(job["stats"]["files_per_second"])
+                return
+            if job["status"] == "failed":
+                raise RuntimeError(job["error"])
+            await asyncio.sleep(0.05)
+
+    result = await run_requests("insights", args.requests, 1, send)
+    result["files_per_job"] = args.files
+    result["files_per_second"] = round(sum(files_per_second) / len(files_per_second), 3) if files_per_second else 0.0
+    return result
+
+
+BENCHMARKS = {"call": bench_call, "train": bench_train, "insights": bench_insights}
+
+
+async def run_benchmarks(args) -> List[Dict[str, Any]]:
+    from fastapi import FastAPI
+    from app.router import agent_router
+    from app.router.testing_router import router as testing_router
+    from .fake_livekit import FakeLiveKitAPI
+
+    logging.getLogger().setLevel(logging.WARNING)
+    for name in ("main-service", "insights-service", "insights-job-service", "testing-service", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    agent_router.get_livekit_api.set_instance(FakeLiveKitAPI(
+        latency=args.livekit_latency,
+        answer_latency=args.answer_latency,
+        sip_failure_rate=args.sip_failure_rate,
+    ))
+    app = FastAPI()
+    app.include_router(agent_router.router)
+    app.include_router(testing_router)
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        for scenario in args.scenarios:
+            print(f"Running {scenario} ...", flush=True)
+            results.append(await BENCHMARKS[scenario](client, args))
+    return results
+
+
+def print_report(results: List[Dict[str, Any]]):
+    header = f"{'scenario':<10} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        latency = result["latency_seconds"]
+        print(
+            f"{result['scenario']:<10} {result['requests']:>8} {result['errors']:>6} "
+            f"{result['requests_per_second']:>8.2f} {latency['p50']:>8.3f} {latency['p95']:>8.3f} "
+            f"{latency['p99']:>8.3f} {latency['max']:>8.3f}"
+        )
+        if result.get("first_error"):
+            print(f"  first error: {result['first_error']}")
+
+
+def compare_with_baseline(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """
+    Returns a description of every scenario whose throughput dropped, or whose p95 latency rose,
+    by more than tolerance (a fraction) relative to the baseline results file.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result["scenario"]: result for result in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        base = baseline.get(result["scenario"])
+        if base is None:
+            continue
+        if result["requests_per_second"] < base["requests_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{result['scenario']}: {result['requests_per_second']:.2f} req/s vs {base['requests_per_second']:.2f} baseline"
+            )
+        if result["latency_seconds"]["p95"] > base["latency_seconds"]["p95"] * (1 + tolerance):
+            regressions.append(
+                f"{result['scenario']}: p95 {result['latency_seconds']['p95']:.3f}s vs {base['latency_seconds']['p95']:.3f}s baseline"
+            )
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{result['scenario']}: {result['errors']} errors vs {base['errors']} baseline")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the service against fake LLM and LiveKit backends")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma separated subset of {SCENARIOS}")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent requests (insights always runs 1)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM seconds to first token")
+    parser.add_argument("--backends", type=int, default=1, help="Fake LLM servers behind the LLM gateway")
+    parser.add_argument("--tokens-per-second", type=float, default=40, help="Fake LLM generation speed")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=1000, help="Fake LLM prompt evaluation speed")
+    parser.add_argument("--livekit-latency", type=float, default=0.05, help="Fake LiveKit API call latency")
+    parser.add_argument("--answer-latency", type=float, default=0.5, help="Fake SIP time until the callee answers")
+    parser.add_argument("--sip-failure-rate", type=float, default=0.0, help="Fraction of SIP calls that fail")
+    parser.add_argument("--personas", type=int, default=2, help="Personas per training request")
+    parser.add_argument("--max-turns", type=int, default=2, help="Simulation turns per persona")
+    parser.add_argument("--files", type=int, default=20, help="Transcripts per insights job")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results file of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Tolerated fractional regression")
+    args = parser.parse_args()
+
+    args.scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {sorted(unknown)}")
+    return args
+
+
+def main():
+    args = parse_args()
+    ports = [free_port() for _ in range(args.backends)]
+    llms = []
+    try:
+        for port in ports:
+            llms.append(start_fake_llm(port, args.llm_latency, args.tokens_per_second, args.prompt_tokens_per_second))
+        with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+            configure_environment(workdir, [f"http://127.0.0.1:{port}" for port in ports])
+            results = asyncio.run(run_benchmarks(args))
+    finally:
+        for llm in llms:
+            llm.terminate()
+            llm.wait(timeout=10)
+
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import pytest
+
+from app.service import analysis_cache_service
+from app.service.analysis_cache_service import AnalysisCache
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(analysis_cache_service.time, "time", clock)
+    return clock
+
+
+def test_key_depends_on_content_model_and_prompt_version():
+    key = AnalysisCache.make_key("transcript", "llama3.1:8b", "1")
+    assert key == AnalysisCache.make_key("transcript", "llama3.1:8b", "1")
+    assert key != AnalysisCache.make_key("transcript!", "llama3.1:8b", "1")
+    assert key != AnalysisCache.make_key("transcript", "qwen2.5:7b", "1")
+    assert key != AnalysisCache.make_key("transcript", "llama3.1:8b", "2")
+
+
+def test_hit_and_miss(tmp_path, clock):
+    cache = AnalysisCache(str(tmp_path / "cache.db"))
+    assert cache.get("key") is None
+    cache.put("key", "HIGH", "Refused to pay.")
+    assert cache.get("key") == ("HIGH", "Refused to pay.")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_persist_across_instances(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    AnalysisCache(path).put("key", "LOW", "Paid in full.")
+    assert AnalysisCache(path).get("key") == ("LOW", "Paid in full.")
+
+
+def test_entries_expire_after_max_age(tmp_path, clock):
+    cache = AnalysisCache(str(tmp_path / "cache.db"), max_age_seconds=60)
+    cache.put("key", "LOW", "Paid in full.")
+    clock.now += 61
+    assert cache.get("key") is None
+    cache.evict()
+    clock.now -= 61
+    assert cache.get("key") is None
+
+
+def test_eviction_drops_least_recently_used(tmp_path, clock):
+    cache = AnalysisCache(str(tmp_path / "cache.db"), max_entries=2)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        cache.put(key, "LOW", key)
+    clock.now += 1
+    cache.get("a")
+    cache.evict()
+    assert cache.get("a") == ("LOW", "a")
+    assert cache.get("b") is None
+    assert cache.get("c") == ("LOW", "c")
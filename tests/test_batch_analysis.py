@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from app.config.config import Config
+from app.service.summarize_transcript_service import InsightsService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "ANALYSIS_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "INSIGHTS_INDEX_PATH", str(tmp_path / "insights_index.db"))
+    return InsightsService()
+
+
+def response(body):
+    return {"response": json.dumps(body)}
+
+
+def test_parse_batch_analysis_returns_well_formed_entries(service):
+    results = service.parse_batch_analysis(response({"results": [
+        {"file": "a.jsonl", "category": "high", "justification": "Refused to pay."},
+        {"file": "b.jsonl", "category": "LOW", "justification": "Paid in full."},
+    ]}), ["a.jsonl", "b.jsonl"])
+    assert results == {"a.jsonl": ("HIGH", "Refused to pay."), "b.jsonl": ("LOW", "Paid in full.")}
+
+
+def test_parse_batch_analysis_accepts_a_bare_list(service):
+    results = service.parse_batch_analysis(
+        response([{"file": "a.jsonl", "category": "MEDIUM", "justification": "Asked for a plan."}]), ["a.jsonl"]
+    )
+    assert results == {"a.jsonl": ("MEDIUM", "Asked for a plan.")}
+
+
+def test_parse_batch_analysis_drops_malformed_unexpected_and_duplicate_entries(service):
+    results = service.parse_batch_analysis(response({"results": [
+        "not an entry",
+        {"file": "other.jsonl", "category": "LOW", "justification": "Not in this batch."},
+        {"file": "a.jsonl", "category": "CRITICAL", "justification": "Unknown category."},
+        {"file": "b.jsonl", "category": "LOW", "justification": "  "},
+        {"file": "c.jsonl", "category": "LOW", "justification": "First answer."},
+        {"file": "c.jsonl", "category": "HIGH", "justification": "Second answer."},
+    ]}), ["a.jsonl", "b.jsonl", "c.jsonl"])
+    assert results == {"c.jsonl": ("LOW", "First answer.")}
+
+
+def test_parse_batch_analysis_without_results_is_empty(service):
+    assert service.parse_batch_analysis(response({"category": "LOW"}), ["a.jsonl"]) == {}
+    assert service.parse_batch_analysis({}, ["a.jsonl"]) == {}
+
+
+def test_parse_batch_analysis_raises_on_invalid_json(service):
+    with pytest.raises(json.JSONDecodeError):
+        service.parse_batch_analysis({"response": "{not json"}, ["a.jsonl"])
+
+
+def write_transcript(directory, filename, text):
+    records = [
+        {"type": "customer_info", "customer_name": "Alex", "phone_number": "+15551234567"},
+        {"type": "message", "role": "user", "content": [text]},
+        {"type": "call_metrics", "first_audio_seconds": 0.4},
+    ]
+    (directory / filename).write_text("".join(json.dumps(record) + "\n" for record in records))
+
+
+def test_plan_batches_packs_conversations_and_leaves_the_rest_single(service, tmp_path):
+    service.config.INSIGHTS_BATCH_MAX_FILES = 2
+    service.config.INSIGHTS_BATCH_MAX_TOKENS = 10_000
+    service.config.INSIGHTS_BATCH_MAX_TRANSCRIPT_TOKENS = 100
+    for filename in ("a.jsonl", "b.jsonl", "c.jsonl"):
+        write_transcript(tmp_path, filename, "I can pay next week.")
+    write_transcript(tmp_path, "long.jsonl", "word " * 1000)
+    (tmp_path / "list.json").write_text("[]")
+
+    cached, batches, singles = service.plan_batches(
+        str(tmp_path), ["a.jsonl", "b.jsonl", "c.jsonl", "long.jsonl", "list.json", "missing.jsonl"]
+    )
+
+    assert cached == {}
+    assert [[filename for filename, _, _ in batch] for batch in batches] == [["a.jsonl", "b.jsonl"]]
+    # Only the conversation is sent, not the customer info or call metrics records
+    assert batches[0][0][1] == "USER: I can pay next week."
+    assert sorted(singles) == ["c.jsonl", "list.json", "long.jsonl", "missing.jsonl"]
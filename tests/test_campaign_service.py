@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from app.config.config import Config
+from app.model.call_request import CallRequest
+from app.model.campaign_request import CampaignRequest
+from app.service.campaign_service import CampaignService, RateLimiter
+from app.service.main_service import MainService
+
+
+class FakeMainService:
+    """
+    Records dial attempts and answers them from a script of results, one per attempt.
+    """
+    def __init__(self, dial_results):
+        self.dial_results = list(dial_results)
+        self.dials = []
+        self.dispatches = 0
+
+    build_room_name = MainService.build_room_name
+    build_agent_instructions = MainService.build_agent_instructions
+
+    async def create_livekit_room_and_dispatch_agent(self, room_name, request, agent_instructions, livekit_api):
+        self.dispatches += 1
+        return {"success": True}
+
+    async def place_outbound_call_with_livekit(self, phone_number, room_name, livekit_api, sip_trunk_id):
+        self.dials.append(room_name)
+        return self.dial_results.pop(0) if self.dial_results else {"success": True}
+
+
+class FinishedRooms:
+    async def get_statuses(self, room_names):
+        return {name: {"status": "not_found", "room_name": name} for name in room_names}
+
+
+def config(**overrides):
+    config = Config()
+    config.CAMPAIGN_CALLS_PER_SECOND = 0
+    config.CAMPAIGN_MAX_CONCURRENT_CALLS = 4
+    config.CAMPAIGN_MAX_RETRIES = 2
+    config.CAMPAIGN_RETRY_BACKOFF_SECONDS = 0
+    config.CAMPAIGN_CALL_POLL_SECONDS = 0
+    config.CAMPAIGN_MAX_CALL_SECONDS = 1
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+def call(phone_number="+15551234567"):
+    return CallRequest(phone_number=phone_number, customer_name="Alex", amount_due=120.5, card_number_ending="4242")
+
+
+def busy():
+    return {"success": False, "error": "busy", "sip_status_code": "486"}
+
+
+async def run_campaign(service, calls, **limits):
+    campaign = service.start_campaign(calls, **limits)
+    await service.tasks[campaign.campaign_id]
+    return campaign
+
+
+def test_is_transient():
+    service = CampaignService(FakeMainService([]), None, FinishedRooms(), config())
+    assert service.is_transient({"sip_status_code": 486})
+    assert service.is_transient({"sip_status_code": "503"})
+    assert not service.is_transient({"sip_status_code": "404"})
+    assert service.is_transient({"twirp_code": "unavailable"})
+    assert not service.is_transient({"twirp_code": "invalid_argument"})
+    assert not service.is_transient({"error": "unknown"})
+
+
+def test_transient_failures_are_retried_without_redispatching():
+    main_service = FakeMainService([busy(), busy()])
+    service = CampaignService(main_service, None, FinishedRooms(), config())
+    campaign = asyncio.run(run_campaign(service, [call()]))
+    assert (campaign.status, campaign.succeeded, campaign.failed, campaign.retries) == ("completed", 1, 0, 2)
+    assert len(main_service.dials) == 3
+    assert main_service.dispatches == 1
+
+
+def test_retries_stop_at_max_retries():
+    main_service = FakeMainService([busy()] * 5)
+    service = CampaignService(main_service, None, FinishedRooms(), config())
+    campaign = asyncio.run(run_campaign(service, [call()], max_retries=1))
+    assert (campaign.succeeded, campaign.failed, campaign.retries) == (0, 1, 1)
+    assert campaign.recent_errors == [{"phone_number": "+15551234567", "error": "busy"}]
+
+
+def test_permanent_failures_are_not_retried():
+    main_service = FakeMainService([{"success": False, "error": "not found", "sip_status_code": "404"}])
+    service = CampaignService(main_service, None, FinishedRooms(), config())
+    campaign = asyncio.run(run_campaign(service, [call()]))
+    assert (campaign.failed, campaign.retries) == (1, 0)
+    assert len(main_service.dials) == 1
+
+
+def test_duplicate_numbers_get_separate_rooms():
+    main_service = FakeMainService([])
+    service = CampaignService(main_service, None, FinishedRooms(), config())
+    asyncio.run(run_campaign(service, [call(), call()]))
+    assert len(set(main_service.dials)) == 2
+
+
+def test_limits_default_to_and_are_capped_by_the_node_limits():
+    service = CampaignService(FakeMainService([]), None, FinishedRooms(), config(CAMPAIGN_CALLS_PER_SECOND=5))
+
+    async def start(**limits):
+        return await run_campaign(service, [call()], **limits)
+
+    campaign = asyncio.run(start())
+    assert (campaign.calls_per_second, campaign.max_concurrent_calls, campaign.max_retries) == (5, 4, 2)
+    campaign = asyncio.run(start(calls_per_second=50, max_concurrent_calls=40, max_retries=0))
+    assert (campaign.calls_per_second, campaign.max_concurrent_calls, campaign.max_retries) == (5, 4, 0)
+    campaign = asyncio.run(start(calls_per_second=0.5, max_concurrent_calls=1))
+    assert (campaign.calls_per_second, campaign.max_concurrent_calls) == (0.5, 1)
+
+
+@pytest.mark.parametrize("limits", [
+    {"calls_per_second": 0}, {"calls_per_second": -1},
+    {"max_concurrent_calls": 0}, {"max_concurrent_calls": -1},
+    {"max_retries": -1},
+])
+def test_campaign_request_rejects_invalid_limits(limits):
+    with pytest.raises(ValidationError):
+        CampaignRequest(calls=[call()], **limits)
+
+
+def test_rate_limiter_spaces_acquisitions():
+    async def run():
+        limiter = RateLimiter(20)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        times = []
+        for _ in range(4):
+            await limiter.acquire()
+            times.append(loop.time() - started)
+        return times
+
+    times = asyncio.run(run())
+    assert times[0] < 0.04
+    assert all(later - earlier >= 0.04 for earlier, later in zip(times, times[1:]))
+
+
+def test_rate_limiter_without_a_rate_does_not_wait():
+    async def run():
+        limiter = RateLimiter(0)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(100):
+            await limiter.acquire()
+        return loop.time() - started
+
+    assert asyncio.run(run()) < 0.05
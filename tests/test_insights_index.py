@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from app.service.insights_index_service import InsightsIndex
+
+DAY = 24 * 3600
+NOW = time.time()
+
+
+def customer(phone_number, amount_due="120.50"):
+    return {"customer_name": "Alex", "phone_number": phone_number, "card_number_ending": "4242", "amount_due": amount_due}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = InsightsIndex(str(tmp_path / "index" / "insights_index.db"))
+    for source_file, category, phone_number, age in [
+        ("a.jsonl", "HIGH", "+15550000001", 3 * DAY),
+        ("b.jsonl", "HIGH", "+15550000001", 2 * DAY),
+        ("c.jsonl", "LOW", "+15550000002", 2 * DAY),
+        ("d.jsonl", "HIGH", "+15550000003", DAY),
+        ("e.jsonl", "ERROR_INVALID_TRANSCRIPT", "+15550000004", DAY),
+    ]:
+        index.upsert(InsightsIndex.build_record(source_file, category, "Reason.", "llama3", customer(phone_number), NOW - age))
+    return index
+
+
+def test_build_record_parses_amount_due():
+    assert InsightsIndex.build_record("a.jsonl", "LOW", "", "llama3", customer("+1", "99.5"))["amount_due"] == 99.5
+    assert InsightsIndex.build_record("a.jsonl", "LOW", "", "llama3", customer("+1", "n/a"))["amount_due"] is None
+    assert InsightsIndex.build_record("a.jsonl", "LOW", "", "llama3", {})["phone_number"] is None
+
+
+def test_query_filters_newest_first(index):
+    result = index.query(category="HIGH")
+    assert result["total"] == 3
+    assert [item["source_file"] for item in result["items"]] == ["d.jsonl", "b.jsonl", "a.jsonl"]
+    assert result["items"][0]["amount_due"] == 120.5
+
+    assert [item["source_file"] for item in index.query(phone_number="+15550000001")["items"]] == ["b.jsonl", "a.jsonl"]
+    in_range = index.query(since=NOW - 2.5 * DAY, until=NOW - 1.5 * DAY)
+    assert sorted(item["source_file"] for item in in_range["items"]) == ["b.jsonl", "c.jsonl"]
+
+
+def test_query_pages_and_reports_the_total(index):
+    page = index.query(limit=2, offset=2)
+    assert page["total"] == 5
+    assert (page["limit"], page["offset"]) == (2, 2)
+    assert [item["source_file"] for item in page["items"]] == ["b.jsonl", "c.jsonl"]
+
+
+def test_upsert_replaces_the_row_of_a_source_file(index):
+    index.upsert(InsightsIndex.build_record("a.jsonl", "LOW", "Paid.", "llama3", customer("+15550000001"), NOW))
+    assert index.query()["total"] == 5
+    assert index.query(category="LOW")["items"][0]["source_file"] == "a.jsonl"
+
+
+def test_summary_counts_insights_customers_and_failures(index):
+    summary = index.summary()
+    assert summary["total"] == 5
+    assert summary["risk_counts"] == {"HIGH": 3, "MEDIUM": 0, "LOW": 1}
+    assert summary["customers"] == {"HIGH": 2, "MEDIUM": 0, "LOW": 1}
+    assert summary["failed"] == 1
+    assert "by_day" not in summary
+
+    assert index.summary(since=NOW - 1.5 * DAY)["risk_counts"] == {"HIGH": 1, "MEDIUM": 0, "LOW": 0}
+
+
+def test_summary_by_day(index):
+    by_day = index.summary(by_day=True)["by_day"]
+    assert len(by_day) == 3
+    assert [day["day"] for day in by_day] == sorted(day["day"] for day in by_day)
+    assert sum(day["HIGH"] for day in by_day) == 3
+    assert sum(day["LOW"] for day in by_day) == 1
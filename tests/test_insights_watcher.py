@@ -0,0 +1,118 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from app.service import insights_watcher_service
+from app.service.insights_watcher_service import InsightsWatcher
+
+NOW = 1_700_000_000.0
+
+
+class FakeInsightsService:
+    def __init__(self, source_directory):
+        self.config = SimpleNamespace(
+            SOURCE_DIRECTORY=str(source_directory),
+            INSIGHTS_WATCH_INTERVAL_SECONDS=5,
+            INSIGHTS_WATCH_DEBOUNCE_SECONDS=10,
+            INSIGHTS_WATCH_CONCURRENCY=2,
+            INSIGHTS_REQUEST_TIMEOUT_SECONDS=30,
+        )
+        self.claimed_paths = set()
+        self.analyzed = []
+        self.recorded = []
+
+    async def analyze_transcript_async(self, path, client):
+        self.analyzed.append(os.path.basename(path))
+        return "HIGH", "Refused to pay."
+
+    def record_result(self, filename, path, risk_category, justification):
+        self.recorded.append((filename, risk_category))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=NOW)
+    monkeypatch.setattr(insights_watcher_service.time, "time", lambda: clock.now)
+    return clock
+
+
+def write(path, content, mtime):
+    path.write_text(content)
+    os.utime(path, (mtime, mtime))
+
+
+def poll(watcher):
+    async def run():
+        await watcher.poll()
+        await asyncio.gather(*watcher._in_flight.values())
+
+    asyncio.run(run())
+
+
+def test_file_is_analyzed_once_unchanged_for_the_debounce(tmp_path, clock):
+    service = FakeInsightsService(tmp_path)
+    watcher = InsightsWatcher(service)
+    transcript = tmp_path / "transcript_call.jsonl"
+    write(transcript, "{}\n", NOW - 1)
+
+    # First sighting, then unchanged but modified less than debounce_seconds ago
+    poll(watcher)
+    clock.now += 5
+    poll(watcher)
+    assert service.analyzed == []
+    assert watcher.snapshot()["waiting"] == 1
+
+    clock.now += 10
+    poll(watcher)
+    assert service.analyzed == ["transcript_call.jsonl"]
+    assert service.recorded == [("transcript_call.jsonl", "HIGH")]
+    assert watcher.processed_files == 1
+    assert watcher.risk_counts["HIGH"] == 1
+    assert service.claimed_paths == set()
+
+
+def test_a_file_still_being_written_restarts_the_debounce(tmp_path, clock):
+    service = FakeInsightsService(tmp_path)
+    watcher = InsightsWatcher(service, debounce_seconds=0)
+    transcript = tmp_path / "transcript_call.jsonl"
+    write(transcript, "{}\n", NOW - 60)
+    poll(watcher)
+
+    write(transcript, "{}\n{}\n", NOW - 30)
+    poll(watcher)
+    assert service.analyzed == []
+
+    poll(watcher)
+    assert service.analyzed == ["transcript_call.jsonl"]
+
+
+def test_claimed_and_non_transcript_files_are_skipped(tmp_path, clock):
+    service = FakeInsightsService(tmp_path)
+    watcher = InsightsWatcher(service, debounce_seconds=0)
+    write(tmp_path / "transcript_claimed.jsonl", "{}\n", NOW - 60)
+    write(tmp_path / "transcript_call.jsonl.part", "{}\n", NOW - 60)
+    write(tmp_path / "notes.txt", "", NOW - 60)
+    service.claimed_paths.add(os.path.abspath(tmp_path / "transcript_claimed.jsonl"))
+
+    poll(watcher)
+    poll(watcher)
+    assert service.analyzed == []
+
+
+def test_at_most_concurrency_files_start_per_poll(tmp_path, clock):
+    service = FakeInsightsService(tmp_path)
+    watcher = InsightsWatcher(service, debounce_seconds=0, concurrency=2)
+    for index in range(3):
+        write(tmp_path / f"transcript_call-{index}.jsonl", "{}\n", NOW - 60)
+
+    poll(watcher)
+    poll(watcher)
+    assert len(service.analyzed) == 2
+
+    # Analyzed files are moved away by the service; here they stay, so remove them by hand
+    for filename in service.analyzed:
+        os.remove(tmp_path / filename)
+    poll(watcher)
+    assert len(service.analyzed) == 3
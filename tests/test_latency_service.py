@@ -0,0 +1,49 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from app.config.config import Config
+from app.service.latency_service import CallLatencyRecorder, LatencyMetricsService
+from app.util.stats import histogram
+
+
+def test_histogram_is_cumulative():
+    assert histogram([0.05, 0.3, 0.3, 2.0], [0.1, 0.5, 1.0]) == {"le_0.1": 1, "le_0.5": 3, "le_1.0": 3, "+Inf": 4}
+
+
+def test_recorder_groups_metrics_into_turns():
+    recorder = CallLatencyRecorder()
+    recorder.on_metrics(SimpleNamespace(type="eou_metrics", speech_id="s1", transcription_delay=0.1, end_of_utterance_delay=0.4))
+    recorder.on_metrics(SimpleNamespace(type="llm_metrics", speech_id="s1", ttft=0.3, duration=0.9, prompt_tokens=100, completion_tokens=20))
+    recorder.on_metrics(SimpleNamespace(type="tts_metrics", speech_id="s1", ttfb=0.2))
+    recorder.on_metrics(SimpleNamespace(type="tts_metrics", speech_id="s1", ttfb=0.5))
+    turn = recorder.summary()["turns"][0]
+    assert turn["tts_ttfb"] == 0.2
+    assert turn["e2e_latency"] == 0.9
+    assert recorder.llm_usage() == {"llm_calls": 1, "prompt_tokens": 100, "completion_tokens": 20, "seconds": 0.9}
+
+
+def write_latency_file(directory, name, age_seconds=0):
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"room_name": name, "turns": [{"e2e_latency": 1.0}], "llm_calls": []}, f)
+    modified = time.time() - age_seconds
+    os.utime(path, (modified, modified))
+
+
+def test_files_are_aggregated_once_and_pruned_after_retention(tmp_path):
+    config = Config()
+    config.LATENCY_DIRECTORY = str(tmp_path)
+    config.LATENCY_RETENTION_SECONDS = 60
+    write_latency_file(tmp_path, "latency_recent.json")
+    write_latency_file(tmp_path, "latency_old.json", age_seconds=3600)
+    write_latency_file(tmp_path, "transcript_recent.jsonl")
+
+    service = LatencyMetricsService(config)
+    snapshot = service.snapshot()
+    assert snapshot["calls"] == 2
+    assert snapshot["stages"]["e2e_latency"]["count"] == 2
+    assert sorted(os.listdir(tmp_path)) == ["latency_recent.json", "transcript_recent.jsonl"]
+    assert service.seen_files == {"latency_recent.json"}
+    assert service.snapshot()["calls"] == 2
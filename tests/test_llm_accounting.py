@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from app.service import llm_accounting
+from app.service.llm_accounting import (
+    LLMUsageStats, current_usage_meter, llm_call_site, metered_usage, record_llm_call, record_ollama_response
+)
+
+
+@pytest.fixture(autouse=True)
+def usage_stats(monkeypatch):
+    stats = LLMUsageStats()
+    monkeypatch.setattr(llm_accounting, "llm_usage_stats", stats)
+    return stats
+
+
+def test_calls_outside_a_meter_only_reach_the_process_stats(usage_stats):
+    record_llm_call("insights", 100, 20, 0.5)
+    assert current_usage_meter.get() is None
+    assert usage_stats.snapshot()["insights"]["llm_calls"] == 1
+
+
+def test_meter_totals_per_call_site_and_cached_calls(usage_stats):
+    with metered_usage() as meter:
+        record_llm_call("simulation", 100, 20, 0.5)
+        record_llm_call("simulation", 0, 0, 0.0, cached=True)
+        record_ollama_response("insights", {"prompt_eval_count": 50, "eval_count": 10}, 0.25)
+    snapshot = meter.snapshot()
+    assert (snapshot["llm_calls"], snapshot["cached_calls"]) == (2, 1)
+    assert (snapshot["prompt_tokens"], snapshot["completion_tokens"]) == (150, 30)
+    assert snapshot["seconds"] == 0.75
+    assert snapshot["call_sites"]["simulation"]["cached_calls"] == 1
+    assert snapshot["call_sites"]["insights"]["prompt_tokens"] == 50
+    # Cached calls are not inference, so they are left out of the latency percentiles
+    assert usage_stats.snapshot()["simulation"]["latency_seconds"]["count"] == 1
+    assert current_usage_meter.get() is None
+
+
+def test_nested_meters_share_the_outer_meter():
+    with metered_usage() as outer:
+        with metered_usage() as inner:
+            record_llm_call("evaluation", 10, 5, 0.1)
+        assert inner is outer
+        assert current_usage_meter.get() is outer
+    assert outer.llm_calls == 1
+    assert current_usage_meter.get() is None
+
+
+def test_call_site_defaults_to_the_enclosing_llm_call_site():
+    with metered_usage() as meter:
+        with llm_call_site("rewrite"):
+            record_llm_call(prompt_tokens=10)
+            with llm_call_site("evaluation"):
+                record_llm_call(prompt_tokens=1)
+            record_llm_call(prompt_tokens=10)
+        record_llm_call(prompt_tokens=1)
+    assert {name: totals.prompt_tokens for name, totals in meter.call_sites.items()} == {
+        "rewrite": 20, "evaluation": 1, "unknown": 1
+    }
+
+
+def test_concurrent_jobs_keep_separate_meters_and_tasks_inherit_theirs():
+    async def job(call_site, calls):
+        with metered_usage() as meter, llm_call_site(call_site):
+            async def call():
+                await asyncio.sleep(0)
+                record_llm_call(prompt_tokens=1)
+
+            await asyncio.gather(*(asyncio.create_task(call()) for _ in range(calls)))
+            await asyncio.to_thread(record_llm_call, None, 1)
+        return meter
+
+    async def run():
+        return await asyncio.gather(job("training", 3), job("insights", 5))
+
+    training, insights = asyncio.run(run())
+    assert (training.llm_calls, list(training.call_sites)) == (4, ["training"])
+    assert (insights.llm_calls, list(insights.call_sites)) == (6, ["insights"])
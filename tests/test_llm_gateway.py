@@ -0,0 +1,177 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.config.config import default_model_backends
+from app.service.llm_gateway import LLMGateway
+
+
+def gateway(urls=("http://gpu-1",), max_concurrency=2, live_reserved_slots=0):
+    return LLMGateway(list(urls), max_concurrency=max_concurrency, health_check_interval=0,
+                      failure_threshold=3, live_reserved_slots=live_reserved_slots)
+
+
+async def hold(llm_gateway, priority, admitted, release):
+    async with llm_gateway.acquire(priority=priority):
+        admitted.append(priority)
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_admits_up_to_max_concurrency_then_queues():
+    async def run():
+        llm_gateway = gateway(max_concurrency=2)
+        admitted, release = [], asyncio.Event()
+        tasks = [asyncio.create_task(hold(llm_gateway, "batch", admitted, release)) for _ in range(3)]
+        await settle()
+        assert len(admitted) == 2
+        assert llm_gateway.class_stats["batch"].waiting == 1
+        release.set()
+        await asyncio.gather(*tasks)
+        assert len(admitted) == 3
+        assert llm_gateway.backends[0].outstanding == 0
+
+    asyncio.run(run())
+
+
+def test_batch_never_takes_the_reserved_live_slots():
+    async def run():
+        llm_gateway = gateway(max_concurrency=3, live_reserved_slots=1)
+        admitted, release = [], asyncio.Event()
+        batch = [asyncio.create_task(hold(llm_gateway, "batch", admitted, release)) for _ in range(3)]
+        await settle()
+        assert admitted == ["batch", "batch"]
+        live = asyncio.create_task(hold(llm_gateway, "live", admitted, release))
+        await settle()
+        assert admitted == ["batch", "batch", "live"]
+        release.set()
+        await asyncio.gather(*batch, live)
+
+    asyncio.run(run())
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    async def run():
+        llm_gateway = gateway(max_concurrency=1)
+        admitted, first_release = [], asyncio.Event()
+        first = asyncio.create_task(hold(llm_gateway, "batch", admitted, first_release))
+        await settle()
+        releases = {}
+        waiters = []
+        for name, priority in [("batch-1", "batch"), ("simulation", "simulation"), ("batch-2", "batch"), ("live", "live")]:
+            releases[name] = asyncio.Event()
+
+            async def waiter(name=name, priority=priority):
+                async with llm_gateway.acquire(priority=priority):
+                    admitted.append(name)
+                    await releases[name].wait()
+
+            waiters.append(asyncio.create_task(waiter()))
+            await settle()
+
+        first_release.set()
+        for name in ["live", "simulation", "batch-1", "batch-2"]:
+            await settle()
+            assert admitted[-1] == name
+            releases[name].set()
+        await asyncio.gather(first, *waiters)
+
+    asyncio.run(run())
+
+
+def test_acquire_rejects_unknown_priority():
+    async def run():
+        async with gateway().acquire(priority="urgent"):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_acquire_without_backends_raises():
+    async def run():
+        async with gateway(urls=()).acquire():
+            pass
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+
+
+def test_sessions_spread_by_room_name():
+    llm_gateway = gateway(urls=("http://gpu-1", "http://gpu-2", "http://gpu-3"))
+    picked = set()
+    for index in range(30):
+        backend = llm_gateway.open_session(f"room-{index}")
+        picked.add(backend.url)
+        llm_gateway.close_session(backend)
+    assert picked == {"http://gpu-1", "http://gpu-2", "http://gpu-3"}
+
+
+def test_sessions_pick_the_same_backend_in_every_process():
+    urls = ("http://gpu-1", "http://gpu-2", "http://gpu-3")
+    # Separate gateways stand in for worker processes, which do not see each other's calls
+    for index in range(10):
+        assert gateway(urls).open_session(f"room-{index}").url == gateway(urls).open_session(f"room-{index}").url
+
+
+def test_sessions_skip_unhealthy_backends():
+    llm_gateway = gateway(urls=("http://gpu-1", "http://gpu-2"))
+    llm_gateway.backends[0].healthy = False
+    assert {llm_gateway.open_session(f"room-{index}").url for index in range(10)} == {"http://gpu-2"}
+
+
+def test_post_fails_over_on_5xx_and_connection_errors():
+    def handler(request):
+        if request.url.host == "gpu-1":
+            raise httpx.ConnectError("refused", request=request)
+        if request.url.host == "gpu-2":
+            return httpx.Response(503)
+        return httpx.Response(200, json={"response": "ok"})
+
+    async def run():
+        llm_gateway = gateway(urls=("http://gpu-1", "http://gpu-2", "http://gpu-3"), max_concurrency=1)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            for _ in range(3):
+                response = await llm_gateway.post(client, "/api/generate", {"prompt": "hi"})
+                assert response.json() == {"response": "ok"}
+        return llm_gateway
+
+    llm_gateway = asyncio.run(run())
+    assert [backend.healthy for backend in llm_gateway.backends] == [False, False, True]
+    assert all(backend.outstanding == 0 for backend in llm_gateway.backends)
+
+
+def test_post_does_not_retry_client_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        return httpx.Response(400)
+
+    async def run():
+        llm_gateway = gateway(urls=("http://gpu-1", "http://gpu-2"))
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await llm_gateway.post(client, "/api/generate", {})
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run())
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("env, expected", [
+    ({}, "http://localhost:11434"),
+    ({"MODEL_BASE_URL": "http://gpu-1:11434/v1"}, "http://gpu-1:11434"),
+    ({"MODEL_BASE_URL": "http://gpu-1:11434/v1/"}, "http://gpu-1:11434"),
+    ({"MODEL_GENERATE_URL": "http://gpu-2:11434/api/generate"}, "http://gpu-2:11434"),
+])
+def test_backends_default_to_the_legacy_model_urls(monkeypatch, env, expected):
+    for name in ("MODEL_BASE_URL", "MODEL_GENERATE_URL"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    assert default_model_backends() == expected
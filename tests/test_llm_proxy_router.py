@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.router import llm_proxy_router
+from app.service.llm_gateway import LLMGateway
+
+
+def upstream(request):
+    if request.url.host == "down":
+        return httpx.Response(503)
+    return httpx.Response(200, content=b'{"response": "ok"}', headers={"content-type": "application/json"})
+
+
+@pytest.fixture
+def proxy(monkeypatch):
+    llm_gateway = LLMGateway(["http://down", "http://up"], max_concurrency=2, health_check_interval=0, failure_threshold=3)
+    monkeypatch.setattr(llm_proxy_router, "gateway", llm_gateway)
+    monkeypatch.setattr(llm_proxy_router, "proxy_client", httpx.AsyncClient(transport=httpx.MockTransport(upstream)))
+    app = FastAPI()
+    app.include_router(llm_proxy_router.router)
+    return app, llm_gateway
+
+
+def request(app, method, path, **kwargs):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_post_fails_over_and_releases_its_slot(proxy):
+    app, llm_gateway = proxy
+    response = request(app, "POST", "/llm/api/generate", json={"prompt": "hi"}, headers={"X-LLM-Priority": "live"})
+    assert response.status_code == 200
+    assert response.json() == {"response": "ok"}
+    assert [backend.outstanding for backend in llm_gateway.backends] == [0, 0]
+    assert llm_gateway.class_stats["live"].admitted == 2
+
+
+def test_unknown_priority_is_rejected(proxy):
+    app, _ = proxy
+    assert request(app, "POST", "/llm/api/generate", json={}, headers={"X-LLM-Priority": "urgent"}).status_code == 400
+
+
+def test_no_backend_left_is_503(proxy):
+    app, llm_gateway = proxy
+    llm_gateway.backends = []
+    assert request(app, "POST", "/llm/api/generate", json={}).status_code == 503
+    assert request(app, "GET", "/llm/api/tags").status_code == 503
@@ -0,0 +1,95 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.service import main_service
+from app.service.main_service import MainService, normalize_phone_number
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeNumbers:
+    def __init__(self, numbers):
+        self.numbers = numbers
+        self.requests = 0
+
+    def list(self, phone_number):
+        self.requests += 1
+        return [SimpleNamespace(phone_number=phone_number)] if phone_number in self.numbers else []
+
+    def stream(self, page_size):
+        self.requests += 1
+        return [SimpleNamespace(phone_number=number) for number in self.numbers]
+
+
+class FakeTwilioClient:
+    def __init__(self, incoming=(), caller_ids=()):
+        self.incoming_phone_numbers = FakeNumbers(list(incoming))
+        self.outgoing_caller_ids = FakeNumbers(list(caller_ids))
+
+    @property
+    def requests(self):
+        return self.incoming_phone_numbers.requests + self.outgoing_caller_ids.requests
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(main_service.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def service():
+    service = MainService()
+    service.config.TWILIO_VALIDATION_CACHE_TTL_SECONDS = 60
+    yield service
+    service.twilio_executor.shutdown()
+
+
+@pytest.mark.parametrize("phone_number, expected", [
+    ("+15551234567", "+15551234567"),
+    ("+1 (555) 123-4567", "+15551234567"),
+    ("15551234567", "+15551234567"),
+    ("0044 20 7946 0958", "+442079460958"),
+    ("+44.20.7946.0958", "+442079460958"),
+])
+def test_normalize_phone_number(phone_number, expected):
+    assert normalize_phone_number(phone_number) == expected
+
+
+def test_single_validations_are_cached_until_the_ttl(service, clock):
+    client = FakeTwilioClient(incoming=["+15551234567"])
+    assert asyncio.run(service.validate_phone_number("+1 555 123 4567", client))
+    assert asyncio.run(service.validate_phone_number("+15551234567", client))
+    assert client.requests == 1
+
+    clock.now += 61
+    assert asyncio.run(service.validate_phone_number("+15551234567", client))
+    assert client.requests == 2
+
+
+def test_expired_entries_are_purged_on_single_validations(service, clock):
+    client = FakeTwilioClient(caller_ids=["+15551234567"])
+    asyncio.run(service.validate_phone_number("+15550000000", client))
+    clock.now += 61
+    asyncio.run(service.validate_phone_number("+15551234567", client))
+    assert list(service.validation_cache) == ["+15551234567"]
+
+
+def test_bulk_validation_matches_normalized_numbers(service, clock):
+    client = FakeTwilioClient(incoming=["+15551234567"], caller_ids=["+442079460958"])
+    results = asyncio.run(service.warm_validation_cache(["+1 555-123-4567", "0044 20 7946 0958", "+15550000000"], client))
+    assert results == {"+1 555-123-4567": True, "0044 20 7946 0958": True, "+15550000000": False}
+    assert service.cached_validation("15551234567") is True
+    requests = client.requests
+
+    asyncio.run(service.warm_validation_cache(["+15551234567", "+15550000000"], client))
+    assert client.requests == requests
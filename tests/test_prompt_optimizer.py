@@ -0,0 +1,25 @@
+from app.service.prompt_optimizer_service import score_metrics
+
+
+def test_score_metrics_averages_fields_then_personas():
+    score, scores = score_metrics([
+        {"resolution_score": 6, "compliance_score": 8, "empathy_score": 4, "persuasion_score": 2},
+        {"resolution_score": 8, "compliance_score": 10, "empathy_score": 6, "persuasion_score": 4},
+    ])
+    assert scores == {"resolution_score": 7.0, "compliance_score": 9.0, "empathy_score": 5.0, "persuasion_score": 3.0}
+    assert score == 6.0
+
+
+def test_score_metrics_skips_failed_personas_and_missing_fields():
+    score, scores = score_metrics([
+        {"error": "Eval parse failed"},
+        {"resolution_score": 9, "compliance_score": "n/a"},
+        {"resolution_score": 6.5, "empathy_score": 3},
+    ])
+    assert scores == {"resolution_score": 7.75, "empathy_score": 3.0}
+    assert score == 5.375
+
+
+def test_score_metrics_without_scores_is_none():
+    assert score_metrics([]) == (None, {})
+    assert score_metrics([{"error": "timeout"}]) == (None, {})
@@ -0,0 +1,64 @@
+from livekit import api
+
+from app.service.room_state_service import RoomStateCache
+
+
+def event(kind, identity="", created_at=0, num_participants=0, room_name="room"):
+    webhook_event = api.WebhookEvent(event=kind, created_at=created_at)
+    webhook_event.room.name = room_name
+    webhook_event.room.num_participants = num_participants
+    if identity:
+        webhook_event.participant.identity = identity
+    return webhook_event
+
+
+def cache():
+    return RoomStateCache(livekit_api=None, ttl_seconds=5, webhook_max_age_seconds=30)
+
+
+def test_participants_join_and_leave():
+    rooms = cache()
+    rooms.apply_event(event("room_started", created_at=1))
+    rooms.apply_event(event("participant_joined", "agent", created_at=2, num_participants=1))
+    rooms.apply_event(event("participant_joined", "+15551234567", created_at=3, num_participants=2))
+    status = rooms.rooms["room"].status()
+    assert status["status"] == "active"
+    assert status["num_participants"] == 2
+    assert status["participants"] == ["agent", "+15551234567"]
+
+    rooms.apply_event(event("participant_left", "+15551234567", created_at=4))
+    rooms.apply_event(event("participant_left", "agent", created_at=5))
+    status = rooms.rooms["room"].status()
+    assert status["status"] == "empty"
+    assert status["num_participants"] == 0
+
+
+def test_participant_left_counts_down_a_polled_entry():
+    rooms = cache()
+    state = rooms.entry("room")
+    state.num_participants = 2
+    state.source = "poll"
+    rooms.apply_event(event("participant_left", "+15551234567", created_at=1))
+    assert rooms.rooms["room"].status()["num_participants"] == 1
+
+
+def test_room_finished_marks_the_room_not_found():
+    rooms = cache()
+    rooms.apply_event(event("participant_joined", "agent", created_at=1, num_participants=1))
+    rooms.apply_event(event("room_finished", created_at=2))
+    assert rooms.rooms["room"].status() == {"status": "not_found", "room_name": "room"}
+
+
+def test_out_of_order_events_are_ignored():
+    rooms = cache()
+    rooms.apply_event(event("room_finished", created_at=20))
+    rooms.apply_event(event("participant_joined", "agent", created_at=10, num_participants=1))
+    assert rooms.rooms["room"].status()["status"] == "not_found"
+    assert rooms.stale_events == 1
+
+
+def test_events_without_a_room_are_ignored():
+    rooms = cache()
+    rooms.apply_event(api.WebhookEvent(event="egress_started"))
+    assert rooms.rooms == {}
+    assert rooms.webhook_events == 0
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+from app.service import simulation_cache_service
+from app.service.simulation_cache_service import SimulationCache
+
+LLM = "model=llama3.1:8b temperature=0.7 seed=42"
+
+
+def generation(text, **info):
+    return [ChatGeneration(message=AIMessage(content=text), generation_info=info or None)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_700_000_000.0)
+    monkeypatch.setattr(simulation_cache_service.time, "time", lambda: clock.now)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache" / "simulation_cache.db")
+
+
+def test_lookup_replays_the_stored_generation_marked_cached(path):
+    cache = SimulationCache(path)
+    assert cache.lookup("Hello", LLM) is None
+
+    cache.update("Hello", LLM, generation("Hi, this is Sam.", eval_count=7))
+    replayed = cache.lookup("Hello", LLM)
+    assert [entry.message.content for entry in replayed] == ["Hi, this is Sam."]
+    assert replayed[0].generation_info == {"eval_count": 7, "cached": True}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_covers_the_prompt_and_the_model_settings(path):
+    cache = SimulationCache(path)
+    cache.update("Hello", LLM, generation("Hi."))
+    assert cache.lookup("Hello again", LLM) is None
+    assert cache.lookup("Hello", LLM.replace("seed=42", "seed=7")) is None
+    assert cache.lookup("Hello", LLM) is not None
+
+
+def test_entries_persist_across_instances(path):
+    SimulationCache(path).update("Hello", LLM, generation("Hi."))
+    assert SimulationCache(path).lookup("Hello", LLM)[0].message.content == "Hi."
+
+
+def test_clear_drops_every_entry(path):
+    cache = SimulationCache(path)
+    cache.update("Hello", LLM, generation("Hi."))
+    cache.clear()
+    assert cache.lookup("Hello", LLM) is None
+
+
+def test_evict_drops_the_least_recently_used_entries(path, clock):
+    cache = SimulationCache(path, max_entries=2)
+    for prompt in ("a", "b", "c"):
+        clock.now += 1
+        cache.update(prompt, LLM, generation(prompt))
+    clock.now += 1
+    cache.lookup("a", LLM)
+
+    cache.evict()
+    assert cache.lookup("b", LLM) is None
+    assert cache.lookup("a", LLM) is not None
+    assert cache.lookup("c", LLM) is not None
+
+
+def test_update_evicts_every_evict_every_puts(path, clock, monkeypatch):
+    monkeypatch.setattr(SimulationCache, "EVICT_EVERY", 2)
+    cache = SimulationCache(path, max_entries=1)
+    for prompt in ("a", "b"):
+        clock.now += 1
+        cache.update(prompt, LLM, generation(prompt))
+    assert cache.lookup("a", LLM) is None
+    assert cache.lookup("b", LLM) is not None
+
+
+def test_over_full_cache_is_trimmed_on_open(path, clock):
+    cache = SimulationCache(path)
+    for prompt in ("a", "b", "c"):
+        clock.now += 1
+        cache.update(prompt, LLM, generation(prompt))
+    reopened = SimulationCache(path, max_entries=1)
+    assert [prompt for prompt in ("a", "b", "c") if reopened.lookup(prompt, LLM) is not None] == ["c"]
@@ -0,0 +1,27 @@
+from app.util.stats import percentile, summarize_latencies
+
+
+def test_percentile_of_empty_values_is_zero():
+    assert percentile([], 95) == 0.0
+
+
+def test_percentile_uses_nearest_rank():
+    values = [5, 1, 4, 2, 3]
+    assert percentile(values, 0) == 1
+    assert percentile(values, 20) == 1
+    assert percentile(values, 50) == 3
+    assert percentile(values, 95) == 5
+    assert percentile(values, 100) == 5
+
+
+def test_percentile_accepts_iterables():
+    assert percentile((value / 10 for value in range(1, 101)), 99) == 9.9
+
+
+def test_summarize_latencies():
+    assert summarize_latencies([]) == {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    summary = summarize_latencies([0.1, 0.2, 0.3, 0.4])
+    assert summary["count"] == 4
+    assert summary["mean"] == 0.25
+    assert summary["p50"] == 0.2
+    assert summary["p99"] == summary["max"] == 0.4
@@ -0,0 +1,88 @@
+import json
+import os
+import time
+
+import pytest
+
+from app.service.transcript_store import (
+    TranscriptWriter, conversation_text, is_transcript_file, read_conversation, read_transcript, recover_partial_transcripts,
+)
+
+CUSTOMER_INFO = {"customer_name": "Alex", "phone_number": "+15551234567"}
+
+
+def test_writer_streams_to_a_partial_file_and_publishes_on_finalize(tmp_path):
+    writer = TranscriptWriter(str(tmp_path), "room", CUSTOMER_INFO, started_at="20260101_120000")
+    writer.append_message("assistant", ["Hello Alex."])
+    assert os.listdir(tmp_path) == ["transcript_room_20260101_120000.jsonl.part"]
+
+    path = writer.finalize({"first_audio_seconds": 0.4})
+    assert os.listdir(tmp_path) == ["transcript_room_20260101_120000.jsonl"]
+    assert is_transcript_file(os.path.basename(path))
+    assert read_transcript(path) == {
+        "customer_info": CUSTOMER_INFO,
+        "transcript": [{"role": "assistant", "content": ["Hello Alex."]}],
+        "call_metrics": {"first_audio_seconds": 0.4},
+    }
+
+    writer.append_message("user", ["Too late."])
+    assert writer.finalize() == path
+    assert len(read_transcript(path)["transcript"]) == 1
+
+
+def test_read_transcript_stops_at_a_torn_last_line(tmp_path):
+    path = tmp_path / "transcript_room.jsonl"
+    path.write_text(
+        json.dumps({"type": "customer_info", **CUSTOMER_INFO}) + "\n"
+        + json.dumps({"type": "message", "role": "user", "content": ["Hi"]}) + "\n"
+        + '{"type": "message", "ro'
+    )
+    result = read_transcript(str(path))
+    assert result["customer_info"] == CUSTOMER_INFO
+    assert result["transcript"] == [{"role": "user", "content": ["Hi"]}]
+    assert result["call_metrics"] == {}
+
+
+def test_read_transcript_reads_legacy_json(tmp_path):
+    path = tmp_path / "transcript_room.json"
+    path.write_text(json.dumps({"customer_info": CUSTOMER_INFO, "transcript": [{"role": "user", "content": ["Hi"]}]}))
+    assert read_transcript(str(path)) == {
+        "customer_info": CUSTOMER_INFO,
+        "transcript": [{"role": "user", "content": ["Hi"]}],
+        "call_metrics": {},
+    }
+
+
+def test_read_transcript_rejects_a_document_that_is_not_an_object(tmp_path):
+    path = tmp_path / "transcript_room.json"
+    path.write_text("[1, 2]")
+    with pytest.raises(ValueError):
+        read_transcript(str(path))
+
+
+def test_conversation_text_keeps_only_message_text():
+    assert conversation_text([
+        {"role": "assistant", "content": ["Hello Alex.", {"type": "audio"}]},
+        {"role": "user", "content": ["  I lost my job. ", "I can pay next month."]},
+        {"role": "user", "content": []},
+        "not a message",
+    ]) == "ASSISTANT: Hello Alex.\nUSER: I lost my job. I can pay next month."
+
+
+def test_read_conversation_leaves_out_customer_info_and_metrics(tmp_path):
+    writer = TranscriptWriter(str(tmp_path), "room", CUSTOMER_INFO)
+    writer.append_message("user", ["Hi"])
+    text = read_conversation(writer.finalize({"tokens": 10}))
+    assert text == "USER: Hi"
+
+
+def test_recover_partial_transcripts_publishes_only_stale_files(tmp_path):
+    for name in ("transcript_stale_1.jsonl.part", "transcript_fresh_1.jsonl.part", "notes.part"):
+        (tmp_path / name).write_text(json.dumps({"type": "customer_info", **CUSTOMER_INFO}) + "\n")
+    past = time.time() - 3600
+    for name in ("transcript_stale_1.jsonl.part", "notes.part"):
+        os.utime(tmp_path / name, (past, past))
+
+    assert recover_partial_transcripts(str(tmp_path), older_than_seconds=60) == 1
+    assert sorted(os.listdir(tmp_path)) == ["notes.part", "transcript_fresh_1.jsonl.part", "transcript_stale_1.jsonl"]
+    assert recover_partial_transcripts(str(tmp_path / "missing"), older_than_seconds=60) == 0